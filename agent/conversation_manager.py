@@ -2,8 +2,18 @@
 Conversation Manager - LLM-First Architecture
 """
 import re
-import json
-from agent.llm_client import LLMClient
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from agent.llm_client import get_llm_client
+from agent.router import get_intent_router
+from agent.history import ConversationMemory
+from agent.tool_encoding import encode_tool_result
+from config.settings import settings
+from utils.database import get_reservation_store
+from utils.log import get_logger
+from utils.tracing import span
 from tools import (
     search_restaurants,
     create_reservation,
@@ -13,11 +23,57 @@ from tools import (
     select_restaurant
 )
 
+log = get_logger(__name__)
+
+# Accept both variants used in prompts / LLM and keep legacy names
+VALID_FUNCTIONS = [
+    "search_restaurants",
+    "select_restaurant_and_book",
+    "select_restaurant",
+    "find_reservation",
+    "update_reservation",
+    "cancel_reservation",
+]
+# Tools that change a reservation; at most one of these may target the same reservation per turn
+WRITE_FUNCTIONS = ("select_restaurant_and_book", "select_restaurant", "update_reservation", "cancel_reservation")
+
+
+def _is_valid_phone_or_confirmation(val):
+    """True for a 10-digit phone or an ID-looking token, False for placeholders like "user's phone" """
+    if not val or not isinstance(val, str):
+        return False
+    s = val.strip()
+    # valid 10-digit phone
+    if s.isdigit() and len(s) == 10:
+        return True
+    if re.search(r"user('|\")?s|number|phone number|confirmation id|confirmation|phone-or-id|phone_or_id|provided", s, re.IGNORECASE):
+        return False
+    if re.match(r"^[A-Za-z0-9-]{4,}$", s):
+        return True
+    return False
+
+
+_tool_pool = None
+_tool_pool_lock = threading.Lock()
+
+
+def _get_tool_pool():
+    """Process-wide executor for running several tool calls of one response concurrently"""
+    global _tool_pool
+    if _tool_pool is None:
+        with _tool_pool_lock:
+            if _tool_pool is None:
+                _tool_pool = ThreadPoolExecutor(max_workers=settings.TOOL_MAX_WORKERS, thread_name_prefix="tool")
+    return _tool_pool
+
+
 class ConversationManager:
     """Manages conversation flow - LLM-first approach"""
     
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, llm=None):
+        # The LLM client, router, catalog and store are process-wide; a manager only holds per-session state
+        self.llm = llm or get_llm_client()
+        self.router = get_intent_router()
         self.context = {
             "party_size": None,
             "location": None,
@@ -26,29 +82,74 @@ class ConversationManager:
             "available_options": []  # Stores restaurant search results
         }
         self.conversation_history = []
+        # Older turns are folded into this structured summary (see _compact_history)
+        self.memory = ConversationMemory()
         # Flag indicating we asked the user for a phone/confirmation specifically to look up a reservation
         self.awaiting_lookup_phone = False
     
     def process_message(self, user_message: str) -> str:
+        with span("turn", streaming=False) as turn:
+            early_reply = self._begin_turn(user_message)
+            if early_reply is not None:
+                turn.set("fast_path", True)
+                return early_reply
+
+            # Pass everything to LLM - it will intelligently decide what to do
+            clean_history = self._get_clean_history()
 
-        print(f"\n{'='*70}")
-        print(f"[USER] {user_message}")
-        print(f"[CONTEXT] Available restaurants: {len(self.context.get('available_options', []))}")
-        print(f"{'='*70}\n")
+            response = self.llm.chat_with_tools(
+                messages=clean_history,
+                context=self.context
+            )
 
-        print(f"[DEBUG] Conversation Manager - Current context state:")
-        print(f"  - Party size: {self.context.get('party_size')}")
-        print(f"  - Location: {self.context.get('location')}")
-        print(f"  - Date: {self.context.get('date')}")
-        print(f"  - Time: {self.context.get('time')}")
-        print(f"  - Available restaurants: {len(self.context.get('available_options', []))}")
-        print(f"  - Conversation history length: {len(self.conversation_history)}")
+            return self._complete_turn(response)
+
+    def process_message_stream(self, user_message: str):
+        """Same as process_message, but yields the reply in chunks as the model streams it.
+
+        Conversational replies arrive token by token; tool results are
+        yielded as one formatted chunk once the tool has run.
+        """
+        with span("turn", streaming=True) as turn:
+            early_reply = self._begin_turn(user_message)
+            if early_reply is not None:
+                turn.set("fast_path", True)
+                yield early_reply
+                return
+
+            clean_history = self._get_clean_history()
+
+            response = {}
+            streamed = False
+            for event in self.llm.stream_chat_with_tools(messages=clean_history, context=self.context):
+                if event["type"] == "token":
+                    streamed = True
+                    yield event["content"]
+                elif event["type"] == "done":
+                    response = event["result"]
+
+            reply = self._complete_turn(response)
+            if response.get("tool_calls"):
+                yield ("\n\n" if streamed else "") + reply
+            elif not streamed:
+                yield reply
+
+    def _begin_turn(self, user_message):
+        """Record the user message and run the pre-LLM shortcuts. Returns a reply if one applies, else None."""
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "User: %r | party_size=%s location=%s date=%s time=%s options=%d history=%d",
+                user_message, self.context.get('party_size'), self.context.get('location'),
+                self.context.get('date'), self.context.get('time'),
+                len(self.context.get('available_options', [])), len(self.conversation_history),
+            )
 
         self.conversation_history.append({
             "role": "user",
             "content": user_message
         })
-
+        self._compact_history()
 
         # Conservative extraction: try to find an explicit phone or name in recent user messages
         try:
@@ -67,7 +168,7 @@ class ConversationManager:
             if self.awaiting_lookup_phone and phone:
                 self.awaiting_lookup_phone = False
                 tool_result = self._execute_tool('find_reservation', {'phone_or_id': phone})
-                self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": str(tool_result)})
+                self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": encode_tool_result('find_reservation', tool_result)})
 
                 # If a reservation was found, auto-cancel as requested
                 #reservation = tool_result
@@ -78,7 +179,7 @@ class ConversationManager:
                     if reservation_id:
                         cancel_result = self._execute_tool('cancel_reservation', {'reservation_id': reservation_id})
                         # store cancel result
-                        self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": str(cancel_result)})
+                        self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": encode_tool_result('cancel_reservation', cancel_result)})
                         formatted_cancel = self._format_tool_response('cancel_reservation', cancel_result)
                         self.conversation_history.append({"role": "assistant", "content": formatted_cancel})
                         return formatted_cancel
@@ -91,22 +192,60 @@ class ConversationManager:
             # best-effort: don't block flow on unexpected errors here
             pass
 
-        # Pass everything to LLM - it will intelligently decide what to do
-        clean_history = self._get_clean_history()
-        
-        response = self.llm.chat_with_tools(
-            messages=clean_history,
-            context=self.context
-        )
-        
+        if settings.ROUTER_ENABLED:
+            with span("route") as routed:
+                decision = self.router.route(user_message, self.context, self._fast_path_inference(user_message))
+                routed.set("matched", decision["rule"] if decision else None)
+            if decision:
+                log.debug("Router fast path (%s, confidence %s) -> %s", decision['rule'], decision['confidence'], decision['function'])
+                return self._run_fast_path(decision)
+
+        return None
+
+    def _fast_path_inference(self, user_message):
+        """Selection and customer details for the router: this message first, then recent ones.
+
+        Earlier details only fill gaps when this message itself carries a
+        selection, name or phone, so a bare "thanks" never re-books.
+        """
+        inference = self._infer_selection_from_message(user_message)
+        if not inference:
+            return inference
+        aggregated = self._gather_customer_info()
+        for key in ('phone', 'customer_name'):
+            if aggregated.get(key) and not inference.get(key):
+                inference[key] = aggregated[key]
+        if inference.get('restaurant_index') is None and self.context.get('selected_restaurant_index') is not None:
+            inference['restaurant_index'] = self.context.get('selected_restaurant_index')
+        return inference
+
+    def _run_fast_path(self, decision):
+        """Execute a routed tool call exactly as if the LLM had requested it"""
+        function_name = decision["function"]
+        arguments = decision["arguments"]
+
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": f"Calling {function_name} with " + ', '.join(f"{k}={v}" for k, v in arguments.items())
+        })
+        tool_result = self._execute_tool(function_name, arguments)
+        self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": encode_tool_result(function_name, tool_result)})
+
+        formatted_response = self._format_tool_response(function_name, tool_result)
+        self.conversation_history.append({"role": "assistant", "content": formatted_response})
+        return formatted_response
+
+    def _complete_turn(self, response):
+        """Act on the LLM response (run the tool call or pass the text through) and return the reply"""
+
+        # Several calls in one response run together and get one combined reply
+        if len(response.get("tool_calls") or []) > 1:
+            return self._run_tool_calls(response["tool_calls"])
+
         # Handle tool calls
         if response.get("tool_calls"):
             tool_call = response["tool_calls"][0]
-            # Debug: show parsed tool_call dict received from LLM client
-            try:
-                print(f"\n[DEBUG] Parsed tool_call (from LLM client): {json.dumps(tool_call, indent=2, default=str)}")
-            except Exception:
-                print(f"\n[DEBUG] Parsed tool_call (repr): {repr(tool_call)[:1000]}")
+            log.debug("Tool call from LLM: %s(%s)", tool_call.get("function"), tool_call.get("arguments"))
             function_name = tool_call.get("function")
             arguments = tool_call.get("arguments", {})
 
@@ -114,19 +253,6 @@ class ConversationManager:
             if function_name == "find_reservation":
                 # Accept multiple possible keys
                 phone_or_id = arguments.get('phone_or_id') or arguments.get('phone') or arguments.get('confirmation_id') or arguments.get('id')
-                # Helper validator
-                def _is_valid_phone_or_confirmation(val):
-                    if not val or not isinstance(val, str):
-                        return False
-                    s = val.strip()
-                    # valid 10-digit phone
-                    if s.isdigit() and len(s) == 10:
-                        return True
-                    if re.search(r"user('|\")?s|number|phone number|confirmation id|confirmation|phone-or-id|phone_or_id|provided", s, re.IGNORECASE):
-                        return False
-                    if re.match(r"^[A-Za-z0-9-]{4,}$", s):
-                        return True
-                    return False
 
                 if not _is_valid_phone_or_confirmation(phone_or_id):
                     # Ask the user for explicit phone/confirmation and do NOT call the tool
@@ -134,7 +260,7 @@ class ConversationManager:
                     # Set a flag so the manager knows the next phone message should trigger a lookup
                     self.awaiting_lookup_phone = True
                     self.conversation_history.append({"role": "assistant", "content": prompt})
-                    print("[DEBUG] find_reservation call had no valid phone/ID; asking user for explicit info and skipping tool call")
+                    log.debug("find_reservation call had no valid phone/ID; asking the user instead")
                     return prompt
 
             if function_name == "search_restaurants" and self.context.get("available_options"):
@@ -190,7 +316,7 @@ class ConversationManager:
                                 self.conversation_history.append({"role": "assistant", "content": f"Interpreting your reply and proceeding to book: index={booking_args['restaurant_index']}"})
                                 tool_result = self._execute_tool('select_restaurant', booking_args)
                                 # Store tool result and formatted response as usual
-                                self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": str(tool_result)})
+                                self.conversation_history.append({"role": "tool", "tool_call_id": None, "content": encode_tool_result('select_restaurant', tool_result)})
                                 formatted = self._format_tool_response('select_restaurant', tool_result)
                                 self.conversation_history.append({"role": "assistant", "content": formatted})
                                 return formatted
@@ -211,24 +337,9 @@ class ConversationManager:
                             return prompt
 
 
-            # If LLM produced undefined function, dump raw tool_call for debugging
-            if function_name is None or function_name == "undefined":
-                raw = tool_call.get('raw') or tool_call.get('function') or None
-
             # CRITICAL: Validate function name is valid
-            # Accept both variants used in prompts / LLM and keep legacy names
-            valid_functions = [
-                "search_restaurants",
-                "select_restaurant_and_book",
-                "select_restaurant",
-                "find_reservation",
-                "update_reservation",
-                "cancel_reservation",
-            ]
-            if function_name not in valid_functions:
-                print(f"[DEBUG] ❌ INVALID FUNCTION NAME: {function_name}")
-                print(f"[DEBUG] Valid functions are: {valid_functions}")
-                print(f"[DEBUG] Returning conversational response instead of calling invalid function\n")
+            if function_name not in VALID_FUNCTIONS:
+                log.warning("Invalid function name from LLM: %r; replying conversationally", function_name)
 
                 # Return a helpful message based on context (use context available_options)
                 restaurants = self.context.get("available_options", [])
@@ -276,11 +387,12 @@ class ConversationManager:
             # Execute the tool
             tool_result = self._execute_tool(function_name, arguments)
 
-            # Store the tool result in history (with special "tool" role)
+            # Store the tool result in history (with special "tool" role); only the
+            # compact encoding goes back to the model, full records stay in context
             self.conversation_history.append({
                 "role": "tool",
                 "tool_call_id": tool_call.get("id"),
-                "content": str(tool_result)
+                "content": encode_tool_result(function_name, tool_result)
             })
 
             # Format response for user display
@@ -304,11 +416,176 @@ class ConversationManager:
 
         return assistant_message
     
+    def _run_tool_calls(self, tool_calls):
+        """Run every tool call of one model response and return a single combined reply.
+
+        Lookups and searches run concurrently first; writes follow (also
+        concurrently), since a booking may depend on options found by a
+        search in the same response. Searches are merged into one option
+        list. Two writes aimed at the same reservation conflict: the first
+        runs and the others are reported back instead of executed.
+        """
+        calls = []
+        notes = []
+        for tool_call in tool_calls:
+            function_name = tool_call.get("function")
+            arguments = dict(tool_call.get("arguments") or {})
+            if function_name not in VALID_FUNCTIONS:
+                log.warning("Invalid function name from LLM: %r (skipped)", function_name)
+                continue
+            if function_name == "find_reservation":
+                phone_or_id = arguments.get('phone_or_id') or arguments.get('phone') or arguments.get('confirmation_id') or arguments.get('id')
+                if not _is_valid_phone_or_confirmation(phone_or_id):
+                    self.awaiting_lookup_phone = True
+                    notes.append("To look up your reservation, please share your 10-digit phone number or confirmation ID.")
+                    continue
+            if function_name == "cancel_reservation" and not any(arguments.get(k) for k in ('reservation_id', 'reservationId', 'confirmation_id')):
+                if self.context.get('extracted_phone'):
+                    arguments['phone_or_id'] = self.context['extracted_phone']
+            calls.append({"id": tool_call.get("id"), "function": function_name, "arguments": arguments})
+
+        runnable = []
+        claimed = {}
+        for call in calls:
+            target = self._write_target(call["function"], call["arguments"])
+            if target is not None and target in claimed:
+                log.info("Conflict: %s and %s both target %s", call['function'], claimed[target], target)
+                notes.append(f"I didn't run {call['function'].replace('_', ' ')} because it conflicts with "
+                             f"{claimed[target].replace('_', ' ')} on the same reservation. Let me know which one you want.")
+                continue
+            if target is not None:
+                claimed[target] = call["function"]
+            runnable.append(call)
+
+        if not runnable:
+            reply = " ".join(notes) or "I'm here to help with your reservation!"
+            self.conversation_history.append({"role": "assistant", "content": reply})
+            return reply
+
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": "Calling " + "; ".join(
+                f"{c['function']} with " + ', '.join(f"{k}={v}" for k, v in c["arguments"].items()) for c in runnable
+            )
+        })
+
+        pool = _get_tool_pool()
+        reads = [c for c in runnable if c["function"] not in WRITE_FUNCTIONS]
+        writes = [c for c in runnable if c["function"] in WRITE_FUNCTIONS]
+        for phase in (reads, writes):
+            # Each call runs in a copy of this context, so its spans nest under the turn
+            futures = [
+                (c, pool.submit(contextvars.copy_context().run, self._call_tool, c["function"], c["arguments"]))
+                for c in phase
+            ]
+            for c, future in futures:
+                c["result"] = future.result()
+            if phase is reads:
+                searches = [c for c in reads if c["function"] == "search_restaurants"]
+                if searches:
+                    # Later searches fold into the first; the merged list is what the user picks from
+                    searches[0]["result"] = self._merge_searches(searches)
+                    runnable = [c for c in runnable if c["function"] != "search_restaurants" or c is searches[0]]
+
+        # Workers only ran the tools; record their outcomes here, on this thread, in call order
+        # (merged searches were recorded by _merge_searches)
+        for c in runnable:
+            if c["function"] != "search_restaurants":
+                self.memory.observe_tool(c["function"], c["arguments"], c["result"])
+
+        replies = []
+        for c in runnable:
+            self.conversation_history.append({
+                "role": "tool",
+                "tool_call_id": c["id"],
+                "content": encode_tool_result(c["function"], c["result"])
+            })
+            replies.append(self._format_tool_response(c["function"], c["result"]))
+        reply = "\n\n---\n\n".join(replies + notes)
+        self.conversation_history.append({"role": "assistant", "content": reply})
+        return reply
+
+    def _call_tool(self, function_name, arguments):
+        """One tool call from _run_tool_calls, on a worker thread: runs the tool without touching session state"""
+        try:
+            if function_name == "search_restaurants":
+                # Searches leave the context alone; they are merged afterwards
+                with span("tool", function=function_name):
+                    return search_restaurants.execute(**arguments)
+            return self._run_tool(function_name, arguments)
+        except Exception as e:
+            log.exception("%s failed", function_name)
+            return {"error": f"{function_name} failed: {str(e)}"}
+
+    def _write_target(self, function_name, arguments):
+        """The reservation a write call would change, or None for reads"""
+        if function_name in ("select_restaurant", "select_restaurant_and_book"):
+            # Every booking in a turn uses the same searched slot
+            return ("booking", self.context.get("date"), self.context.get("time"), arguments.get("phone"))
+        if function_name in ("update_reservation", "cancel_reservation"):
+            key = (arguments.get("reservation_id") or arguments.get("reservationId") or arguments.get("confirmation_id")
+                   or arguments.get("phone_or_id") or arguments.get("phone"))
+            reservation = get_reservation_store().find(str(key)) if key else None
+            return ("reservation", reservation["confirmation_id"] if reservation else key)
+        return None
+
+    def _merge_searches(self, searches):
+        """Combine several search_restaurants results into one, store it in context and return it.
+
+        Options are interleaved so every searched location is represented in
+        the first five; failed searches become notes.
+        """
+        lists = [c["result"].get("restaurants") or [] for c in searches]
+        merged = []
+        seen = set()
+        for rank in range(max(len(l) for l in lists)):
+            for restaurants in lists:
+                if rank < len(restaurants) and restaurants[rank].get("restaurant_id") not in seen:
+                    seen.add(restaurants[rank].get("restaurant_id"))
+                    merged.append(restaurants[rank])
+        merged = merged[:5]
+
+        notes = [c["result"].get("error") or c["result"].get("note") for c in searches]
+        matched = [c["result"]["matched_location"] for c in searches if c["result"].get("matched_location")]
+        result = {"restaurants": merged}
+        if any(notes):
+            result["note"] = " ".join(n for n in notes if n)
+        if matched:
+            result["matched_location"] = ", ".join(matched)
+        if any(c["result"].get("nearby_alternatives") for c in searches):
+            result["nearby_alternatives"] = True
+
+        first = searches[0]["arguments"]
+        locations = []
+        for c in searches:
+            location = c["arguments"].get("location")
+            if location and location not in locations:
+                locations.append(location)
+        arguments = {
+            "party_size": first.get("party_size"),
+            "location": ", ".join(locations),
+            "date": first.get("date"),
+            "time": first.get("time"),
+        }
+        self.context.update(arguments)
+        self.context["available_options"] = merged
+        self.memory.observe_tool("search_restaurants", arguments, result)
+        return result
+
     def _execute_tool(self, function_name, arguments):
-        """Execute tool function"""
+        """Execute tool function and record its outcome in the conversation memory"""
+        result = self._run_tool(function_name, arguments)
+        self.memory.observe_tool(function_name, arguments, result)
+        return result
 
-        print(f"\n[DEBUG] _execute_tool called with: {function_name}")
-        print(f"[DEBUG] Arguments: {arguments}")
+    def _run_tool(self, function_name, arguments):
+        with span("tool", function=function_name) as s:
+            result = self._dispatch_tool(function_name, arguments)
+            s.set("error", isinstance(result, dict) and "error" in result)
+        return result
+
+    def _dispatch_tool(self, function_name, arguments):
+        log.debug("Executing %s with %s", function_name, arguments)
         if function_name == "search_restaurants":
             # Store search parameters in context
             self.context["party_size"] = arguments.get("party_size")
@@ -321,42 +598,33 @@ class ConversationManager:
 
             # Store available restaurants for later selection
             self.context["available_options"] = result.get("restaurants", [])
-            for i, r in enumerate(self.context["available_options"]):
-                print(f"  [{i}] {r.get('name', 'Unknown')}")
 
             return result
             
         # Accept both canonical and legacy booking function names
         elif function_name in ("select_restaurant", "select_restaurant_and_book"):
-            print(f"[DEBUG] Executing booking/select tool ({function_name})...")
             # LLM extracted: restaurant_index, customer_name, phone
             return self._handle_restaurant_booking(arguments)
 
         elif function_name == "find_reservation":
-            print(f"[DEBUG] Executing find_reservation tool...")
             return find_reservation.execute(**arguments)
 
         elif function_name == "update_reservation":
-            print(f"[DEBUG] Executing update_reservation tool...")
             return update_reservation.execute(**arguments)
 
         elif function_name == "cancel_reservation":
-            print(f"[DEBUG] Executing cancel_reservation tool...")
             return cancel_reservation.execute(**arguments)
         
         elif function_name == "create_reservation":
             return create_reservation.execute(**arguments)
         
         else:
-            print(f"[DEBUG] ERROR: Unknown function: {function_name}")
+            log.warning("Unknown function: %s", function_name)
             return {"error": f"Unknown function: {function_name}"}
     
     def _handle_restaurant_booking(self, arguments):
         """Handle restaurant selection + booking"""
 
-        print(f"\n[DEBUG] _handle_restaurant_booking called")
-        print(f"[DEBUG] Raw arguments: {arguments}")
-
         restaurant_index = arguments.get("restaurant_index")
         customer_name = arguments.get("customer_name")
         phone = arguments.get("phone")
@@ -368,19 +636,16 @@ class ConversationManager:
 
         # Reject if name or phone were not actually mentioned by user (protect against hallucination)
         if not name_found_in_conversation:
-            print(f"[BOOKING] ❌ Name '{customer_name}' was NOT found in conversation history!")
+            log.info("Booking rejected: name %r not found in the conversation", customer_name)
             return {"error": "I don't see a customer name in our conversation. Could you please provide your name?"}
 
         if not phone_found_in_conversation:
-            print(f"[BOOKING] ❌ Phone '{phone}' was NOT found in conversation history!")
+            log.info("Booking rejected: phone %r not found in the conversation", phone)
             return {"error": "I don't see a phone number in our conversation. Could you please provide your 10-digit phone number?"}
         
         # Validate phone number
         if not phone or len(phone) != 10 or not phone.isdigit():
-            print(f"[BOOKING] ❌ Invalid phone: '{phone}'")
-            print(f"  - Is None/empty: {not phone}")
-            print(f"  - Length: {len(phone) if phone else 0}")
-            print(f"  - Is digit: {phone.isdigit() if phone else False}\n")
+            log.info("Booking rejected: invalid phone %r", phone)
             return {
                 "error": f"Invalid phone number '{phone}'. Please provide a 10-digit phone number."
             }
@@ -389,14 +654,14 @@ class ConversationManager:
         available_restaurants = self.context.get("available_options", [])
 
         if not available_restaurants:
-            print("[BOOKING] ❌ No restaurants in context\n")
+            log.info("Booking rejected: no restaurants in context")
             return {
                 "error": "No restaurants available. Please search for restaurants first."
             }
 
         # Validate index
         if restaurant_index < 0 or restaurant_index >= len(available_restaurants):
-            print(f"[BOOKING] ❌ Invalid index: {restaurant_index} (must be 0-{len(available_restaurants)-1})\n")
+            log.info("Booking rejected: index %s outside 0-%d", restaurant_index, len(available_restaurants) - 1)
             return {
                 "error": f"Invalid restaurant selection. Please choose from the available options (1-{len(available_restaurants)})."
             }
@@ -405,10 +670,8 @@ class ConversationManager:
         selected_restaurant = available_restaurants[restaurant_index]
         restaurant_id = selected_restaurant["restaurant_id"]
 
-        print(f"\n[BOOKING] ✅ Selected: {selected_restaurant['name']}")
-        print(f"  ID: {restaurant_id}")
-        print(f"  Location: {selected_restaurant.get('location', 'Unknown')}\n")
-        
+        log.debug("Booking selected %s (%s)", selected_restaurant['name'], restaurant_id)
+
         # Create reservation
 
         result = create_reservation.execute(
@@ -421,20 +684,18 @@ class ConversationManager:
             special_requests=special_requests
         )
 
-        print(f"\n[BOOKING] Reservation complete!")
-        print(f"  - Status: {'SUCCESS' if result.get('confirmation_id') else 'ERROR'}")
-        print(f"  - Confirmation ID: {result.get('confirmation_id', 'N/A')}")
         if 'error' in result:
-            print(f"  - Error: {result.get('error')}")
-        print()
-
+            log.info("Booking failed: %s", result['error'])
         return result
     
     def _format_tool_response(self, function_name, result):
         """Format tool execution result into user-friendly message"""
+        with span("format", function=function_name):
+            return self._render_tool_response(function_name, result)
 
-        if "error" in result:
-            print(f"[DEBUG] Formatting error response: {result['error']}")
+    def _render_tool_response(self, function_name, result):
+
+        if isinstance(result, dict) and "error" in result:
             # Return the error message directly - it already contains the user-friendly ask
             return result['error']
         
@@ -463,6 +724,10 @@ class ConversationManager:
             return "I couldn't find any availability for that time. Would you like to try a different time or location?"
         
         response = f"I found **{len(restaurants)} great option(s)**:\n\n"
+        if result.get("matched_location"):
+            response = f"Showing results for **{result['matched_location']}**. " + response
+        if result.get("note"):
+            response = f"{result['note']}\n\n" + response
         
         for i, rest in enumerate(restaurants[:5], 1):
             times = rest.get("available_times", [])
@@ -471,6 +736,8 @@ class ConversationManager:
             response += f"**{i}. {rest['name']}** 📍\n"
             response += f"   • Location: {rest.get('address', 'N/A')}\n"
             response += f"   • Available: {time_str}\n"
+            if rest.get("distance_km") is not None:
+                response += f"   • Distance: {rest['distance_km']} km away\n"
             response += f"   • Capacity: {rest.get('seating_capacity', 'N/A')} seats\n"
             
             features = rest.get("features", [])
@@ -506,10 +773,13 @@ class ConversationManager:
     
     def _format_reservation_details(self, result):
         """Format reservation lookup result"""
-        reservation = result.get("reservation")
+        # find_reservation reports only whether a reservation exists
+        reservation = result.get("reservation") if isinstance(result, dict) else result
         
         if not reservation:
             return "I couldn't find a reservation with that information. Could you provide your confirmation ID or phone number?"
+        if reservation is True:
+            return "✅ I found a reservation matching that. Would you like to modify or cancel it?"
         
         response = f"""**Your Reservation** 📋
 
@@ -564,7 +834,8 @@ Would you like to make a new booking for a different date? I'm here to help! 
                 content = msg.get('content', '').lower()
                 if value.lower() in content:
                     return True
-        return False
+        # ...including turns that have since been compacted
+        return self.memory.mentions(value)
 
     def _infer_selection_from_message(self, message: str) -> dict:
         """Heuristic extraction: infer restaurant_index, customer_name, phone, special_requests from a user message.
@@ -694,17 +965,36 @@ Would you like to make a new booking for a different date? I'm here to help! 
 
         return {k: v for k, v in (('phone', phone), ('customer_name', name)) if v}
 
+    def _compact_history(self):
+        """Fold turns beyond HISTORY_KEEP_MESSAGES into self.memory and expose its summary to the prompt"""
+        self.conversation_history = self.memory.compact(self.conversation_history, settings.HISTORY_KEEP_MESSAGES)
+        summary = self.memory.render()
+        if summary:
+            self.context["conversation_summary"] = summary
+
     def _get_clean_history(self):
-        """Get clean conversation history (last 10 messages)"""
-        clean = self.conversation_history[-10:]
-        print(f"[DEBUG] _get_clean_history returning {len(clean)} messages")
-        for i, msg in enumerate(clean):
-            role = msg.get('role')
-            has_content = bool(msg.get('content'))
-            has_tools = bool(msg.get('tool_calls'))
-            print(f"  [{i}] role={role}, has_content={has_content}, has_tools={has_tools}")
-        return clean
+        """Get clean conversation history (older turns live in the compacted summary; the prompt builder trims to budget)"""
+        return list(self.conversation_history)
     
+    def to_state(self):
+        """Per-session state as a JSON-serializable dict (see from_state)"""
+        return {
+            "context": self.context,
+            "conversation_history": self.conversation_history,
+            "memory": self.memory.to_dict(),
+            "awaiting_lookup_phone": self.awaiting_lookup_phone,
+        }
+
+    @classmethod
+    def from_state(cls, state, llm=None):
+        """Rebuild a manager saved with to_state()"""
+        manager = cls(llm=llm)
+        manager.context.update(state.get("context") or {})
+        manager.conversation_history = list(state.get("conversation_history") or [])
+        manager.memory = ConversationMemory.from_dict(state.get("memory") or {})
+        manager.awaiting_lookup_phone = bool(state.get("awaiting_lookup_phone"))
+        return manager
+
     def reset(self):
         """Reset conversation state"""
         self.context = {
@@ -715,3 +1005,4 @@ Would you like to make a new booking for a different date? I'm here to help! 
             "available_options": []
         }
         self.conversation_history = []
+        self.memory = ConversationMemory()
@@ -0,0 +1,167 @@
+"""
+Conversation History Compaction
+Folds older turns into a small structured state so prompts stay bounded
+"""
+import re
+from collections import deque
+
+PHONE_RE = re.compile(r"\b(\d{10})\b")
+NAME_RE = re.compile(
+    r"(?:i\s*'?m|i\s+am|my name is)\s+([A-Za-z][A-Za-z'\-]*(?:\s+[A-Za-z][A-Za-z'\-]*)?)",
+    re.IGNORECASE,
+)
+
+SLOT_LABELS = (
+    ("party_size", "Party size"),
+    ("location", "Location"),
+    ("date", "Date"),
+    ("time", "Time"),
+    ("last_search", "Last search"),
+    ("customer_name", "Customer name"),
+    ("phone", "Phone"),
+    ("confirmation_id", "Confirmation ID"),
+    ("booking", "Booking"),
+)
+
+
+def _name_from(text):
+    m = NAME_RE.search(text)
+    if not m:
+        return None
+    candidate = re.split(r"\band\b|\bmy\b|,|\d", m.group(1).strip(), flags=re.IGNORECASE)[0].strip()
+    tokens = [t for t in candidate.split() if re.match(r"^[A-Za-z'\-]+$", t)]
+    return " ".join(tokens[:2]) if tokens else None
+
+
+class ConversationMemory:
+    """Slots and short notes standing in for turns dropped from the history.
+
+    Tool outcomes are recorded as they happen (observe_tool), so slots never
+    depend on re-parsing stringified results. User messages are absorbed
+    when compacted: their phone numbers and names are kept verbatim (the
+    booking guard checks details were really given) and the text itself
+    becomes a truncated note; only the latest `max_notes` notes are kept.
+    Slots confirmed by a tool take precedence over names/phones merely heard.
+    """
+
+    def __init__(self, max_notes=6, note_chars=120):
+        self.slots = {}
+        self.heard = {}  # latest name/phone given in compacted messages
+        self.notes = deque(maxlen=max_notes)
+        self.note_chars = note_chars
+        self.phones = set()
+        self.names = set()
+        self.compacted = 0
+
+    def to_dict(self):
+        """JSON-serializable state, for persisting a session"""
+        return {
+            "slots": self.slots,
+            "heard": self.heard,
+            "notes": list(self.notes),
+            "phones": sorted(self.phones),
+            "names": sorted(self.names),
+            "compacted": self.compacted,
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_notes=6, note_chars=120):
+        memory = cls(max_notes=max_notes, note_chars=note_chars)
+        memory.slots = dict(data.get("slots") or {})
+        memory.heard = dict(data.get("heard") or {})
+        memory.notes.extend(data.get("notes") or [])
+        memory.phones = set(data.get("phones") or [])
+        memory.names = set(data.get("names") or [])
+        memory.compacted = data.get("compacted", 0)
+        return memory
+
+    def observe_tool(self, function_name, arguments, result):
+        """Update slots from a tool call and its result"""
+        arguments = arguments or {}
+        if not isinstance(result, dict) or "error" in result:
+            return
+        if function_name == "search_restaurants":
+            for key in ("party_size", "location", "date", "time"):
+                if arguments.get(key) is not None:
+                    self.slots[key] = arguments[key]
+            names = [r.get("name", "") for r in result.get("restaurants", [])[:3]]
+            self.slots["last_search"] = f"{len(result.get('restaurants', []))} options" + (
+                f" ({', '.join(names)})" if names else ""
+            )
+        elif result.get("confirmation_id"):
+            self.slots["confirmation_id"] = result["confirmation_id"]
+            details = result.get("booking_details") or result.get("updated_details") or {}
+            if function_name in ("select_restaurant", "select_restaurant_and_book", "create_reservation"):
+                self.slots["booking"] = (
+                    f"confirmed at {details.get('restaurant_name')} on {details.get('date')} "
+                    f"{details.get('time')} for {details.get('party_size')}"
+                )
+                for key in ("customer_name", "phone"):
+                    if arguments.get(key):
+                        self.slots[key] = arguments[key]
+            elif function_name == "update_reservation":
+                self.slots["booking"] = (
+                    f"updated to {details.get('date')} {details.get('time')} for {details.get('party_size')}"
+                )
+            elif function_name == "cancel_reservation":
+                self.slots["booking"] = "cancelled"
+
+    def absorb(self, message):
+        """Fold one compacted message into the state"""
+        self.compacted += 1
+        if message.get("role") != "user":
+            return
+        text = str(message.get("content") or "")
+        phones = PHONE_RE.findall(text)
+        if phones:
+            self.phones.update(phones)
+            self.heard["phone"] = phones[-1]
+        name = _name_from(text)
+        if name:
+            self.names.add(name)
+            self.heard["customer_name"] = name
+        note = " ".join(text.split())
+        if len(note) > self.note_chars:
+            note = note[:self.note_chars - 1] + "…"
+        self.notes.append(note)
+
+    def mentions(self, value):
+        """True if `value` appeared in a compacted user message"""
+        value = str(value or "").lower()
+        if not value:
+            return False
+        return (
+            any(value in p for p in self.phones)
+            or any(value in n.lower() for n in self.names)
+            or any(value in n.lower() for n in self.notes)
+        )
+
+    def render(self):
+        """Summary block for the prompt, or "" when nothing has been compacted"""
+        if not self.compacted:
+            return ""
+        lines = ["EARLIER IN THIS CONVERSATION (summarized):"]
+        for key, label in SLOT_LABELS:
+            value = self.slots.get(key, self.heard.get(key))
+            if value is not None:
+                lines.append(f"- {label}: {value}")
+        if self.notes:
+            lines.append("- Earlier user messages: " + " | ".join(self.notes))
+        return "\n".join(lines)
+
+    def compact(self, history, keep_messages):
+        """Absorb all but roughly the last `keep_messages` messages; returns the kept tail.
+
+        The cut is moved forward to the next user message so a tool result
+        or reply is never separated from the turn that produced it.
+        """
+        if len(history) <= keep_messages:
+            return history
+        cut = len(history) - keep_messages
+        while cut < len(history) and history[cut].get("role") != "user":
+            cut += 1
+        if cut >= len(history):
+            return history
+        for message in history[:cut]:
+            self.absorb(message)
+        return history[cut:]
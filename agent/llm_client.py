@@ -2,27 +2,48 @@
 LLM Client
 Handles communication with LLM API and tool calling
 """
-import os
 import json
-from datetime import datetime
+import time
+import queue
+import asyncio
+import hashlib
+import threading
 from config.settings import settings
-from config.prompts import SYSTEM_PROMPT, TOOL_DEFINITIONS
-from together import Together
+from agent.prompt_builder import get_prompt_builder
+from agent.providers import create_provider
+from agent.response_cache import get_response_cache
+from utils.log import get_logger
+from utils.tracing import attach, current_span, span
+
+log = get_logger(__name__)
+
+FALLBACK_REPLY = "I'm having trouble connecting right now. Please try again in a moment."
+
+# Identifies the prompt template and tool schema a cached decision was made under
+PROMPT_HASH = hashlib.sha1(
+    (get_prompt_builder().fingerprint + settings.MODEL_NAME).encode("utf-8")
+).hexdigest()[:16]
+
 
 class LLMClient:
-    """Client for LLM API with tool calling support"""
-    
-    def __init__(self):
-        if not settings.TOGETHER_API_KEY:
-            raise ValueError("TOGETHER_API_KEY not configured")
-        
-        # self.client = OpenAI(
-        # api_key=os.environ["OPENAI_API_KEY"],
-        # base_url="https://api.together.xyz/v1",
-        # )
-        self.client = Together(api_key=settings.TOGETHER_API_KEY)
+    """Client for LLM API with tool calling support.
+
+    Request assembly, caching and reply parsing live here; the model call
+    itself goes to a provider (see agent/providers.py), chosen by
+    Settings.LLM_PROVIDER unless one is passed in.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider or create_provider()
         self.model = settings.MODEL_NAME
-    
+        self.prompts = get_prompt_builder()
+        self.cache = get_response_cache() if settings.LLM_CACHE_ENABLED else None
+        self.prompt_hash = hashlib.sha1(f"{PROMPT_HASH}:{self.provider.name}".encode("utf-8")).hexdigest()[:16]
+
+        # Streaming runs on one background event loop
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
     def chat_with_tools(self, messages, context=None):
         """
         Chat with LLM using tool calling
@@ -34,196 +55,215 @@ class LLMClient:
         Returns:
             dict: {"content": str, "tool_calls": list}
         """
-        # Prepare system prompt with current date
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        system_prompt = SYSTEM_PROMPT.format(current_date=current_date)
-
-        # Add context awareness if restaurants are available
-        if context and context.get("available_options"):
-            num_restaurants = len(context["available_options"])
-            restaurant_names = [r.get("name", "") for r in context["available_options"][:3]]
-
-            system_prompt += f"\n\n🔴 IMPORTANT CONTEXT - READ THIS:\n"
-            system_prompt += f"There are currently {num_restaurants} restaurants available from a previous search:\n"
-            for i, name in enumerate(restaurant_names):
-                system_prompt += f"  {i+1}. {name}\n"
-            system_prompt += f"\nIf the user is selecting one of these restaurants (e.g., says '1', 'first one', or the restaurant name), DO NOT call search_restaurants again."
-            system_prompt += f"\n\n🔴 BOOKING INFORMATION STATUS:\n"
-            system_prompt += f"- Party size: {context.get('party_size', 'NOT SET')}\n"
-            system_prompt += f"- Date: {context.get('date', 'NOT SET')}\n"
-            system_prompt += f"- Time: {context.get('time', 'NOT SET')}\n"
-            system_prompt += f"\nTo complete a booking, you MUST extract customer name and phone from the conversation."
-            system_prompt += f"\nCheck the conversation history carefully for any name or phone number the user provided."
-
-        # Build messages with system prompt
-        filtered_messages = []
-        for i, m in enumerate(messages[-10:]):
-            # Defensive filter: never send assistant messages that include a 'tool_calls' envelope. 
-            if m.get('role') == 'assistant' and m.get('tool_calls'):
-                continue
-            # Always include tool role messages (tool results)
-            if m.get('role') == 'tool':
-                filtered_messages.append(m)
-            # If a message contains tool_calls, only include it when it also contains human-readable content.
-            elif m.get('tool_calls'):
-                if m.get('content'):
-                    filtered_messages.append(m)
-                    content_preview = m.get('content', '')[:50] + '...' if len(m.get('content', '')) > 50 else m.get('content', '')
-                else:
-            # Include regular messages with content (skip internal 'analysis' notes)
-            elif m.get('content') and not str(m.get('content')).startswith('analysis'):
-                filtered_messages.append(m)
-                content_preview = m.get('content', '')[:50] + '...' if len(m.get('content', '')) > 50 else m.get('content', '')
-            else:
-                preview = str(m.get('content', 'None'))[:30]
-
-        full_messages = [{"role": "system", "content": system_prompt}] + filtered_messages
-
-        # Normalize and deduplicate TOOL_DEFINITIONS before sending to the model.
+        user_message = _last_user_message(messages)
+        full_messages, tools_payload = self._build_request(messages, context)
+        history = _prior_turns(full_messages)
+        if self.cache is not None:
+            with span("llm.cache") as s:
+                cached = self.cache.lookup(self.prompt_hash, context, user_message, history)
+                s.set("hit", cached is not None)
+            if cached is not None:
+                return cached
+
         try:
-            # TOOL_DEFINITIONS may be authored with a wrapper {"type":"function","function":{...}}
-            tools_payload = []
-            seen = set()
-            # Determine whether to expose lookup/cancellation tools based on context
-            def _has_valid_phone(ctx):
-                if not ctx:
-                    return False
-                p = ctx.get('extracted_phone') or ctx.get('phone') or None
-                return isinstance(p, str) and p.isdigit() and len(p) == 10
-
-            can_expose_lookup_tools = _has_valid_phone(context)
-
-            for t in TOOL_DEFINITIONS:
-                # If the author already provided the wrapper {"type":"function","function":{...}}, keep it as-is
-                if isinstance(t, dict) and t.get("type") and t.get("function"):
-                    func_def = t.get("function")
-                    name = func_def.get("name") if isinstance(func_def, dict) else None
-                    # Do not expose find/cancel unless we have a validated phone in context
-                    if name in ("find_reservation", "cancel_reservation") and not can_expose_lookup_tools:
-                        continue
-                    if name and name not in seen:
-                        seen.add(name)
-                        tools_payload.append(t)
-                else:
-                    # Otherwise, normalize by wrapping the inner function definition
-                    func_def = t.get("function") if isinstance(t, dict) and t.get("function") else t
-                    name = func_def.get("name") if isinstance(func_def, dict) else None
-                    # Gate lookup/cancel tool exposure
-                    if name in ("find_reservation", "cancel_reservation") and not can_expose_lookup_tools:
-                        continue
-                    if name and name not in seen:
-                        seen.add(name)
-                        tools_payload.append({"type": "function", "function": func_def})
-
-            # Debug: show what tool defs we're sending to the model (extract names whether wrapped or not)
-            try:
-                tool_names = [ (x.get("function") and x.get("function").get("name")) or x.get("name") for x in tools_payload ]
-            except Exception:
-                print(f"\n[DEBUG] Sending tool definitions (couldn't extract names)")
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=full_messages,
-                tools=tools_payload,
-                tool_choice="auto",
-                temperature=0.7,
-                max_tokens=1024
-            )
-            
+            started = time.perf_counter()
+            with span("llm.call", provider=self.provider.name, streaming=False) as s:
+                content, tool_calls = self.provider.complete(full_messages, tools_payload, context)
+                s.set("tool_calls", len(tool_calls or ()))
+            result = self._parse_message(content, tool_calls)
+            if self.cache is not None:
+                self.cache.store(self.prompt_hash, context, user_message, result, time.perf_counter() - started, history)
+            return result
+
+        except Exception as e:
+            log.error("LLM API error: %s", e)
+            return {
+                "content": FALLBACK_REPLY,
+                "tool_calls": [],
+            }
+
+    async def astream_chat_with_tools(self, messages, context=None):
+        """
+        Streaming variant of chat_with_tools (async generator)
+
+        Yields:
+            {"type": "token", "content": str} for each content delta, then
+            {"type": "done", "result": {"content": str, "tool_calls": list}}
+        """
+        user_message = _last_user_message(messages)
+        full_messages, tools_payload = self._build_request(messages, context)
+        history = _prior_turns(full_messages)
+        if self.cache is not None:
+            with span("llm.cache") as s:
+                cached = self.cache.lookup(self.prompt_hash, context, user_message, history)
+                s.set("hit", cached is not None)
+            if cached is not None:
+                yield {"type": "done", "result": cached}
+                return
+
+        content_parts = []
+        tool_calls = []
+        started = time.perf_counter()
+        with span("llm.call", provider=self.provider.name, streaming=True) as call:
             try:
-                raw_repr = str(response)
+                async for event in self.provider.astream(full_messages, tools_payload, context):
+                    if event["type"] == "token":
+                        if not content_parts:
+                            call.set("first_token_ms", round((time.perf_counter() - started) * 1000, 3))
+                        content_parts.append(event["content"])
+                        yield event
+                    elif event["type"] == "tool_calls":
+                        tool_calls = event["tool_calls"]
             except Exception as e:
-                print(f"\n[DEBUG] Couldn't stringify raw response: {e}")
+                log.error("LLM API error: %s", e)
+                if not content_parts:
+                    yield {"type": "done", "result": {"content": FALLBACK_REPLY, "tool_calls": []}}
+                    return
 
-            message = response.choices[0].message
+        result = self._parse_message("".join(content_parts) or None, tool_calls)
+        if self.cache is not None:
+            self.cache.store(self.prompt_hash, context, user_message, result, time.perf_counter() - started, history)
+        yield {"type": "done", "result": result}
 
+    def stream_chat_with_tools(self, messages, context=None):
+        """
+        Synchronous generator over astream_chat_with_tools, for callers such
+        as Streamlit that are not running an event loop. Events are produced
+        on the client's background loop and handed over through a queue.
+        """
+        events = queue.Queue()
+        done = object()
+        parent = current_span()
 
+        async def _pump():
+            # The background loop has its own context; keep this turn's spans under the caller's
+            attach(parent)
             try:
-                msg_type = type(message)
-                attrs = [a for a in dir(message) if not a.startswith('_')][:30]
-            except Exception:
-                pass
-
-            result = {
-                "content": message.content,
-                "tool_calls": []
-            }
+                async for event in self.astream_chat_with_tools(messages, context):
+                    events.put(event)
+            except Exception as e:
+                log.error("LLM API error: %s", e)
+                events.put({"type": "done", "result": {"content": FALLBACK_REPLY, "tool_calls": []}})
+            finally:
+                events.put(done)
 
-            # Extract tool calls if present (robust to variations in SDK shapes)
-            if getattr(message, "tool_calls", None):
-                print(f"[DEBUG] Processing {len(message.tool_calls)} tool call(s):")
-                for tool_call in message.tool_calls:
-                    try:
-                        if isinstance(tool_call, dict):
+        asyncio.run_coroutine_threadsafe(_pump(), self._get_loop())
+        while True:
+            event = events.get()
+            if event is done:
+                return
+            yield event
+
+    def _get_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-stream-loop", daemon=True).start()
+            return self._loop
+
+    def _build_request(self, messages, context):
+        """Assemble (messages, tools) for the API: system prompt, context block, budgeted history and gated tools"""
+        with span("prompt.build") as s:
+            full_messages, tools_payload, prompt_tokens = self.prompts.build(messages, context)
+            s.set("prompt_tokens", prompt_tokens)
+        return full_messages, tools_payload
+
+    def _parse_message(self, content, tool_calls):
+        """Normalize a model reply (SDK objects or streamed dicts) into {"content", "tool_calls"}"""
+        with span("llm.parse"):
+            return self._parse_reply(content, tool_calls)
+
+    def _parse_reply(self, content, tool_calls):
+        result = {
+            "content": content,
+            "tool_calls": []
+        }
+
+        # Extract tool calls if present (robust to variations in SDK shapes)
+        if tool_calls:
+            log.debug("Processing %d tool call(s)", len(tool_calls))
+            for tool_call in tool_calls:
+                func_name = None
+                func_args = {}
+                call_id = None
+
+                # Support both dict-like and attribute-like tool_call shapes
+                try:
+                    if isinstance(tool_call, dict):
+                        call_id = tool_call.get('id') or tool_call.get('call_id')
+                        # function may itself be a dict
+                        func = tool_call.get('function') or {}
+                        if isinstance(func, dict):
+                            func_name = func.get('name')
+                            raw_args = func.get('arguments') or tool_call.get('arguments') or tool_call.get('kwargs')
+                        else:
+                            func_name = tool_call.get('name')
+                            raw_args = tool_call.get('arguments') or tool_call.get('kwargs')
+                    else:
+                        # attribute-like object
+                        call_id = getattr(tool_call, 'id', None) or getattr(tool_call, 'call_id', None)
+                        func_name = getattr(tool_call, 'name', None)
+                        func_attr = getattr(tool_call, 'function', None)
+                        if func_attr is not None:
+                            raw_args = getattr(func_attr, 'arguments', None) or getattr(tool_call, 'arguments', None) or getattr(tool_call, 'kwargs', None)
+                            if getattr(func_attr, 'name', None) and not func_name:
+                                func_name = getattr(func_attr, 'name', None)
                         else:
-                            # attribute-like object
-                            try:
-                                print(f"  - raw tool_call repr (truncated): {repr(tool_call)[:1000]}")
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-                    func_name = None
-                    func_args = {}
-                    call_id = None
-
-                    # Support both dict-like and attribute-like tool_call shapes
+                            raw_args = getattr(tool_call, 'arguments', None) or getattr(tool_call, 'kwargs', None)
+                except Exception as e:
+                    log.warning("Could not extract tool call fields: %s", e)
+                    raw_args = None
+
+                # Parse arguments into dict if possible
+                if raw_args is not None:
                     try:
-                        if isinstance(tool_call, dict):
-                            call_id = tool_call.get('id') or tool_call.get('call_id')
-                            # function may itself be a dict
-                            func = tool_call.get('function') or {}
-                            if isinstance(func, dict):
-                                func_name = func.get('name')
-                                raw_args = func.get('arguments') or tool_call.get('arguments') or tool_call.get('kwargs')
-                            else:
-                                func_name = tool_call.get('name')
-                                raw_args = tool_call.get('arguments') or tool_call.get('kwargs')
+                        if isinstance(raw_args, str):
+                            func_args = json.loads(raw_args)
+                        elif isinstance(raw_args, dict):
+                            func_args = raw_args
                         else:
-                            # attribute-like object
-                            call_id = getattr(tool_call, 'id', None) or getattr(tool_call, 'call_id', None)
-                            func_name = getattr(tool_call, 'name', None)
-                            func_attr = getattr(tool_call, 'function', None)
-                            if func_attr is not None:
-                                raw_args = getattr(func_attr, 'arguments', None) or getattr(tool_call, 'arguments', None) or getattr(tool_call, 'kwargs', None)
-                                if getattr(func_attr, 'name', None) and not func_name:
-                                    func_name = getattr(func_attr, 'name', None)
-                            else:
-                                raw_args = getattr(tool_call, 'arguments', None) or getattr(tool_call, 'kwargs', None)
+                            func_args = json.loads(str(raw_args))
                     except Exception as e:
-                        print(f"  - ERROR extracting tool_call fields: {e}")
-                        raw_args = None
-
-                    # Parse arguments into dict if possible
-                    if raw_args is not None:
-                        try:
-                            if isinstance(raw_args, str):
-                                func_args = json.loads(raw_args)
-                            elif isinstance(raw_args, dict):
-                                func_args = raw_args
-                            else:
-                                func_args = json.loads(str(raw_args))
-                        except Exception as e:
-                            print(f"  - ERROR parsing arguments: {e}")
-                            func_args = {}
-
-
-                    result["tool_calls"].append(
-                        {
-                            "id": call_id,
-                            "function": func_name if func_name is not None else "undefined",
-                            "arguments": func_args,
-                            "raw": repr(tool_call)[:2000]
-                        }
-                    )
-            elif message.content:
-                print(f"[DEBUG] Conversational response: {message.content[:100]}...")
+                        log.warning("Could not parse tool call arguments: %s", e)
+                        func_args = {}
 
-            return result
+                result["tool_calls"].append(
+                    {
+                        "id": call_id,
+                        "function": func_name if func_name is not None else "undefined",
+                        "arguments": func_args,
+                    }
+                )
+        elif content:
+            log.debug("Conversational response: %.100s", content)
 
-        except Exception as e:
-            print(f"LLM API Error: {e}")
-            return {
-                "content": "I'm having trouble connecting right now. Please try again in a moment.",
-                "tool_calls": [],
-            }
+        return result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Process-wide client, so every session shares one HTTP connection pool and streaming loop"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
+
+
+def _prior_turns(full_messages):
+    """The history sent with a request, minus the system prompt and the latest user message"""
+    history = full_messages[1:]
+    if history and history[-1].get('role') == 'user':
+        history = history[:-1]
+    return history
+
+
+def _last_user_message(messages):
+    for m in reversed(messages or []):
+        if m.get('role') == 'user':
+            return m.get('content') or ""
+    return ""
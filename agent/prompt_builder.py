@@ -0,0 +1,206 @@
+"""
+Prompt Builder
+Assembles LLM requests from precomputed parts and keeps history within a token budget
+"""
+import json
+import hashlib
+import threading
+from datetime import datetime
+from functools import lru_cache
+from config.settings import settings
+from config.prompts import SYSTEM_PROMPT, TOOL_DEFINITIONS
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to a character/word estimate
+    tiktoken = None
+
+LOOKUP_TOOLS = ("find_reservation", "cancel_reservation")
+# Per-message framing the chat template adds around role and content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _normalize_tools(definitions):
+    """Wrap bare function definitions as {"type": "function", "function": ...} and drop duplicate names"""
+    tools = []
+    seen = set()
+    for t in definitions:
+        if isinstance(t, dict) and t.get("type") and t.get("function"):
+            tool = t
+        else:
+            func_def = t.get("function") if isinstance(t, dict) and t.get("function") else t
+            tool = {"type": "function", "function": func_def}
+        name = tool["function"].get("name") if isinstance(tool["function"], dict) else None
+        if name and name not in seen:
+            seen.add(name)
+            tools.append(tool)
+    return tools
+
+
+def _has_valid_phone(context):
+    if not context:
+        return False
+    p = context.get('extracted_phone') or context.get('phone') or None
+    return isinstance(p, str) and p.isdigit() and len(p) == 10
+
+
+class PromptBuilder:
+    """Builds (messages, tools) for the chat API.
+
+    The formatted system prompt is cached per date and the tool payloads per
+    gating variant (with/without the lookup tools), so a request only costs
+    the small context block plus history selection. History is taken newest
+    first until `history_budget` tokens are used; a `tiktoken` encoding is
+    used for counting when installed, otherwise a conservative estimate.
+    """
+
+    def __init__(self, history_budget=1500, encoding="cl100k_base"):
+        self.history_budget = history_budget
+        self._encoder = None
+        if tiktoken is not None:
+            try:
+                self._encoder = tiktoken.get_encoding(encoding)
+            except Exception as e:
+                log.warning("Tokenizer %s unavailable, estimating tokens: %s", encoding, e)
+        self._count = lru_cache(maxsize=4096)(self._count_uncached)
+
+        all_tools = _normalize_tools(TOOL_DEFINITIONS)
+        self._tools = {
+            True: all_tools,
+            False: [t for t in all_tools if t["function"].get("name") not in LOOKUP_TOOLS],
+        }
+        self._tool_tokens = {
+            variant: self.count_tokens(json.dumps(tools)) for variant, tools in self._tools.items()
+        }
+        self.fingerprint = hashlib.sha1(
+            (SYSTEM_PROMPT + json.dumps(all_tools, sort_keys=True)).encode("utf-8")
+        ).hexdigest()[:16]
+        self._system_prompt = (None, None, 0)  # (date, text, tokens)
+
+    # Token counting
+
+    def _count_uncached(self, text):
+        if self._encoder is not None:
+            return len(self._encoder.encode(text))
+        # BPE vocabularies average ~4 characters per token on English text;
+        # never report fewer tokens than words
+        return max(len(text) // 4, len(text.split())) + 1
+
+    def count_tokens(self, text):
+        return self._count(text or "")
+
+    def count_message_tokens(self, message):
+        return MESSAGE_OVERHEAD_TOKENS + self.count_tokens(str(message.get('content') or ""))
+
+    # Assembly
+
+    def system_prompt(self, current_date=None):
+        """SYSTEM_PROMPT formatted for `current_date` (default today); re-formatted only when the date changes"""
+        current_date = current_date or datetime.now().strftime("%Y-%m-%d")
+        cached_date, text, tokens = self._system_prompt
+        if cached_date != current_date:
+            text = SYSTEM_PROMPT.format(current_date=current_date)
+            tokens = self.count_tokens(text)
+            self._system_prompt = (current_date, text, tokens)
+        return text, tokens
+
+    def tools(self, context):
+        """Tool payload for this context; lookup/cancel tools need a validated phone"""
+        return self._tools[_has_valid_phone(context)]
+
+    def context_block(self, context):
+        """Dynamic state appended after the static prefix: compacted history and pending search results"""
+        if not context:
+            return ""
+        block = ""
+        if context.get("conversation_summary"):
+            block = "\n\n" + context["conversation_summary"]
+        if not context.get("available_options"):
+            return block
+        options = context["available_options"]
+        lines = [
+            "",
+            "",
+            "🔴 IMPORTANT CONTEXT - READ THIS:",
+            f"There are currently {len(options)} restaurants available from a previous search:",
+        ]
+        lines += [f"  {i+1}. {r.get('name', '')}" for i, r in enumerate(options[:3])]
+        lines += [
+            "",
+            "If the user is selecting one of these restaurants (e.g., says '1', 'first one', or the restaurant name), DO NOT call search_restaurants again.",
+            "",
+            "🔴 BOOKING INFORMATION STATUS:",
+            f"- Party size: {context.get('party_size', 'NOT SET')}",
+            f"- Date: {context.get('date', 'NOT SET')}",
+            f"- Time: {context.get('time', 'NOT SET')}",
+            "",
+            "To complete a booking, you MUST extract customer name and phone from the conversation.",
+            "Check the conversation history carefully for any name or phone number the user provided.",
+        ]
+        return block + "\n".join(lines)
+
+    def select_history(self, messages, budget=None):
+        """Newest-first messages that fit in `budget` tokens, returned in order.
+
+        Assistant envelopes carrying tool_calls and internal 'analysis' notes
+        are never sent. The latest message is always kept.
+        """
+        budget = self.history_budget if budget is None else budget
+        selected = []
+        used = 0
+        for m in reversed(messages or []):
+            if not _sendable(m):
+                continue
+            cost = self.count_message_tokens(m)
+            if selected and used + cost > budget:
+                break
+            selected.append(m)
+            used += cost
+        selected.reverse()
+        return selected, used
+
+    def build(self, messages, context):
+        """(full_messages, tools_payload, prompt_tokens)"""
+        system_text, system_tokens = self.system_prompt()
+        block = self.context_block(context)
+        if block:
+            system_text += block
+            system_tokens += self.count_tokens(block)
+        history, history_tokens = self.select_history(messages)
+        tools = self.tools(context)
+        prompt_tokens = (
+            MESSAGE_OVERHEAD_TOKENS + system_tokens + history_tokens + self._tool_tokens[_has_valid_phone(context)]
+        )
+        return [{"role": "system", "content": system_text}] + history, tools, prompt_tokens
+
+
+def _sendable(m):
+    # Never send assistant messages that include a 'tool_calls' envelope
+    if m.get('role') == 'assistant' and m.get('tool_calls'):
+        return False
+    if m.get('role') == 'tool':
+        return True
+    # A message with tool_calls is only useful when it also carries human-readable content
+    if m.get('tool_calls'):
+        return bool(m.get('content'))
+    return bool(m.get('content')) and not str(m.get('content')).startswith('analysis')
+
+
+_builder = None
+_builder_lock = threading.Lock()
+
+
+def get_prompt_builder():
+    """Process-wide builder, so the precomputed prompt parts are shared by every session"""
+    global _builder
+    if _builder is None:
+        with _builder_lock:
+            if _builder is None:
+                _builder = PromptBuilder(
+                    history_budget=settings.PROMPT_HISTORY_TOKENS,
+                    encoding=settings.PROMPT_TOKEN_ENCODING,
+                )
+    return _builder
@@ -0,0 +1,268 @@
+"""
+LLM Providers
+Backends behind LLMClient: the Together API and a scripted stub for offline runs
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+from datetime import date, timedelta
+import aiohttp
+from config.settings import settings
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+
+class TogetherProvider:
+    """Together chat completions with tool calling.
+
+    complete() uses the SDK; astream() reads the SSE stream directly with a
+    keep-alive aiohttp session (the SDK drops streamed tool-call deltas).
+    If `record_path` is set, every completed turn is appended to it as a
+    stub script rule, so real conversations can be replayed offline.
+    """
+
+    name = "together"
+
+    def __init__(self, model, record_path=None):
+        if not settings.TOGETHER_API_KEY:
+            raise ValueError("TOGETHER_API_KEY not configured")
+        from together import Together
+
+        # self.client = OpenAI(
+        # api_key=os.environ["OPENAI_API_KEY"],
+        # base_url="https://api.together.xyz/v1",
+        # )
+        self.client = Together(api_key=settings.TOGETHER_API_KEY)
+        self.model = model
+        self.record_path = record_path
+        self._record_lock = threading.Lock()
+        self._session = None
+
+    def complete(self, messages, tools, context=None):
+        """(content, tool_calls) for one request"""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            temperature=0.7,
+            max_tokens=1024
+        )
+
+        message = response.choices[0].message
+        tool_calls = getattr(message, "tool_calls", None)
+        self._record(messages, message.content, tool_calls)
+        return message.content, tool_calls
+
+    async def astream(self, messages, tools, context=None):
+        """Yields {"type": "token", "content"} per content delta, then {"type": "tool_calls", "tool_calls"}"""
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": "auto",
+            "temperature": 0.7,
+            "max_tokens": 1024,
+            "stream": True,
+        }
+        content_parts = []
+        calls = {}
+        session = await self._get_session()
+        async with session.post(f"{settings.TOGETHER_BASE_URL}/chat/completions", json=payload) as resp:
+            resp.raise_for_status()
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                for choice in chunk.get("choices") or []:
+                    delta = choice.get("delta") or {}
+                    if delta.get("content"):
+                        content_parts.append(delta["content"])
+                        yield {"type": "token", "content": delta["content"]}
+                    _merge_tool_call_deltas(calls, delta.get("tool_calls"))
+        tool_calls = [calls[i] for i in sorted(calls)]
+        self._record(messages, "".join(content_parts) or None, tool_calls)
+        yield {"type": "tool_calls", "tool_calls": tool_calls}
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": f"Bearer {settings.TOGETHER_API_KEY}"},
+                timeout=aiohttp.ClientTimeout(total=settings.RESPONSE_TIMEOUT),
+            )
+        return self._session
+
+    def _record(self, messages, content, tool_calls):
+        if not self.record_path:
+            return
+        user_message = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        rule = {"match": "^" + re.escape(user_message) + "$", "content": content, "tool_calls": []}
+        for call in tool_calls or []:
+            func = call.get("function") if isinstance(call, dict) else getattr(call, "function", None)
+            name = func.get("name") if isinstance(func, dict) else getattr(func, "name", None)
+            args = func.get("arguments") if isinstance(func, dict) else getattr(func, "arguments", None)
+            try:
+                args = json.loads(args) if isinstance(args, str) else (args or {})
+            except ValueError:
+                args = {}
+            rule["tool_calls"].append({"function": name, "arguments": args})
+        with self._record_lock:
+            with open(self.record_path, "a") as f:
+                f.write(json.dumps(rule, ensure_ascii=False) + "\n")
+
+
+class StubProvider:
+    """Deterministic scripted backend with configurable latency, for offline runs and load tests.
+
+    The script is a JSON list (or JSONL) of rules, tried in order against
+    the last user message:
+
+        {"match": "<regex>", "when": "options" | "no_options" (optional),
+         "content": "...", "tool_calls": [{"function": "...", "arguments": {...}}]}
+
+    String argument values are formatted with the regex's named groups plus
+    {today} and {tomorrow} (ISO dates); "{group|int}" as a whole value
+    yields an integer. "when" tests whether the conversation has search
+    results pending. Rules recorded by TogetherProvider replay
+    as-is. Latency is `latency_ms` plus uniform `jitter_ms`, seeded.
+    """
+
+    name = "stub"
+
+    def __init__(self, script_path=None, rules=None, latency_ms=0, jitter_ms=0, seed=0):
+        self.rules = [self._compile(r) for r in (rules if rules is not None else _load_script(script_path))]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._calls_lock = threading.Lock()
+        self.calls = 0
+
+    @staticmethod
+    def _compile(rule):
+        return dict(rule, pattern=re.compile(rule.get("match", ""), re.IGNORECASE | re.DOTALL))
+
+    def _delay(self):
+        with self._random_lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+    def _respond(self, messages, context):
+        with self._calls_lock:
+            self.calls += 1
+            number = self.calls
+        text = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        has_options = bool((context or {}).get("available_options"))
+        for rule in self.rules:
+            when = rule.get("when")
+            if (when == "options" and not has_options) or (when == "no_options" and has_options):
+                continue
+            m = rule["pattern"].search(text)
+            if not m:
+                continue
+            values = {k: v for k, v in m.groupdict().items() if v is not None}
+            values.update(today=date.today().isoformat(), tomorrow=(date.today() + timedelta(days=1)).isoformat())
+            tool_calls = [
+                {
+                    "id": f"stub-{number}-{i}",
+                    "function": {"name": call["function"], "arguments": json.dumps(_fill(call.get("arguments") or {}, values))},
+                }
+                for i, call in enumerate(rule.get("tool_calls") or [])
+            ]
+            content = rule.get("content")
+            return (_format(content, values) if content else content), tool_calls
+        return "How can I help with your reservation?", []
+
+    def complete(self, messages, tools, context=None):
+        time.sleep(self._delay())
+        return self._respond(messages, context)
+
+    async def astream(self, messages, tools, context=None):
+        delay = self._delay()
+        content, tool_calls = self._respond(messages, context)
+        words = re.findall(r"\S+\s*", content or "")
+        # Time to first token is half the latency; the rest is spread over the tokens
+        await asyncio.sleep(delay / 2)
+        for word in words:
+            await asyncio.sleep(delay / 2 / len(words))
+            yield {"type": "token", "content": word}
+        if not words:
+            await asyncio.sleep(delay / 2)
+        yield {"type": "tool_calls", "tool_calls": tool_calls}
+
+
+_INT_PLACEHOLDER_RE = re.compile(r"^\{(\w+)\|int\}$")
+
+
+def _fill(value, values):
+    if isinstance(value, dict):
+        return {k: _fill(v, values) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, values) for v in value]
+    if isinstance(value, str):
+        m = _INT_PLACEHOLDER_RE.match(value)
+        if m and m.group(1) in values:
+            try:
+                return int(values[m.group(1)])
+            except ValueError:
+                return values[m.group(1)]
+        return _format(value, values)
+    return value
+
+
+def _format(text, values):
+    """`text` with {placeholders} filled; text that isn't a valid template (e.g. recorded JSON) is kept as is"""
+    try:
+        return text.format(**values)
+    except (KeyError, IndexError, ValueError):
+        return text
+
+
+def _load_script(path):
+    if not path:
+        return []
+    try:
+        with open(path, "r") as f:
+            text = f.read()
+    except FileNotFoundError:
+        log.warning("Stub script %s not found; every reply will be the default", path)
+        return []
+    if path.endswith(".jsonl"):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return json.loads(text)
+
+
+def _merge_tool_call_deltas(calls, deltas):
+    """Accumulate streamed tool-call fragments by index (ids/names arrive once, arguments in pieces)"""
+    for delta in deltas or []:
+        index = delta.get("index", len(calls))
+        call = calls.setdefault(index, {"id": None, "function": {"name": "", "arguments": ""}})
+        if delta.get("id"):
+            call["id"] = delta["id"]
+        func = delta.get("function") or {}
+        if func.get("name"):
+            call["function"]["name"] += func["name"]
+        if func.get("arguments"):
+            call["function"]["arguments"] += func["arguments"]
+
+
+def create_provider(name=None):
+    """Provider selected by Settings.LLM_PROVIDER ("together" or "stub")"""
+    name = (name or settings.LLM_PROVIDER).lower()
+    if name == "together":
+        return TogetherProvider(settings.MODEL_NAME, record_path=settings.LLM_RECORD_PATH)
+    if name == "stub":
+        return StubProvider(
+            script_path=settings.LLM_STUB_SCRIPT,
+            latency_ms=settings.LLM_STUB_LATENCY_MS,
+            jitter_ms=settings.LLM_STUB_JITTER_MS,
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
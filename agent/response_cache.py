@@ -0,0 +1,226 @@
+"""
+Response Cache
+Reuses LLM tool-call decisions for near-identical requests
+"""
+import re
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from config.settings import settings
+
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Anything that pins a date to the calendar (or to the current weekday) makes a request day-bound
+ABSOLUTE_DATE_RE = re.compile(
+    r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.-]\d{1,2}|\b\d{1,2}(?:st|nd|rd|th)\b|"
+    r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\b|"
+    r"\b(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day)?\b|\bweekend\b|\bnext week\b",
+    re.IGNORECASE,
+)
+WORD_RE = re.compile(r"[a-z0-9:]+")
+NUMBER_RE = re.compile(r"\d+|\b(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)\b")
+STOPWORDS = frozenset(
+    "a an the i i'm im we me my us our please pls can could would like want to for at in on of "
+    "book get reserve need table tables some hi hello hey there thanks thank you kindly".split()
+)
+REL_DATE_KEY = "__days_from_today__"
+
+
+def _normalize(text):
+    return " ".join(WORD_RE.findall((text or "").lower()))
+
+
+def _content_signature(normalized):
+    """Content words in any order (numbers keep theirs), so filler and phrasing don't defeat the cache"""
+    numbers = NUMBER_RE.findall(normalized)
+    words = sorted({w for w in normalized.split() if w not in STOPWORDS and not NUMBER_RE.fullmatch(w)})
+    return " ".join(words) + " | " + " ".join(numbers)
+
+
+def _trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _relativize(value, today):
+    """ISO dates -> {REL_DATE_KEY: n} (recursively), so 'tomorrow' replays as tomorrow"""
+    if isinstance(value, str) and ISO_DATE_RE.match(value):
+        try:
+            return {REL_DATE_KEY: (datetime.strptime(value, "%Y-%m-%d").date() - today).days}
+        except ValueError:
+            return value
+    if isinstance(value, dict):
+        return {k: _relativize(v, today) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_relativize(v, today) for v in value]
+    return value
+
+
+def _absolutize(value, today):
+    if isinstance(value, dict):
+        if set(value) == {REL_DATE_KEY}:
+            return (today + timedelta(days=value[REL_DATE_KEY])).strftime("%Y-%m-%d")
+        return {k: _absolutize(v, today) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_absolutize(v, today) for v in value]
+    return value
+
+
+class ResponseCache:
+    """TTL + LRU cache of tool-call decisions keyed by request fingerprint.
+
+    The fingerprint is (prompt hash, context summary, hash of the earlier
+    messages sent with the request, normalized last user message). Requests that only use relative dates ("tomorrow", "tonight")
+    are cached across days with their date arguments stored as offsets;
+    requests naming a calendar date or weekday are keyed to the current day.
+    Lookups try the exact fingerprint, then the order-insensitive content
+    signature, then (if `similarity` > 0) character-trigram similarity among
+    entries with the same numbers.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=3600, similarity=0.0, cacheable_tools=("search_restaurants",)):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.cacheable_tools = frozenset(cacheable_tools)
+        self._entries = OrderedDict()  # exact key -> entry
+        self._by_signature = {}  # signature key -> exact key
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._saved_seconds = 0.0
+
+    def _keys(self, prompt_hash, context, message, history, today):
+        normalized = _normalize(message)
+        day = today.isoformat() if ABSOLUTE_DATE_RE.search(message or "") else "*"
+        prefix = (prompt_hash, _context_summary(context, today), _history_hash(history), day)
+        numbers = tuple(NUMBER_RE.findall(normalized))
+        return prefix + (normalized,), prefix + (_content_signature(normalized),), prefix, numbers, normalized
+
+    def lookup(self, prompt_hash, context, message, history=(), today=None):
+        """Cached {"content", "tool_calls"} for this request, or None.
+
+        `history` is what the model would read before `message`: the
+        messages sent with the request, excluding the system prompt.
+        """
+        today = today or date.today()
+        exact, signature, prefix, numbers, normalized = self._keys(prompt_hash, context, message, history, today)
+        now = time.monotonic()
+        with self._lock:
+            key = exact if exact in self._entries else self._by_signature.get(signature)
+            if key is None and self.similarity > 0:
+                key = self._similar(prefix, numbers, normalized)
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None and now - entry["stored_at"] > self.ttl_seconds:
+                self._evict(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            self._saved_seconds += entry["latency"]
+            return _absolutize(copy.deepcopy(entry["result"]), today)
+
+    def store(self, prompt_hash, context, message, result, latency, history=(), today=None):
+        """Remember a model decision if it is a cacheable tool call"""
+        calls = result.get("tool_calls") or []
+        if not calls or any(c.get("function") not in self.cacheable_tools for c in calls):
+            return
+        today = today or date.today()
+        exact, signature, prefix, numbers, normalized = self._keys(prompt_hash, context, message, history, today)
+        entry = {
+            "result": _relativize(copy.deepcopy(result), today) if prefix[-1] == "*" else copy.deepcopy(result),
+            "latency": latency,
+            "stored_at": time.monotonic(),
+            "signature": signature,
+            "prefix": prefix,
+            "numbers": numbers,
+            "trigrams": _trigrams(normalized),
+        }
+        with self._lock:
+            self._entries[exact] = entry
+            self._entries.move_to_end(exact)
+            self._by_signature[signature] = exact
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _similar(self, prefix, numbers, normalized):
+        grams = _trigrams(normalized)
+        best_key, best_score = None, self.similarity
+        for key, entry in self._entries.items():
+            if entry["prefix"] != prefix or entry["numbers"] != numbers:
+                continue
+            score = len(grams & entry["trigrams"]) / len(grams | entry["trigrams"])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _evict(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._by_signature.get(entry["signature"]) == key:
+            del self._by_signature[entry["signature"]]
+
+    @property
+    def stats(self):
+        """{"hits", "misses", "hit_rate", "saved_latency_s", "entries"}"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "saved_latency_s": round(self._saved_seconds, 3),
+                "entries": len(self._entries),
+            }
+
+
+def _context_summary(context, today):
+    """The parts of conversation state that can change the model's decision"""
+    if not context:
+        return ()
+    booking_date = context.get("date")
+    if isinstance(booking_date, str) and ISO_DATE_RE.match(booking_date):
+        booking_date = str(_relativize(booking_date, today))
+    phone = context.get("extracted_phone") or context.get("phone")
+    return (
+        context.get("party_size"),
+        (context.get("location") or "").lower(),
+        booking_date,
+        context.get("time"),
+        tuple(r.get("restaurant_id") for r in context.get("available_options") or ()),
+        context.get("selected_restaurant_index"),
+        bool(phone),
+        bool(context.get("extracted_customer_name")),
+        context.get("conversation_summary") or "",
+    )
+
+
+def _history_hash(history):
+    """Digest of the earlier turns the model reads; arguments can come from them (e.g. a party size)"""
+    if not history:
+        return ""
+    turns = [(m.get("role"), str(m.get("content") or "")) for m in history]
+    return hashlib.sha1(json.dumps(turns).encode("utf-8")).hexdigest()[:16]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache shared by every session"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                    similarity=settings.LLM_CACHE_SIMILARITY,
+                    cacheable_tools=settings.LLM_CACHE_TOOLS,
+                )
+    return _cache
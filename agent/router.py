@@ -0,0 +1,160 @@
+"""
+Intent Router
+Deterministic fast path that answers formulaic turns without calling the LLM
+"""
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from config.settings import settings
+from utils.database import get_reservation_store
+
+CONFIRMATION_ID_RE = re.compile(r"\bGF-[A-Z]{3}-\d{6}-[A-Z0-9]{4}\b", re.IGNORECASE)
+PHONE_RE = re.compile(r"\b(\d{10})\b")
+CANCEL_RE = re.compile(r"\b(cancel|call off|drop)\b", re.IGNORECASE)
+LOOKUP_RE = re.compile(r"\b(find|check|status|show|look\s*up|lookup|details|see|view)\b", re.IGNORECASE)
+NEGATION_RE = re.compile(r"\b(don'?t|do not|not|never|no)\b", re.IGNORECASE)
+# Words that suggest the user wants something other than picking from the current list
+NEW_REQUEST_RE = re.compile(
+    r"\b(change|modify|update|different|another|instead|other|search|cancel|tomorrow|today|tonight|"
+    r"for\s+\d+|people|persons|pax|guests|\d{1,2}\s*(?:am|pm)|\d{1,2}:\d{2})\b",
+    re.IGNORECASE,
+)
+
+
+class IntentRouter:
+    """Rule-based router for turns that don't need the model.
+
+    route() returns {"function", "arguments", "confidence", "rule"} for the
+    best matching rule, or None. Only decisions at or above `threshold` are
+    meant to bypass the LLM; everything else falls through to it.
+    Counters for turns seen and turns routed are kept in `stats`.
+    """
+
+    def __init__(self, threshold=0.8, store=None):
+        self.threshold = threshold
+        self._store = store
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._routed = Counter()
+
+    def route(self, message, context=None, inference=None):
+        """Decide whether `message` can be answered by a tool directly.
+
+        Args:
+            message: The raw user message
+            context: ConversationManager.context
+            inference: Heuristic extraction (restaurant_index, customer_name,
+                phone, special_requests) from the manager's helpers
+        """
+        decision = self._best_rule(message or "", context or {}, inference or {})
+        with self._lock:
+            self._turns += 1
+            if decision and decision["confidence"] >= self.threshold:
+                self._routed[decision["function"]] += 1
+            else:
+                decision = None
+        return decision
+
+    @property
+    def stats(self):
+        """{"turns", "fast_path", "skip_rate", "by_function"}"""
+        with self._lock:
+            routed = sum(self._routed.values())
+            return {
+                "turns": self._turns,
+                "fast_path": routed,
+                "skip_rate": routed / self._turns if self._turns else 0.0,
+                "by_function": dict(self._routed),
+            }
+
+    def _best_rule(self, message, context, inference):
+        candidates = [
+            self._reservation_by_id(message),
+            self._cancel_by_phone(message),
+            self._select_restaurant(message, context, inference),
+        ]
+        candidates = [c for c in candidates if c]
+        return max(candidates, key=lambda c: c["confidence"]) if candidates else None
+
+    def _reservation_by_id(self, message):
+        m = CONFIRMATION_ID_RE.search(message)
+        if not m:
+            return None
+        confirmation_id = m.group(0).upper()
+        rest = (message[:m.start()] + message[m.end():]).strip(" .,!?")
+
+        if CANCEL_RE.search(message):
+            confidence = 0.3 if NEGATION_RE.search(message) else 0.95
+            return _decision("cancel_reservation", {"reservation_id": confirmation_id}, confidence, "cancel_by_id")
+        if not rest or LOOKUP_RE.search(rest):
+            return _decision("find_reservation", {"phone_or_id": confirmation_id}, 0.9, "find_by_id")
+        return _decision("find_reservation", {"phone_or_id": confirmation_id}, 0.5, "id_in_free_text")
+
+    def _cancel_by_phone(self, message):
+        m = PHONE_RE.search(message)
+        if not m or not CANCEL_RE.search(message):
+            return None
+        # Only unambiguous when the phone has a single booking left to cancel; otherwise the model asks which one
+        store = self._store or get_reservation_store()
+        now = datetime.now()
+        upcoming = [r for r in store.find_by_phone(m.group(1)) if r.get("status") == "confirmed" and _is_upcoming(r, now)]
+        if len(upcoming) != 1:
+            return None
+        confidence = 0.3 if NEGATION_RE.search(message) else 0.85
+        return _decision("cancel_reservation", {"reservation_id": upcoming[0]["confirmation_id"]}, confidence, "cancel_by_phone")
+
+    def _select_restaurant(self, message, context, inference):
+        options = context.get("available_options") or []
+        index = inference.get("restaurant_index")
+        if not options or index is None or not (0 <= index < len(options)):
+            return None
+
+        phone = inference.get("phone")
+        name = (inference.get("customer_name") or "").strip()
+        if not (isinstance(phone, str) and phone.isdigit() and len(phone) == 10):
+            return None
+        if not name or " and " in name.lower():
+            return None
+
+        # Strip the parts we understood; whatever is left decides how sure we are
+        leftover = PHONE_RE.sub(" ", message)
+        confidence = 0.9
+        if NEW_REQUEST_RE.search(leftover):
+            confidence = 0.4
+        elif len(leftover.split()) > 12:
+            confidence = 0.6
+
+        arguments = {
+            "restaurant_index": index,
+            "customer_name": name,
+            "phone": phone,
+            "special_requests": inference.get("special_requests", ""),
+        }
+        return _decision("select_restaurant", arguments, confidence, "select_with_details")
+
+
+def _decision(function, arguments, confidence, rule):
+    return {"function": function, "arguments": arguments, "confidence": confidence, "rule": rule}
+
+
+def _is_upcoming(reservation, now):
+    try:
+        starts = datetime.strptime(f"{reservation.get('date')} {reservation.get('time')}", "%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return False
+    return starts >= now
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router():
+    """Process-wide router, so the fast-path counters cover every session"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter(settings.ROUTER_CONFIDENCE_THRESHOLD)
+    return _router
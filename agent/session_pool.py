@@ -0,0 +1,190 @@
+"""
+Session Pool
+Many lightweight conversation sessions served by one process
+"""
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from config.settings import settings
+from agent.conversation_manager import ConversationManager
+from utils.session_store import SessionStore
+from utils.log import get_logger
+from utils.tracing import span
+
+log = get_logger(__name__)
+
+
+class _Session:
+    __slots__ = ("manager", "lock", "last_used")
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    """LRU + TTL pool of ConversationManagers keyed by session ID.
+
+    Managers share the process-wide LLM client, router, catalog and
+    reservation store, so a session costs only its context and history.
+    Sessions idle for `ttl_seconds` or pushed out by `max_sessions` are
+    saved to `store` and dropped from memory; the next message for that ID
+    restores them. Messages for the same session are handled one at a time.
+    """
+
+    def __init__(self, max_sessions=500, ttl_seconds=1800, store=None, llm=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self.llm = llm
+        self._sessions = OrderedDict()
+        self._saving = {}  # evicted sessions whose state is still being written
+        self._loading = {}  # session ID -> Event set once its saved state has been read
+        self._lock = threading.Lock()
+        self._restored = 0
+        self._evicted = 0
+
+    def _session(self, session_id):
+        while True:
+            with self._lock:
+                session = self._live(session_id)
+                if session is not None:
+                    return session
+                loading = self._loading.get(session_id)
+                if loading is None:
+                    loading = self._loading[session_id] = threading.Event()
+                    break
+            # Another request is reading this session from disk; use its result
+            loading.wait()
+
+        # Read saved state without holding the pool lock, so other sessions aren't held up
+        try:
+            state = self.store.load(session_id) if self.store else None
+            if state is not None:
+                manager = ConversationManager.from_state(state, llm=self.llm)
+            else:
+                manager = ConversationManager(llm=self.llm)
+        except BaseException:
+            with self._lock:
+                del self._loading[session_id]
+            loading.set()
+            raise
+
+        session = _Session(manager)
+        with self._lock:
+            del self._loading[session_id]
+            self._sessions[session_id] = session
+            if state is not None:
+                self._restored += 1
+            evicted = self._over_limit()
+        loading.set()
+        self._persist(evicted)
+        return session
+
+    def _live(self, session_id):
+        """The in-memory session for `session_id`, or None (caller holds the lock)"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            return session
+        session = self._saving.pop(session_id, None)
+        if session is not None:
+            # Evicted but not yet written out; take it back rather than reading stale state
+            session.last_used = time.monotonic()
+            self._sessions[session_id] = session
+        return session
+
+    def _over_limit(self):
+        """Pop expired and least-recently-used sessions (caller holds the lock)"""
+        evicted = []
+        now = time.monotonic()
+        for session_id in list(self._sessions):
+            if now - self._sessions[session_id].last_used <= self.ttl_seconds:
+                break
+            evicted.append((session_id, self._sessions.pop(session_id)))
+        while len(self._sessions) > self.max_sessions:
+            evicted.append(self._sessions.popitem(last=False))
+        self._evicted += len(evicted)
+        self._saving.update(evicted)
+        return evicted
+
+    def _persist(self, evicted):
+        if not self.store:
+            with self._lock:
+                for session_id, _ in evicted:
+                    self._saving.pop(session_id, None)
+            return
+        for session_id, session in evicted:
+            # Wait for an in-flight turn so its result is saved too
+            with session.lock:
+                try:
+                    self.store.save(session_id, session.manager.to_state())
+                except Exception:
+                    log.exception("Error saving session %s", session_id)
+            with self._lock:
+                if self._saving.get(session_id) is session:
+                    del self._saving[session_id]
+
+    def process_message(self, session_id, message):
+        """Handle one user message for `session_id` and return the reply"""
+        with span("request"):
+            while True:
+                session = self._session(session_id)
+                with session.lock:
+                    with self._lock:
+                        # Evicted (and possibly saved) between lookup and lock: its manager is orphaned
+                        current = self._live(session_id) is session
+                    if current:
+                        reply = session.manager.process_message(message)
+                        break
+        session.last_used = time.monotonic()
+        return reply
+
+    def reset(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._saving.pop(session_id, None)
+        if self.store:
+            self.store.delete(session_id)
+
+    def evict_expired(self):
+        """Save and drop idle sessions; returns how many were evicted"""
+        with self._lock:
+            evicted = self._over_limit()
+        self._persist(evicted)
+        return len(evicted)
+
+    def close(self):
+        """Save every live session"""
+        with self._lock:
+            evicted = list(self._sessions.items())
+            self._sessions.clear()
+        self._persist(evicted)
+
+    @property
+    def stats(self):
+        """{"active", "restored", "evicted"}"""
+        with self._lock:
+            return {"active": len(self._sessions), "restored": self._restored, "evicted": self._evicted}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """Process-wide session pool for server mode; sessions are saved on exit"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SessionPool(
+                    max_sessions=settings.MAX_SESSIONS,
+                    ttl_seconds=settings.SESSION_TTL_SECONDS,
+                    store=SessionStore(settings.SESSIONS_DIR),
+                )
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,81 @@
+"""
+Tool Result Encoding
+Compact, schema-driven serialization of tool results for history and model input
+"""
+import json
+
+# Fields each tool result exposes to the model. Everything else (addresses,
+# phone numbers, features, full reservation rows) stays server-side: search
+# results remain in context["available_options"], addressable by index.
+RESTAURANT_FIELDS = ("restaurant_id", "name", "location")
+BOOKING_FIELDS = ("restaurant_name", "date", "time", "party_size")
+
+
+def _restaurant(index, r):
+    out = {"i": index}
+    for key in RESTAURANT_FIELDS:
+        if r.get(key) is not None:
+            out[key] = r[key]
+    if r.get("available_times"):
+        out["slots"] = r["available_times"]
+    if r.get("distance_km") is not None:
+        out["km"] = r["distance_km"]
+    return out
+
+
+def _search(result):
+    out = {"restaurants": [_restaurant(i, r) for i, r in enumerate(result.get("restaurants") or [])]}
+    for key in ("matched_location", "nearby_alternatives", "note"):
+        if result.get(key):
+            out[key] = result[key]
+    return out
+
+
+def _booking(result):
+    out = {"confirmation_id": result.get("confirmation_id"), "status": result.get("status")}
+    details = result.get("booking_details") or {}
+    out.update({k: details[k] for k in BOOKING_FIELDS if details.get(k) is not None})
+    return out
+
+
+def _update(result):
+    return {"confirmation_id": result.get("confirmation_id"), **(result.get("updated_details") or {})}
+
+
+def _cancel(result):
+    return {"confirmation_id": result.get("confirmation_id"), "status": result.get("status")}
+
+
+def _find(result):
+    return {"found": bool(result)}
+
+
+ENCODERS = {
+    "search_restaurants": _search,
+    "select_restaurant": _booking,
+    "select_restaurant_and_book": _booking,
+    "create_reservation": _booking,
+    "update_reservation": _update,
+    "cancel_reservation": _cancel,
+    "find_reservation": _find,
+}
+
+
+def compact_tool_result(function_name, result):
+    """The model-facing subset of a tool result (a dict)"""
+    if isinstance(result, dict) and "error" in result:
+        return {"error": result["error"]}
+    encoder = ENCODERS.get(function_name)
+    if encoder is None:
+        return result if isinstance(result, dict) else {"result": result}
+    return encoder(result)
+
+
+def encode_tool_result(function_name, result):
+    """Minified JSON of compact_tool_result, for the tool message stored in history"""
+    return json.dumps(
+        compact_tool_result(function_name, result),
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
@@ -42,7 +42,7 @@ if "conversation_manager" not in st.session_state:
         st.session_state.conversation_manager = ConversationManager()
     except ValueError as e:
         st.error(f"❌ Configuration Error: {e}")
-        st.info("Please set TOGETHER_API_KEY in your .env file")
+        st.info("Please set TOGETHER_API_KEY in your .env file, or LLM_PROVIDER=stub to run offline")
         st.stop()
 
 if "messages" not in st.session_state:
@@ -74,16 +74,24 @@ if prompt := st.chat_input("Type your message..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
     
     with st.chat_message("assistant"):
-        with st.spinner("🤔 Thinking..."):
-            try:
+        placeholder = st.empty()
+        placeholder.markdown("🤔 Thinking...")
+        try:
+            if settings.LLM_STREAMING:
+                # Render tokens as they arrive instead of waiting for the full reply
+                response = ""
+                for chunk in st.session_state.conversation_manager.process_message_stream(prompt):
+                    response += chunk
+                    placeholder.markdown(response + "▌")
+            else:
                 response = st.session_state.conversation_manager.process_message(prompt)
-                st.markdown(response)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                
-            except Exception as e:
-                error_msg = f"❌ Sorry, I encountered an error: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            placeholder.markdown(response)
+            st.session_state.messages.append({"role": "assistant", "content": response})
+            
+        except Exception as e:
+            error_msg = f"❌ Sorry, I encountered an error: {str(e)}"
+            placeholder.error(error_msg)
+            st.session_state.messages.append({"role": "assistant", "content": error_msg})
 
 with st.sidebar:
     st.header("About GoodFoods")
@@ -115,16 +123,15 @@ with st.sidebar:
     st.header("System Stats")
     
     try:
-        from utils.database import load_restaurants, load_reservations
+        from utils.database import load_restaurants, get_reservation_store
         restaurants = load_restaurants()
-        reservations = load_reservations()
-        active_reservations = [r for r in reservations if r.get("status") == "confirmed"]
+        active_reservations = get_reservation_store().count(status="confirmed")
         
         col1, col2 = st.columns(2)
         with col1:
             st.metric("🏪 Locations", len(restaurants))
         with col2:
-            st.metric("📅 Active Bookings", len(active_reservations))
+            st.metric("📅 Active Bookings", active_reservations)
             
     except Exception:
         pass
@@ -0,0 +1,46 @@
+"""
+Benchmark Datasets
+Seeded synthetic restaurants.json / reservations.json files (utils.synthetic_data), cached between runs
+"""
+import json
+import os
+from datetime import date
+
+from utils import synthetic_data
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+SAMPLE_SIZE = 500
+
+
+def build(n_restaurants, n_reservations, seed=7, days=60):
+    """Paths (restaurants, reservations) for this dataset, generating it on first use.
+
+    Also returns a seeded sample of confirmed, upcoming confirmation IDs for
+    lookup/cancel conversations.
+    """
+    key = f"r{n_restaurants}-b{n_reservations}-s{seed}-d{days}-{date.today().isoformat()}"
+    directory = os.path.join(CACHE_DIR, key)
+    restaurants_path = os.path.join(directory, "restaurants.json")
+    reservations_path = os.path.join(directory, "reservations.json")
+    sample_path = os.path.join(directory, "sample_ids.json")
+    if not os.path.exists(sample_path):
+        os.makedirs(directory, exist_ok=True)
+        restaurants = synthetic_data.generate_restaurants(n_restaurants, seed=seed)
+        synthetic_data.write_restaurants(restaurants_path, restaurants)
+        reservations = synthetic_data.iter_reservations(restaurants, n_reservations, seed=seed, days=days)
+        sample = []
+        synthetic_data.write_reservations_json(reservations_path, _sampled(reservations, sample, n_reservations))
+        with open(sample_path, "w") as f:
+            json.dump(sample, f)
+    with open(sample_path) as f:
+        return restaurants_path, reservations_path, json.load(f)
+
+
+def _sampled(reservations, sample, n):
+    """Pass reservations through, collecting every k-th confirmed upcoming ID into `sample`"""
+    every = max(1, n // (2 * SAMPLE_SIZE))
+    today = date.today().isoformat()
+    for i, record in enumerate(reservations):
+        if i % every == 0 and record["status"] == "confirmed" and record["date"] >= today:
+            sample.append(record["confirmation_id"])
+        yield record
@@ -0,0 +1,307 @@
+"""
+End-to-End Conversation Benchmark
+Scripted booking, lookup and cancel conversations through ConversationManager.process_message
+with the stub LLM provider, over synthetic datasets of increasing size
+
+Each scenario runs in a fresh subprocess (so memory figures are per dataset) against a scratch
+copy of its dataset. Results are written to benchmarks/results/<commit>.json; compare two runs with
+--compare.
+
+Usage: python -m benchmarks.e2e [--full] [--backend json|sqlite] [--conversations 300]
+       python -m benchmarks.e2e --compare benchmarks/results/<a>.json benchmarks/results/<b>.json
+"""
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Marks the worker's result line; application logging shares its stdout
+RESULT_PREFIX = "E2E-RESULT "
+
+# (restaurants, reservations)
+SCENARIOS = [(50, 10_000), (500, 100_000)]
+FULL_SCENARIOS = SCENARIOS + [(5_000, 1_000_000)]
+
+STORE_METHODS = ("all", "get", "find", "find_by_phone", "for_restaurant_date", "slot_version", "slot_snapshot", "count", "add", "update")
+PERSISTENCE_METHODS = ("append", "update", "rewrite")
+
+
+class StageTimer:
+    """Accumulates wall time per stage for the current turn"""
+
+    def __init__(self):
+        self.turn = {}
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.turn[stage] = self.turn.get(stage, 0.0) + time.perf_counter() - started
+        return timed
+
+    def take(self):
+        turn, self.turn = self.turn, {}
+        return turn
+
+
+def _memory_kb():
+    """(current RSS, peak RSS) in KiB"""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+    except (OSError, KeyError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak, peak
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"n": 0}
+    samples = sorted(samples)
+    pct = lambda p: samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+    return {
+        "n": len(samples),
+        "p50": round(pct(50), 3),
+        "p95": round(pct(95), 3),
+        "p99": round(pct(99), 3),
+        "mean": round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+def _conversations(rng, count, locations, sample_ids):
+    """[(kind, [messages])], an even mix of bookings, lookups and cancellations"""
+    ids = list(sample_ids)
+    rng.shuffle(ids)
+    out = []
+    for n in range(count):
+        kind = ("booking", "lookup", "cancel")[n % 3]
+        if kind == "booking" or not ids:
+            party = rng.choice([2, 2, 3, 4, 6])
+            out.append(("booking", [
+                f"Book a table for {party} in {rng.choice(locations).lower()}",
+                f"I'm Guest{n}, {9000000000 + n}",
+            ]))
+        elif kind == "lookup":
+            out.append(("lookup", [f"Check reservation {ids[n % len(ids)]}"]))
+        else:
+            # Cancelled IDs are popped so each one is cancelled once
+            out.append(("cancel", [f"Please cancel {ids.pop()}"]))
+    return out
+
+
+def run_scenario(n_restaurants, n_reservations, backend, conversations, seed):
+    """Worker body: one dataset, one process. Returns the scenario's result dict."""
+    from benchmarks import datasets
+    from config.settings import settings
+
+    restaurants_path, reservations_path, sample_ids = datasets.build(n_restaurants, n_reservations, seed=seed)
+    scratch = tempfile.mkdtemp(prefix="gf-e2e-")
+    try:
+        shutil.copy(reservations_path, os.path.join(scratch, "reservations.json"))
+        settings.RESTAURANTS_DB = restaurants_path
+        settings.RESERVATIONS_DB = os.path.join(scratch, "reservations.json")
+        settings.RESERVATIONS_JOURNAL = os.path.join(scratch, "reservations.journal")
+        settings.SQLITE_DB = os.path.join(scratch, "reservations.db")
+        settings.SESSIONS_DIR = os.path.join(scratch, "sessions")
+        settings.STORAGE_BACKEND = backend
+        # Every turn should reach the provider; cached decisions would hide the LLM stage
+        settings.LLM_CACHE_ENABLED = False
+
+        from agent.conversation_manager import ConversationManager
+        from agent.llm_client import LLMClient
+        from agent.providers import StubProvider
+        from utils.database import get_reservation_store, get_restaurant_catalog
+
+        rss_start, _ = _memory_kb()
+        timer = StageTimer()
+
+        started = time.perf_counter()
+        store = get_reservation_store()
+        store_load = time.perf_counter() - started
+        started = time.perf_counter()
+        catalog = get_restaurant_catalog()
+        locations = sorted({r["location"] for r in catalog.all()})
+        catalog_load = time.perf_counter() - started
+        rss_loaded, _ = _memory_kb()
+
+        for name in STORE_METHODS:
+            if hasattr(store, name):
+                setattr(store, name, timer.wrap("storage", getattr(store, name)))
+        persistence = getattr(store, "persistence", None)
+        for name in PERSISTENCE_METHODS:
+            if persistence is not None and hasattr(persistence, name):
+                setattr(persistence, name, timer.wrap("storage_io", getattr(persistence, name)))
+
+        provider = StubProvider(settings.LLM_STUB_SCRIPT)
+        provider.complete = timer.wrap("llm", provider.complete)
+        llm = LLMClient(provider=provider)
+
+        turns = {}
+        stages = {}
+        outcomes = {}
+        script = _conversations(random.Random(seed), conversations, locations, sample_ids)
+        confirmed_before = store.count(status="confirmed")
+        wall_started = time.perf_counter()
+        # Anything the conversation path prints stays off the harness output
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for kind, messages in script:
+                manager = ConversationManager(llm=llm)
+                manager._dispatch_tool = timer.wrap("tool", manager._dispatch_tool)
+                reply = ""
+                for message in messages:
+                    started = time.perf_counter()
+                    reply = manager.process_message(message)
+                    elapsed = time.perf_counter() - started
+                    turns.setdefault(kind, []).append(elapsed)
+                    turns.setdefault("all", []).append(elapsed)
+                    for stage, spent in timer.take().items():
+                        stages.setdefault(stage, []).append(spent)
+                ok = "✅" in reply or "found" in reply.lower() or "cancelled" in reply.lower()
+                outcomes.setdefault(kind, {"ok": 0, "failed": 0})["ok" if ok else "failed"] += 1
+        wall = time.perf_counter() - wall_started
+        booked = store.count(status="confirmed") - confirmed_before
+
+        rss_end, rss_peak = _memory_kb()
+        store.close()
+        return {
+            "name": f"{n_restaurants}r-{n_reservations}b-{backend}",
+            "restaurants": n_restaurants,
+            "reservations": n_reservations,
+            "backend": backend,
+            "conversations": len(script),
+            "turns_per_second": round(len(turns.get("all", [])) / wall, 1) if wall else None,
+            "net_confirmed_change": booked,
+            "outcomes": outcomes,
+            "turn_latency_ms": {kind: _percentiles(samples) for kind, samples in turns.items()},
+            # Per turn, over the turns that reached the stage at all
+            "stage_latency_ms": {stage: _percentiles(samples) for stage, samples in stages.items()},
+            "load_ms": {"reservations": round(store_load * 1000, 1), "catalog": round(catalog_load * 1000, 1)},
+            "memory_mb": {
+                "rss_before_load": round(rss_start / 1024, 1),
+                "rss_after_load": round(rss_loaded / 1024, 1),
+                "rss_end": round(rss_end / 1024, 1),
+                "rss_peak": round(rss_peak / 1024, 1),
+            },
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _git_revision():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return sha, dirty
+
+
+def run_all(scenarios, backend, conversations, seed, output=None):
+    sha, dirty = _git_revision()
+    results = {
+        "commit": sha,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": {"backend": backend, "conversations": conversations, "seed": seed},
+        "scenarios": [],
+    }
+    for n_restaurants, n_reservations in scenarios:
+        spec = json.dumps([n_restaurants, n_reservations, backend, conversations, seed])
+        print(f"running {n_restaurants} restaurants / {n_reservations:,} reservations ({backend})...", flush=True)
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.e2e", "--worker", spec],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:])
+            raise SystemExit(f"scenario {n_restaurants}/{n_reservations} failed")
+        scenario = json.loads(next(line for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX))[len(RESULT_PREFIX):])
+        results["scenarios"].append(scenario)
+        _print_scenario(scenario)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = output or os.path.join(RESULTS_DIR, f"{sha}{'-dirty' if dirty else ''}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {output}")
+
+
+def _print_scenario(s):
+    print(f"  {s['name']}: {s['conversations']} conversations, {s['turns_per_second']} turns/s, "
+          f"load {s['load_ms']['reservations']:.0f} ms, rss {s['memory_mb']['rss_after_load']} MB "
+          f"(peak {s['memory_mb']['rss_peak']} MB)")
+    for label, table in (("turn", s["turn_latency_ms"]), ("stage", s["stage_latency_ms"])):
+        for key, p in sorted(table.items()):
+            if p.get("n"):
+                print(f"    {label} {key:<11} p50={p['p50']:8.3f} p95={p['p95']:8.3f} p99={p['p99']:8.3f} ms  (n={p['n']})")
+    print(f"    outcomes {s['outcomes']}")
+
+
+def compare(path_a, path_b):
+    """Side-by-side p50/p95/p99 and memory for two result files"""
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+    print(f"{a['commit']}{'-dirty' if a['dirty'] else ''} -> {b['commit']}{'-dirty' if b['dirty'] else ''}")
+    before = {s["name"]: s for s in a["scenarios"]}
+    for s in b["scenarios"]:
+        old = before.get(s["name"])
+        if old is None:
+            print(f"\n{s['name']}: not in {path_a}")
+            continue
+        print(f"\n{s['name']}")
+        for table in ("turn_latency_ms", "stage_latency_ms"):
+            for key in sorted(set(old[table]) | set(s[table])):
+                for p in ("p50", "p95", "p99"):
+                    x, y = old[table].get(key, {}).get(p), s[table].get(key, {}).get(p)
+                    print(f"  {table.split('_')[0]:<5} {key:<11} {p}  {_delta(x, y)}")
+        for key in ("rss_after_load", "rss_peak"):
+            print(f"  memory {key:<15} {_delta(old['memory_mb'][key], s['memory_mb'][key], 'MB')}")
+        print(f"  load   reservations    {_delta(old['load_ms']['reservations'], s['load_ms']['reservations'])}")
+
+
+def _delta(x, y, unit="ms"):
+    if x is None or y is None:
+        return f"{x} -> {y}"
+    change = f"{(y - x) / x * 100:+.1f}%" if x else "n/a"
+    return f"{x:10.3f} -> {y:10.3f} {unit}  ({change})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--full", action="store_true", help="include the 5,000 restaurant / 1M reservation dataset")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--conversations", type=int, default=300, help="per scenario, split evenly by type")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(RESULT_PREFIX + json.dumps(run_scenario(*json.loads(args.worker))), flush=True)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        run_all(FULL_SCENARIOS if args.full else SCENARIOS, args.backend, args.conversations, args.seed, args.output)
+
+
+if __name__ == "__main__":
+    main()
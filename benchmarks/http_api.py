@@ -0,0 +1,104 @@
+"""
+HTTP Chat API Load Test
+Booking throughput through server.py with the scripted stub LLM provider and a scratch copy of the data
+
+Usage: python -m benchmarks.http_api [--sessions 200] [--concurrency 50] [--llm-latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from agent.llm_client import LLMClient
+from agent.providers import StubProvider
+from config.settings import settings
+
+
+def _use_scratch_data(directory):
+    """Point the stores at a copy of the data so the benchmark never touches data/"""
+    shutil.copy(settings.RESERVATIONS_DB, os.path.join(directory, "reservations.json"))
+    settings.RESERVATIONS_DB = os.path.join(directory, "reservations.json")
+    settings.RESERVATIONS_JOURNAL = os.path.join(directory, "reservations.journal")
+    settings.SQLITE_DB = os.path.join(directory, "reservations.db")
+    settings.SESSIONS_DIR = os.path.join(directory, "sessions")
+
+
+async def _conversation(http, base_url, n, location, latencies, statuses):
+    session_id = f"bench-{n}"
+    turns = (
+        f"Book a table in {location} at 8pm for 2 tomorrow",
+        f"The first one please. I'm Guest{n}, {9000000000 + n}",
+    )
+    for message in turns:
+        started = time.perf_counter()
+        async with http.post(f"{base_url}/chat", json={"session_id": session_id, "message": message}) as resp:
+            await resp.read()
+            statuses[resp.status] = statuses.get(resp.status, 0) + 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(sessions, concurrency, llm_latency_ms, max_concurrency, max_pending):
+    from agent.session_pool import SessionPool
+    from server import create_app
+    from utils.database import get_restaurant_catalog, get_reservation_store
+    from utils.session_store import SessionStore
+
+    llm = LLMClient(provider=StubProvider(settings.LLM_STUB_SCRIPT, latency_ms=llm_latency_ms))
+    pool = SessionPool(store=SessionStore(settings.SESSIONS_DIR), llm=llm)
+    app = create_app(pool, max_concurrency=max_concurrency, max_pending=max_pending)
+    runner = web.AppRunner(app, keepalive_timeout=settings.API_KEEPALIVE_SECONDS)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    locations = sorted({r["location"] for r in get_restaurant_catalog().all()})
+    booked_before = get_reservation_store().count(status="confirmed")
+    latencies, statuses = [], {}
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def one(n):
+        async with limiter:
+            await _conversation(http, base_url, n, locations[n % len(locations)], latencies, statuses)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as http:
+        await asyncio.gather(*(one(n) for n in range(sessions)))
+    elapsed = time.perf_counter() - started
+    booked = get_reservation_store().count(status="confirmed") - booked_before
+    await runner.cleanup()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    print(f"sessions={sessions} client_concurrency={concurrency} server_workers={max_concurrency} "
+          f"llm_latency={llm_latency_ms}ms")
+    print(f"requests: {len(latencies)} in {elapsed:.2f}s -> {len(latencies) / elapsed:.1f} req/s, "
+          f"{booked / elapsed:.1f} bookings/s ({booked} booked)")
+    print(f"latency ms: p50={pct(50):.1f} p95={pct(95):.1f} p99={pct(99):.1f} "
+          f"mean={statistics.mean(latencies) * 1000:.1f}")
+    print(f"status codes: {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent client conversations")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--server-workers", type=int, default=settings.API_MAX_CONCURRENCY)
+    parser.add_argument("--max-pending", type=int, default=settings.API_MAX_PENDING)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        _use_scratch_data(directory)
+        asyncio.run(run(args.sessions, args.concurrency, args.llm_latency_ms, args.server_workers, args.max_pending))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Tool Result Encoding Benchmark
+Tokens per tool message and per turn: str(tool_result) vs the compact encoding
+
+Usage: python -m benchmarks.tool_encoding
+"""
+import time
+
+from agent.prompt_builder import get_prompt_builder
+from agent.tool_encoding import encode_tool_result
+from utils.database import get_restaurant_catalog
+
+SAMPLE_TIMES = ["19:30", "19:45", "20:00", "20:15", "20:30"]
+
+
+def sample_results(catalog):
+    """(function_name, result) pairs shaped like the real tools' output, one search per city"""
+    samples = []
+    for city in catalog.all_cities():
+        restaurants = [dict(r, available_times=SAMPLE_TIMES) for r in catalog.in_city(city)[:5]]
+        samples.append(("search_restaurants", {"restaurants": restaurants}))
+        if restaurants:
+            samples.append(("select_restaurant", {
+                "confirmation_id": "GF-BAN-251125-AB12",
+                "status": "confirmed",
+                "booking_details": {
+                    "restaurant_name": restaurants[0]["name"],
+                    "date": "2025-11-25",
+                    "time": "20:00",
+                    "party_size": 4,
+                    "special_requests": "",
+                },
+            }))
+    samples.append(("find_reservation", True))
+    samples.append(("search_restaurants", {"restaurants": [], "error": "No restaurants found in Atlantis."}))
+    return samples
+
+
+def run():
+    builder = get_prompt_builder()
+    samples = sample_results(get_restaurant_catalog())
+
+    rows = {}
+    for function_name, result in samples:
+        before = builder.count_tokens(str(result))
+        start = time.perf_counter()
+        encoded = encode_tool_result(function_name, result)
+        elapsed = time.perf_counter() - start
+        after = builder.count_tokens(encoded)
+        row = rows.setdefault(function_name, [0, 0, 0, 0.0])
+        row[0] += 1
+        row[1] += before
+        row[2] += after
+        row[3] += elapsed
+
+    print(f"{'tool':<22}{'n':>5}{'str() tok':>12}{'compact tok':>13}{'saved':>8}{'encode µs':>11}")
+    total_before = total_after = 0
+    for function_name, (n, before, after, elapsed) in rows.items():
+        total_before += before
+        total_after += after
+        print(
+            f"{function_name:<22}{n:>5}{before / n:>12.0f}{after / n:>13.0f}"
+            f"{1 - after / before:>8.0%}{elapsed / n * 1e6:>11.1f}"
+        )
+    print(f"{'all':<22}{len(samples):>5}{total_before:>12}{total_after:>13}{1 - total_after / total_before:>8.0%}")
+
+    # One search turn as the model sees it on the following turn
+    function_name, result = samples[0]
+    history = [
+        {"role": "user", "content": "Table for 4 tomorrow at 8pm in Bandra please"},
+        {"role": "assistant", "content": "Calling search_restaurants with location=Bandra"},
+        None,
+        {"role": "user", "content": "The first one. I'm Asha, 9876543210"},
+    ]
+    context = {"available_options": result["restaurants"], "party_size": 4, "date": "2025-11-25", "time": "20:00"}
+    for label, content in (("str()", str(result)), ("compact", encode_tool_result(function_name, result))):
+        history[2] = {"role": "tool", "tool_call_id": None, "content": content}
+        _, _, prompt_tokens = builder.build(history, context)
+        print(f"next-turn prompt tokens ({label}): {prompt_tokens}")
+    tokenizer = "tiktoken" if builder._encoder is not None else "estimate (tiktoken not installed)"
+    print(f"tokenizer: {tokenizer}")
+
+
+if __name__ == "__main__":
+    run()
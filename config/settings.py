@@ -9,22 +9,87 @@ class Settings:
     
     # API Configuration
     TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
-    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "together")
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "together")  # "together" or "stub" (scripted, offline)
     MODEL_NAME = os.getenv("MODEL_NAME", "meta-llama/Llama-3.3-70B-Instruct-Turbo")
+    TOGETHER_BASE_URL = os.getenv("TOGETHER_BASE_URL", "https://api.together.xyz/v1")
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "True").lower() == "true"
+    LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH")  # append real turns here as stub script rules
+    LLM_STUB_SCRIPT = os.getenv("LLM_STUB_SCRIPT", "data/llm_stub_script.json")
+    LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+    LLM_STUB_JITTER_MS = float(os.getenv("LLM_STUB_JITTER_MS", "0"))
+
+    # LLM Decision Cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))  # 0 disables the fuzzy fallback
+    LLM_CACHE_TOOLS = ("search_restaurants",)
     
+    # Tracing (per-stage spans for each conversation turn; see utils/tracing.py)
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "False").lower() == "true"
+    TRACE_PATH = os.getenv("TRACE_PATH", "data/traces.jsonl")
+    TRACE_FORMAT = os.getenv("TRACE_FORMAT", "jsonl")  # "jsonl" or "otlp" (OpenTelemetry JSON)
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # share of turns traced
+
     # Application Configuration
     APP_TITLE = "GoodFoods AI Reservation Assistant"
     APP_ICON = "🍝"
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+
+    # Logging (see utils/log.py)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if DEBUG else "INFO")
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # per-module overrides: "agent.conversation_manager=DEBUG,tools=WARNING"
+    LOG_FILE = os.getenv("LOG_FILE")  # also write to this file
+    LOG_REDACT_PHONES = os.getenv("LOG_REDACT_PHONES", "True").lower() == "true"
     
     # Database Paths
     RESTAURANTS_DB = "data/restaurants.json"
     RESERVATIONS_DB = "data/reservations.json"
     CONSTRAINTS_DB = "data/booking_constraints.json"
+    LOCATION_ALIASES_DB = "data/location_aliases.json"
+
+    # Location Search
+    FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.5"))
+    NEARBY_ALTERNATIVES = 3
+    NEARBY_MAX_KM = float(os.getenv("NEARBY_MAX_KM", "25"))
+
+    # Reservation Storage Backend ("json" = in-memory store over the JSON files, "sqlite")
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+    SQLITE_DB = os.getenv("SQLITE_DB", "data/reservations.db")
+    SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+
+    # Reservation Persistence for the json backend ("journal" = snapshot + append-only log, "json" = patch file in place)
+    RESERVATIONS_PERSISTENCE = os.getenv("RESERVATIONS_PERSISTENCE", "journal")
+    RESERVATIONS_JOURNAL = "data/reservations.journal"
+    JOURNAL_FSYNC_INTERVAL_MS = int(os.getenv("JOURNAL_FSYNC_INTERVAL_MS", "50"))
+    JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "500"))
+    JOURNAL_SHARED = os.getenv("JOURNAL_SHARED", "True").lower() == "true"  # worker processes share the journal via fcntl locks ("json" persistence is single-process)
+
+    # Group commit: writes are acknowledged once durable, with one fsync per batch (see utils/database.py)
+    WRITE_GROUP_COMMIT = os.getenv("WRITE_GROUP_COMMIT", "True").lower() == "true"
+    WRITE_GROUP_COMMIT_WINDOW_MS = float(os.getenv("WRITE_GROUP_COMMIT_WINDOW_MS", "10"))  # batch window under concurrent writes
     
     # Conversation Settings
     MAX_CONTEXT_TURNS = 10
+    HISTORY_KEEP_MESSAGES = int(os.getenv("HISTORY_KEEP_MESSAGES", "10"))  # older turns are compacted into a summary
+    PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "1500"))
+    PROMPT_TOKEN_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "cl100k_base")
+    ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "True").lower() == "true"
+    ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.8"))
     RESPONSE_TIMEOUT = 30
+    TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "4"))  # tool calls of one response run concurrently
+
+    # Server Mode (many sessions per process)
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "500"))
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+    SESSIONS_DIR = os.getenv("SESSIONS_DIR", "data/sessions")
+
+    # HTTP Chat API (server.py)
+    API_HOST = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT = int(os.getenv("API_PORT", "8080"))
+    API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "32"))  # turns processed at once
+    API_MAX_PENDING = int(os.getenv("API_MAX_PENDING", "256"))  # waiting requests before 503
+    API_KEEPALIVE_SECONDS = int(os.getenv("API_KEEPALIVE_SECONDS", "75"))
     
     # Business Rules
     MAX_PARTY_SIZE = 20
@@ -34,7 +99,7 @@ class Settings:
     @classmethod
     def validate(cls):
         """Validate required settings"""
-        if not cls.TOGETHER_API_KEY:
+        if cls.LLM_PROVIDER == "together" and not cls.TOGETHER_API_KEY:
             raise ValueError("TOGETHER_API_KEY not set in environment")
         return True
 
@@ -0,0 +1,150 @@
+"""
+GoodFoods Reservation Assistant
+Headless HTTP/JSON chat API (for messaging and voice channels)
+
+    POST /chat                 {"session_id": "...", "message": "..."} -> {"session_id", "response"}
+    POST /sessions/{id}/reset  forget a session
+    GET  /health               pool and load statistics
+
+Run with: python server.py [--host 0.0.0.0] [--port 8080]
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agent.session_pool import get_session_pool
+from config.settings import settings
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+MAX_MESSAGE_CHARS = 2000
+
+
+class ChatAPI:
+    """Request handlers over a SessionPool.
+
+    Conversation turns are blocking (LLM call, tools, storage), so they run
+    on a bounded thread pool of `max_concurrency` workers. At most
+    `max_pending` further requests may wait for a worker; beyond that the
+    server sheds load with 503 + Retry-After instead of queueing without
+    bound.
+    """
+
+    def __init__(self, pool, max_concurrency=32, max_pending=256):
+        self.pool = pool
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="chat")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._in_flight = 0
+        self._served = 0
+        self._rejected = 0
+
+    async def chat(self, request):
+        try:
+            body = await request.json()
+        except Exception:
+            return _error(400, "Body must be JSON")
+        session_id = body.get("session_id")
+        message = body.get("message")
+        if not isinstance(session_id, str) or not session_id.strip():
+            return _error(400, "session_id is required")
+        if not isinstance(message, str) or not message.strip():
+            return _error(400, "message is required")
+        if len(message) > MAX_MESSAGE_CHARS:
+            return _error(413, f"message is longer than {MAX_MESSAGE_CHARS} characters")
+
+        if self._waiting >= self.max_pending:
+            self._rejected += 1
+            return _error(503, "Server busy, please retry", headers={"Retry-After": "1"})
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            reply = await loop.run_in_executor(self._executor, self.pool.process_message, session_id, message)
+        except Exception:
+            log.exception("Error handling message for session %s", session_id)
+            return _error(500, "Internal error")
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+        self._served += 1
+        return web.json_response({"session_id": session_id, "response": reply})
+
+    async def reset(self, request):
+        session_id = request.match_info["session_id"]
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.pool.reset, session_id)
+        return web.json_response({"session_id": session_id, "reset": True})
+
+    async def health(self, request):
+        return web.json_response({
+            "status": "ok",
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "served": self._served,
+            "rejected": self._rejected,
+            "sessions": self.pool.stats,
+        })
+
+    async def _evict_loop(self, app):
+        """Save and drop idle sessions once a minute"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(60)
+            await loop.run_in_executor(self._executor, self.pool.evict_expired)
+
+    async def _start_background(self, app):
+        app["evictor"] = asyncio.create_task(self._evict_loop(app))
+
+    async def _shutdown(self, app):
+        app["evictor"].cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.pool.close)
+        self._executor.shutdown(wait=True)
+
+
+def _error(status, message, headers=None):
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+def create_app(pool=None, max_concurrency=None, max_pending=None):
+    """aiohttp application serving `pool` (default: the process-wide session pool)"""
+    api = ChatAPI(
+        pool or get_session_pool(),
+        max_concurrency=max_concurrency or settings.API_MAX_CONCURRENCY,
+        max_pending=settings.API_MAX_PENDING if max_pending is None else max_pending,
+    )
+    app = web.Application(client_max_size=64 * 1024)
+    app["api"] = api
+    app.router.add_post("/chat", api.chat)
+    app.router.add_post("/sessions/{session_id}/reset", api.reset)
+    app.router.add_get("/health", api.health)
+    app.on_startup.append(api._start_background)
+    app.on_shutdown.append(api._shutdown)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GoodFoods chat API")
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port, keepalive_timeout=settings.API_KEEPALIVE_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
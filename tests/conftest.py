@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# Keep test runs quiet and importable from any working directory
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_reservation():
+    """Reservation dicts shaped like create_reservation's, with overridable fields"""
+    counter = iter(range(1, 1_000_000))
+
+    def make(**fields):
+        n = next(counter)
+        record = {
+            "confirmation_id": f"GF-MUM-300101-{n:04X}",
+            "restaurant_id": "R001",
+            "restaurant_name": "GoodFoods Bandra",
+            "customer_name": f"Guest {n}",
+            "phone": f"98765{n:05d}",
+            "date": "2030-01-01",
+            "time": "19:00",
+            "party_size": 2,
+            "special_requests": "",
+            "status": "confirmed",
+            "created_at": "2029-12-01T10:00:00.000001",
+        }
+        record.update(fields)
+        return record
+
+    return make
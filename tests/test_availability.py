@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from utils.availability import AvailabilityEngine, SlotBusy
+from utils.reservation_store import ReservationStore
+from utils.sqlite_store import SQLiteReservationStore
+
+RESTAURANT = {"restaurant_id": "R001", "seating_capacity": 10, "operating_hours": "11:00-23:00"}
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        store = ReservationStore(str(tmp_path / "reservations.json"))
+    else:
+        store = SQLiteReservationStore(str(tmp_path / "reservations.db"))
+    yield store
+    store.close()
+
+
+def _seated(store):
+    return sum(r["party_size"] for r in store.all() if r["status"] == "confirmed")
+
+
+def test_booking_fits_until_the_slot_is_full(store, make_reservation):
+    engine = AvailabilityEngine(store, turnover_minutes=90)
+
+    assert engine.reserve_seats(RESTAURANT, make_reservation(party_size=6)) is not None
+    assert engine.reserve_seats(RESTAURANT, make_reservation(party_size=4, time="19:30")) is not None
+    # Overlaps both bookings' turnover
+    assert engine.reserve_seats(RESTAURANT, make_reservation(party_size=1, time="20:00")) is None
+    # Starts after the first two have left
+    assert engine.reserve_seats(RESTAURANT, make_reservation(party_size=10, time="21:00")) is not None
+    assert store.count() == 3
+
+
+def test_write_against_a_stale_slot_version_is_rejected(store, make_reservation):
+    version = store.slot_version("R001", "2030-01-01")
+    assert store.add(make_reservation(), expected_version=version) is not None
+    assert store.add(make_reservation(), expected_version=version) is None
+    assert store.count() == 1
+
+    other_day = store.slot_version("R001", "2030-01-02")
+    assert store.add(make_reservation(date="2030-01-02"), expected_version=other_day) is not None
+
+
+def test_concurrent_bookings_never_exceed_capacity(store, make_reservation):
+    engine = AvailabilityEngine(store, turnover_minutes=90)
+    requests = [make_reservation(party_size=3) for _ in range(12)]
+    outcomes = []
+
+    def book(reservation):
+        try:
+            outcomes.append(engine.reserve_seats(RESTAURANT, reservation))
+        except SlotBusy:
+            outcomes.append(None)
+
+    threads = [threading.Thread(target=book, args=(r,)) for r in requests]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    booked = [r for r in outcomes if r is not None]
+    assert _seated(store) == 3 * len(booked) <= RESTAURANT["seating_capacity"]
+    assert store.count() == len(booked)
+
+
+def test_move_does_not_count_the_reservation_against_itself(store, make_reservation):
+    engine = AvailabilityEngine(store, turnover_minutes=90)
+    current = engine.reserve_seats(RESTAURANT, make_reservation(party_size=8))
+
+    moved = engine.move_seats(RESTAURANT, current, party_size=10)
+    assert moved["party_size"] == 10
+    assert engine.move_seats(RESTAURANT, moved, party_size=11) is None
+    assert store.get(current["confirmation_id"])["party_size"] == 10
+
+
+class RacingStore:
+    """A slot that another writer changes between every read and write"""
+
+    def __init__(self):
+        self.version = 0
+        self.writes = 0
+
+    def slot_version(self, restaurant_id, date):
+        return self.version
+
+    def slot_snapshot(self, restaurant_id, date):
+        return self.version, []
+
+    def add(self, reservation, expected_version=None):
+        self.writes += 1
+        self.version += 1
+        return None
+
+    def update(self, confirmation_id, expected_version=None, **changes):
+        return self.add(changes, expected_version)
+
+
+def test_slot_busy_after_max_attempts(make_reservation):
+    store = RacingStore()
+    engine = AvailabilityEngine(store)
+
+    with pytest.raises(SlotBusy):
+        engine.reserve_seats(RESTAURANT, make_reservation())
+    assert store.writes == AvailabilityEngine.MAX_ATTEMPTS
+
+    with pytest.raises(SlotBusy):
+        engine.move_seats(RESTAURANT, make_reservation(), time="20:00")
+    assert store.writes == 2 * AvailabilityEngine.MAX_ATTEMPTS
+
+
+def test_late_night_bookings_use_the_window_past_midnight(store, make_reservation):
+    late = {"restaurant_id": "R001", "seating_capacity": 10, "operating_hours": "18:00-02:00"}
+    engine = AvailabilityEngine(store, turnover_minutes=60)
+
+    assert engine.reserve_seats(late, make_reservation(time="00:30", party_size=8)) is not None
+    assert engine.seats_free(late, "2030-01-01", "01:00") == 2
+    assert engine.seats_free(late, "2030-01-01", "23:00") == 10
+    # Closed from 02:00 until the next opening
+    assert engine.seats_free(late, "2030-01-01", "03:00") == 0
+    assert engine.seats_free(late, "2030-01-01", "17:45") == 0
+    assert engine.available_times(late, "2030-01-01", "00:00", 2, spread_minutes=30) == ["23:30", "23:45", "00:00", "00:15", "00:30"]
+    assert engine.reserve_seats(late, make_reservation(time="00:45", party_size=4)) is None
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from utils.catalog import RestaurantCatalog
+
+
+def _restaurant(rid, location, city, capacity, lat=19.0, lon=72.8, address=""):
+    return {"restaurant_id": rid, "location": location, "city": city, "address": address,
+            "seating_capacity": capacity, "latitude": lat, "longitude": lon}
+
+
+RESTAURANTS = [
+    _restaurant("M1", "Bandra West", "Mumbai", 30, address="100 Hill Road"),
+    _restaurant("M2", "Bandra East", "Mumbai", 50),
+    _restaurant("M3", "Juhu", "Mumbai", 40),
+    _restaurant("B1", "Koramangala", "Bangalore", 60, lat=12.93, lon=77.62),
+]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "restaurants.json"
+    path.write_text(json.dumps(RESTAURANTS))
+    return path
+
+
+def _ids(restaurants):
+    return [r["restaurant_id"] for r in restaurants]
+
+
+def test_search_matches_location_and_city_substrings_largest_first(catalog_path):
+    catalog = RestaurantCatalog(str(catalog_path))
+
+    assert _ids(catalog.search("Bandra")) == ["M2", "M1"]
+    assert _ids(catalog.search("  bandra   WEST ")) == ["M1"]
+    assert _ids(catalog.search("mumbai")) == ["M2", "M3", "M1"]
+    # Not a whole token: served from the trigram index
+    assert _ids(catalog.search("andr")) == ["M2", "M1"]
+    assert _ids(catalog.search("hill road")) == ["M1"]
+    assert catalog.search("") == []
+
+
+def test_results_are_copies(catalog_path):
+    catalog = RestaurantCatalog(str(catalog_path))
+    catalog.search("Bandra").clear()
+    catalog.in_city("Mumbai").clear()
+
+    assert len(catalog.search("Bandra")) == 2
+    assert _ids(catalog.in_city("mumbai")) == ["M2", "M3", "M1"]
+
+
+def test_catalog_is_rebuilt_when_the_file_changes(catalog_path):
+    catalog = RestaurantCatalog(str(catalog_path))
+    assert catalog.get("P1") is None
+
+    catalog_path.write_text(json.dumps(RESTAURANTS + [_restaurant("P1", "Baner", "Pune", 20, lat=18.56, lon=73.78)]))
+    stat = os.stat(catalog_path)
+    os.utime(catalog_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert catalog.get("P1")["city"] == "Pune"
+    assert catalog.all_cities() == ["Bangalore", "Mumbai", "Pune"]
+
+
+def test_missing_or_corrupt_file_is_an_empty_catalog(tmp_path):
+    assert RestaurantCatalog(str(tmp_path / "missing.json")).all() == []
+    corrupt = tmp_path / "restaurants.json"
+    corrupt.write_text("[{")
+    assert RestaurantCatalog(str(corrupt)).search("Bandra") == []
@@ -0,0 +1,64 @@
+import json
+import random
+
+import pytest
+
+from utils.catalog import RestaurantCatalog
+from utils.geo import KDTree, haversine_km
+
+
+def _brute_force(points, lat, lon, k, accept=None, max_km=None):
+    hits = sorted(
+        (haversine_km(lat, lon, plat, plon), item) for plat, plon, item in points
+        if (accept is None or accept(item))
+    )
+    return [(d, item) for d, item in hits if max_km is None or d <= max_km][:k]
+
+
+def _assert_same(found, expected):
+    assert [item for _, item in found] == [item for _, item in expected]
+    assert [d for d, _ in found] == pytest.approx([d for d, _ in expected], abs=1e-6)
+
+
+def test_nearest_matches_a_linear_scan():
+    rng = random.Random(7)
+    points = [(rng.uniform(-89, 89), rng.uniform(-180, 180), i) for i in range(500)]
+    tree = KDTree(points)
+
+    for _ in range(50):
+        lat, lon = rng.uniform(-89, 89), rng.uniform(-180, 180)
+        _assert_same(tree.nearest(lat, lon, k=5), _brute_force(points, lat, lon, 5))
+        even = lambda i: i % 2 == 0
+        _assert_same(tree.nearest(lat, lon, k=3, accept=even), _brute_force(points, lat, lon, 3, accept=even))
+        _assert_same(tree.nearest(lat, lon, k=5, max_km=1500), _brute_force(points, lat, lon, 5, max_km=1500))
+
+
+def test_neighbours_across_the_antimeridian():
+    tree = KDTree([(0.0, 179.9, "east"), (0.0, -179.9, "west"), (0.0, 170.0, "far")])
+    found = tree.nearest(0.0, 179.95, k=2)
+    assert sorted(item for _, item in found) == ["east", "west"]
+    assert [d for d, _ in found] == pytest.approx([haversine_km(0.0, 179.95, 0.0, 179.9), haversine_km(0.0, 179.95, 0.0, -179.9)])
+
+
+def test_empty_tree_and_zero_k():
+    assert KDTree([]).nearest(19.0, 72.8) == []
+    assert KDTree([(19.0, 72.8, "a")]).nearest(19.0, 72.8, k=0) == []
+
+
+def test_nearby_skips_the_searched_outlets(tmp_path):
+    restaurants = [
+        {"restaurant_id": "M1", "location": "Bandra West", "city": "Mumbai", "latitude": 19.0596, "longitude": 72.8295},
+        {"restaurant_id": "M2", "location": "Bandra East", "city": "Mumbai", "latitude": 19.0620, "longitude": 72.8470},
+        {"restaurant_id": "M3", "location": "Juhu", "city": "Mumbai", "latitude": 19.1075, "longitude": 72.8263},
+        {"restaurant_id": "M4", "location": "Colaba", "city": "Mumbai", "latitude": 18.9067, "longitude": 72.8147},
+        {"restaurant_id": "M5", "location": "Powai", "city": "Mumbai"},
+    ]
+    path = tmp_path / "restaurants.json"
+    path.write_text(json.dumps(restaurants))
+    catalog = RestaurantCatalog(str(path))
+
+    searched = catalog.search("Bandra")
+    assert [r["restaurant_id"] for _, r in catalog.nearby(searched, k=3)] == ["M3", "M4"]
+    assert [r["restaurant_id"] for _, r in catalog.nearby(searched, max_km=10)] == ["M3"]
+    assert catalog.nearby(searched, accept=lambda r: r["restaurant_id"] != "M3") == catalog.nearby(searched)[1:]
+    assert catalog.nearby(catalog.search("Powai")) == []
@@ -0,0 +1,130 @@
+import json
+
+from utils.journal import ReservationJournal
+from utils.reservation_store import ReservationStore
+
+
+def _open(tmp_path, compact_every=500, shared=False):
+    snapshot = str(tmp_path / "reservations.json")
+    journal = ReservationJournal(snapshot, str(tmp_path / "reservations.journal"),
+                                 fsync_interval_ms=5, compact_every=compact_every, shared=shared)
+    return ReservationStore(snapshot, journal)
+
+
+def _journal_lines(tmp_path):
+    path = tmp_path / "reservations.journal"
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_writes_are_replayed_after_restart(tmp_path, make_reservation):
+    store = _open(tmp_path)
+    first, second = make_reservation(), make_reservation()
+    store.add(first)
+    store.add(second)
+    store.update(first["confirmation_id"], status="cancelled")
+    store.close()
+
+    assert len(_journal_lines(tmp_path)) == 3
+    reopened = _open(tmp_path)
+    assert reopened.get(first["confirmation_id"])["status"] == "cancelled"
+    assert reopened.get(second["confirmation_id"]) == second
+    assert reopened.count() == 2
+    assert reopened.count(status="confirmed") == 1
+
+
+def test_torn_final_entry_is_dropped(tmp_path, make_reservation):
+    store = _open(tmp_path)
+    kept = make_reservation()
+    store.add(kept)
+    store.close()
+    with open(tmp_path / "reservations.journal", "a") as f:
+        f.write('{"op": "put", "record": {"confirmation_id": "GF-')
+
+    reopened = _open(tmp_path)
+    assert [r["confirmation_id"] for r in reopened.all()] == [kept["confirmation_id"]]
+    assert len(_journal_lines(tmp_path)) == 1
+
+
+def test_rotation_folds_the_journal_into_the_snapshot(tmp_path, make_reservation):
+    store = _open(tmp_path, compact_every=3)
+    records = [make_reservation() for _ in range(5)]
+    for record in records:
+        store.add(record)
+    store.persistence.wait_for_compaction()
+
+    # The first three entries were rotated out and compacted; the rest are still journaled
+    assert not (tmp_path / "reservations.journal.1").exists()
+    snapshot = json.loads((tmp_path / "reservations.json").read_text())
+    assert [r["confirmation_id"] for r in snapshot] == [r["confirmation_id"] for r in records[:3]]
+    assert len(_journal_lines(tmp_path)) == 2
+    store.close()
+
+    assert _open(tmp_path).all() == records
+
+
+def test_failed_compaction_is_replayed_from_the_rotated_journal(tmp_path, make_reservation):
+    store = _open(tmp_path, compact_every=2)
+    store.persistence.snapshot.rewrite = lambda rows: (_ for _ in ()).throw(OSError("disk full"))
+    records = [make_reservation() for _ in range(3)]
+    for record in records:
+        store.add(record)
+    store.close()
+
+    assert (tmp_path / "reservations.journal.1").exists()
+    assert _open(tmp_path).all() == records
+
+
+def test_compaction_resumes_after_a_failure(tmp_path, make_reservation):
+    store = _open(tmp_path, compact_every=2)
+    store.persistence.snapshot.rewrite = lambda rows: (_ for _ in ()).throw(OSError("disk full"))
+    records = [make_reservation() for _ in range(2)]
+    for record in records:
+        store.add(record)
+    store.persistence.wait_for_compaction()
+    assert (tmp_path / "reservations.journal.1").exists()
+
+    # Disk recovered: the next threshold folds the rotated and the current journal into the snapshot
+    del store.persistence.snapshot.rewrite
+    records += [make_reservation() for _ in range(2)]
+    for record in records[2:]:
+        store.add(record)
+
+    assert not (tmp_path / "reservations.journal.1").exists()
+    assert _journal_lines(tmp_path) == []
+    assert json.loads((tmp_path / "reservations.json").read_text()) == records
+    store.close()
+    assert _open(tmp_path).all() == records
+
+
+def test_replace_all_starts_a_fresh_snapshot(tmp_path, make_reservation):
+    store = _open(tmp_path)
+    store.add(make_reservation())
+    replacement = [make_reservation(), make_reservation()]
+    store.replace_all(replacement)
+    store.close()
+
+    assert _journal_lines(tmp_path) == []
+    assert _open(tmp_path).all() == replacement
+
+
+def test_shared_journal_catches_up_with_other_writers(tmp_path, make_reservation):
+    writer = _open(tmp_path, compact_every=4, shared=True)
+    reader = _open(tmp_path, compact_every=4, shared=True)
+
+    booked = make_reservation()
+    writer.add(booked)
+    assert reader.get(booked["confirmation_id"]) == booked
+
+    reader.update(booked["confirmation_id"], party_size=4)
+    assert writer.get(booked["confirmation_id"])["party_size"] == 4
+
+    # Enough writes to rotate and compact while the reader is idle
+    more = [make_reservation() for _ in range(6)]
+    for record in more:
+        writer.add(record)
+    writer.persistence.wait_for_compaction()
+    assert reader.count() == 7
+    assert reader.find_by_phone(more[-1]["phone"]) == [more[-1]]
+
+    writer.close()
+    reader.close()
@@ -0,0 +1,122 @@
+import json
+import re
+from datetime import date
+
+from agent.llm_client import LLMClient
+from agent.response_cache import ResponseCache
+
+DAY = date(2030, 1, 1)
+HISTORY = [{"role": "user", "content": "table for 4 please"}, {"role": "assistant", "content": "Which area?"}]
+
+
+class PartySizeProvider:
+    """Answers with a search for the party size the user gave earlier in the conversation"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, tools, context=None):
+        self.calls += 1
+        sizes = [m for msg in messages if msg["role"] == "user" for m in re.findall(r"for (\d+)", msg["content"])]
+        arguments = {"location": "Bandra", "party_size": int(sizes[-1])}
+        return None, [{"id": "call-1", "function": {"name": "search_restaurants", "arguments": json.dumps(arguments)}}]
+
+
+def _search(**arguments):
+    return {"content": None, "tool_calls": [{"id": "1", "function": "search_restaurants", "arguments": arguments}]}
+
+
+def _session(party_size):
+    return [
+        {"role": "user", "content": f"I need a table for {party_size} tomorrow"},
+        {"role": "assistant", "content": "Sure! Which area would you like?"},
+        {"role": "user", "content": "Bandra"},
+    ]
+
+
+def test_same_reply_after_different_history_is_not_shared():
+    provider = PartySizeProvider()
+    client = LLMClient(provider=provider)
+    client.cache = ResponseCache()
+    context = {"available_options": []}
+
+    first = client.chat_with_tools(_session(2), context)
+    second = client.chat_with_tools(_session(8), context)
+
+    assert provider.calls == 2
+    assert first["tool_calls"][0]["arguments"]["party_size"] == 2
+    assert second["tool_calls"][0]["arguments"]["party_size"] == 8
+
+
+def test_same_history_and_reply_hits():
+    provider = PartySizeProvider()
+    client = LLMClient(provider=provider)
+    client.cache = ResponseCache()
+
+    client.chat_with_tools(_session(4), {})
+    again = client.chat_with_tools(_session(4), {})
+
+    assert provider.calls == 1
+    assert again["tool_calls"][0]["arguments"]["party_size"] == 4
+
+
+def test_exact_and_reworded_requests_hit():
+    cache = ResponseCache()
+    cache.store("p", {}, "Table in Bandra for 2 people", _search(location="Bandra"), 1.0, HISTORY, today=DAY)
+
+    assert cache.lookup("p", {}, "table in bandra for 2 people!", HISTORY, today=DAY) is not None
+    assert cache.lookup("p", {}, "2 people, Bandra please", HISTORY, today=DAY) is not None
+    assert cache.lookup("p", {}, "Bandra for 3 people", HISTORY, today=DAY) is None
+
+
+def test_key_covers_prompt_context_and_history():
+    cache = ResponseCache()
+    context = {"party_size": 2, "location": "Bandra"}
+    cache.store("p", context, "somewhere quiet", _search(location="Bandra"), 1.0, HISTORY, today=DAY)
+
+    assert cache.lookup("p", context, "somewhere quiet", HISTORY, today=DAY) is not None
+    assert cache.lookup("other-prompt", context, "somewhere quiet", HISTORY, today=DAY) is None
+    assert cache.lookup("p", dict(context, party_size=6), "somewhere quiet", HISTORY, today=DAY) is None
+    assert cache.lookup("p", context, "somewhere quiet", HISTORY[:1], today=DAY) is None
+    assert cache.lookup("p", context, "somewhere quiet", (), today=DAY) is None
+
+
+def test_relative_dates_replay_on_later_days():
+    cache = ResponseCache()
+    cache.store("p", {}, "Bandra tomorrow", _search(date="2030-01-02"), 1.0, today=DAY)
+
+    replayed = cache.lookup("p", {}, "Bandra tomorrow", today=date(2030, 1, 5))
+    assert replayed["tool_calls"][0]["arguments"]["date"] == "2030-01-06"
+
+
+def test_calendar_dates_are_keyed_to_the_day():
+    cache = ResponseCache()
+    cache.store("p", {}, "Bandra on 2030-01-09", _search(date="2030-01-09"), 1.0, today=DAY)
+
+    assert cache.lookup("p", {}, "Bandra on 2030-01-09", today=DAY)["tool_calls"][0]["arguments"]["date"] == "2030-01-09"
+    assert cache.lookup("p", {}, "Bandra on 2030-01-09", today=date(2030, 1, 2)) is None
+
+
+def test_only_cacheable_tool_calls_are_stored():
+    cache = ResponseCache()
+    booking = {"content": None, "tool_calls": [{"id": "1", "function": "create_reservation", "arguments": {}}]}
+    cache.store("p", {}, "book it", booking, 1.0, today=DAY)
+    cache.store("p", {}, "hello", {"content": "Hi!", "tool_calls": []}, 1.0, today=DAY)
+
+    assert cache.lookup("p", {}, "book it", today=DAY) is None
+    assert cache.lookup("p", {}, "hello", today=DAY) is None
+    assert cache.stats["entries"] == 0
+
+
+def test_expired_and_evicted_entries_miss():
+    expired = ResponseCache(ttl_seconds=-1)
+    expired.store("p", {}, "bandra", _search(), 1.0, today=DAY)
+    assert expired.lookup("p", {}, "bandra", today=DAY) is None
+
+    small = ResponseCache(max_entries=1)
+    small.store("p", {}, "bandra", _search(), 1.0, today=DAY)
+    small.store("p", {}, "andheri", _search(), 1.0, today=DAY)
+    assert small.lookup("p", {}, "bandra", today=DAY) is None
+    assert small.lookup("p", {}, "andheri", today=DAY) is not None
@@ -0,0 +1,94 @@
+import pytest
+
+from agent.router import IntentRouter
+from utils.reservation_store import ReservationStore
+
+PHONE = "9876543210"
+OPTIONS = {"available_options": [{"name": "GoodFoods Bandra"}, {"name": "GoodFoods Juhu"}, {"name": "GoodFoods Powai"}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReservationStore(str(tmp_path / "reservations.json"))
+
+
+@pytest.fixture
+def router(store):
+    return IntentRouter(threshold=0.8, store=store)
+
+
+def _details(index=1, name="Rohit", phone=PHONE):
+    return {"restaurant_index": index, "customer_name": name, "phone": phone}
+
+
+def test_cancel_and_lookup_by_confirmation_id(router):
+    cancel = router.route("Please cancel GF-MUM-300101-AB12")
+    assert cancel["function"] == "cancel_reservation"
+    assert cancel["arguments"] == {"reservation_id": "GF-MUM-300101-AB12"}
+    assert cancel["confidence"] == 0.95
+
+    lookup = router.route("gf-mum-300101-ab12")
+    assert lookup["function"] == "find_reservation"
+    assert lookup["arguments"] == {"phone_or_id": "GF-MUM-300101-AB12"}
+
+    assert router.route("don't cancel GF-MUM-300101-AB12") is None
+    assert router.route("my friend mentioned GF-MUM-300101-AB12 was nice") is None
+
+
+def test_cancel_by_phone_with_one_upcoming_booking(router, store, make_reservation):
+    store.add(make_reservation(phone=PHONE, date="2020-01-01"))
+    store.add(make_reservation(phone=PHONE, status="cancelled"))
+    upcoming = store.add(make_reservation(phone=PHONE))
+
+    decision = router.route(f"cancel my booking, phone {PHONE}")
+    assert decision["function"] == "cancel_reservation"
+    assert decision["arguments"] == {"reservation_id": upcoming["confirmation_id"]}
+    assert decision["confidence"] == 0.85
+    assert router.route(f"do not cancel anything for {PHONE}") is None
+
+
+def test_cancel_by_phone_falls_through_when_ambiguous_or_empty(router, store, make_reservation):
+    assert router.route(f"cancel my booking {PHONE}") is None
+
+    store.add(make_reservation(phone=PHONE, date="2020-01-01"))
+    assert router.route(f"cancel my booking {PHONE}") is None
+
+    store.add(make_reservation(phone=PHONE))
+    store.add(make_reservation(phone=PHONE, date="2030-02-01"))
+    assert router.route(f"cancel my booking {PHONE}") is None
+
+
+def test_selection_with_name_and_phone(router):
+    decision = router.route(f"book the second one, I'm Rohit {PHONE}", OPTIONS, _details())
+    assert decision["function"] == "select_restaurant"
+    assert decision["arguments"] == {"restaurant_index": 1, "customer_name": "Rohit", "phone": PHONE, "special_requests": ""}
+    assert decision["confidence"] == 0.9
+
+    assert router.route(f"reserve the first, I'm Rohit {PHONE}", OPTIONS, _details(index=0)) is not None
+
+
+@pytest.mark.parametrize("message", [
+    f"a table for 2, I'm Rohit {PHONE}",
+    f"the second one but tomorrow instead, I'm Rohit {PHONE}",
+    f"second one at 9pm, I'm Rohit {PHONE}",
+    f"the second one please, and my name is Rohit and this is my number {PHONE} if you need to reach me",
+])
+def test_selection_with_new_request_cues_goes_to_the_model(router, message):
+    assert router.route(message, OPTIONS, _details()) is None
+
+
+def test_selection_needs_options_index_name_and_phone(router):
+    message = f"second one, I'm Rohit {PHONE}"
+    assert router.route(message, {}, _details()) is None
+    assert router.route(message, OPTIONS, _details(index=5)) is None
+    assert router.route(message, OPTIONS, _details(phone="12345")) is None
+    assert router.route(message, OPTIONS, _details(name="Rohit and Priya")) is None
+
+
+def test_stats_count_turns_and_fast_paths(router):
+    router.route("cancel GF-MUM-300101-AB12")
+    router.route("hello there")
+    stats = router.stats
+    assert stats["turns"] == 2
+    assert stats["fast_path"] == 1
+    assert stats["by_function"] == {"cancel_reservation": 1}
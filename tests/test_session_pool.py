@@ -0,0 +1,97 @@
+import threading
+import time
+
+from agent.session_pool import SessionPool
+from utils.session_store import SessionStore
+
+
+class EchoLLM:
+    """Replies with the last user message, so each turn leaves a visible trace in history"""
+
+    def chat_with_tools(self, messages, context=None):
+        user = [m["content"] for m in messages if m.get("role") == "user"]
+        return {"content": f"echo: {user[-1]}", "tool_calls": []}
+
+
+def _pool(tmp_path, **kwargs):
+    return SessionPool(store=SessionStore(str(tmp_path / "sessions")), llm=EchoLLM(), **kwargs)
+
+
+def _user_turns(pool, session_id):
+    session = pool._session(session_id)
+    return [m["content"] for m in session.manager.conversation_history if m.get("role") == "user"]
+
+
+def test_lru_eviction_saves_and_the_next_message_restores(tmp_path):
+    pool = _pool(tmp_path, max_sessions=2)
+    pool.process_message("a", "hello from a")
+    pool.process_message("b", "hello from b")
+    pool.process_message("c", "hello from c")
+
+    assert pool.stats == {"active": 2, "restored": 0, "evicted": 1}
+    assert pool.store.load("a") is not None
+
+    pool.process_message("a", "back again")
+    assert pool.stats["restored"] == 1
+    assert _user_turns(pool, "a") == ["hello from a", "back again"]
+
+
+def test_idle_sessions_expire(tmp_path):
+    pool = _pool(tmp_path, ttl_seconds=0.05)
+    pool.process_message("a", "hello")
+    time.sleep(0.1)
+
+    assert pool.evict_expired() == 1
+    assert pool.stats["active"] == 0
+    assert pool.store.load("a")["conversation_history"]
+
+
+def test_close_saves_every_live_session(tmp_path):
+    pool = _pool(tmp_path)
+    pool.process_message("a", "hello")
+    pool.process_message("b", "hello")
+    pool.close()
+
+    restored = _pool(tmp_path)
+    assert _user_turns(restored, "b") == ["hello"]
+    assert restored.stats["restored"] == 1
+
+
+def test_turn_on_a_session_evicted_before_it_was_locked_is_kept(tmp_path):
+    pool = _pool(tmp_path, max_sessions=1)
+    pool.process_message("a", "first")
+
+    # Another request evicts and saves "a" between its lookup and its lock
+    stale = pool._session("a")
+    pool.process_message("b", "pushes a out")
+    lookup = pool._session
+    handed_out = []
+
+    def racing_lookup(session_id):
+        if not handed_out:
+            handed_out.append(stale)
+            return stale
+        return lookup(session_id)
+
+    pool._session = racing_lookup
+    pool.process_message("a", "second")
+    pool._session = lookup
+
+    assert _user_turns(pool, "a") == ["first", "second"]
+    pool.process_message("b", "pushes a out again")
+    assert [m["content"] for m in pool.store.load("a")["conversation_history"] if m["role"] == "user"] == ["first", "second"]
+
+
+def test_concurrent_messages_for_one_session_run_one_at_a_time(tmp_path):
+    pool = _pool(tmp_path, max_sessions=1)
+    # Few enough turns per session that none are compacted out of the history
+    threads = [threading.Thread(target=pool.process_message, args=(sid, f"{sid} {i}"))
+               for i in range(4) for sid in ("a", "b", "c")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pool.close()
+
+    for sid in ("a", "b", "c"):
+        assert sorted(_user_turns(_pool(tmp_path), sid)) == [f"{sid} {i}" for i in range(4)]
@@ -0,0 +1,105 @@
+import json
+import threading
+
+import pytest
+
+from utils.sqlite_store import SQLiteReservationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteReservationStore(str(tmp_path / "reservations.db"))
+    yield store
+    store.close()
+
+
+def test_reads_return_what_was_written(store, make_reservation):
+    first, second = make_reservation(), make_reservation(time="20:00")
+    store.add(first)
+    store.add(second)
+
+    assert store.all() == [first, second]
+    assert store.get(first["confirmation_id"]) == first
+    assert store.find(second["phone"]) == second
+    assert store.find(second["confirmation_id"]) == second
+    assert store.find("nobody") is None
+    assert store.for_restaurant_date("R001", "2030-01-01") == [first, second]
+
+
+def test_duplicate_confirmation_id_is_a_value_error(store, make_reservation):
+    booked = make_reservation()
+    store.add(booked)
+    version = store.slot_version("R001", "2030-01-01")
+
+    with pytest.raises(ValueError, match=booked["confirmation_id"]):
+        store.add(dict(booked, time="21:00"))
+    # Rolled back with the insert: no row, no slot bump
+    assert store.count() == 1
+    assert store.get(booked["confirmation_id"])["time"] == booked["time"]
+    assert store.slot_version("R001", "2030-01-01") == version
+
+
+def test_update_against_a_stale_slot_version_is_rejected(store, make_reservation):
+    booked = make_reservation()
+    store.add(booked)
+    stale = store.slot_version("R001", "2030-01-01")
+    store.update(booked["confirmation_id"], expected_version=stale, party_size=4)
+
+    assert store.update(booked["confirmation_id"], expected_version=stale, party_size=6) is None
+    assert store.get(booked["confirmation_id"])["party_size"] == 4
+    assert store.update("GF-MISSING", party_size=6) is None
+
+
+def test_moving_a_reservation_bumps_both_slots(store, make_reservation):
+    booked = make_reservation()
+    store.add(booked)
+    old_day = store.slot_version("R001", "2030-01-01")
+    new_day = store.slot_version("R001", "2030-01-02")
+
+    moved = store.update(booked["confirmation_id"], expected_version=new_day, date="2030-01-02")
+    assert moved["date"] == "2030-01-02"
+    assert store.slot_version("R001", "2030-01-01") > old_day
+    assert store.slot_version("R001", "2030-01-02") > new_day
+
+
+def test_only_one_concurrent_writer_wins_a_slot_version(tmp_path, make_reservation):
+    path = str(tmp_path / "reservations.db")
+    stores = [SQLiteReservationStore(path) for _ in range(2)]
+    version = stores[0].slot_version("R001", "2030-01-01")
+    start = threading.Barrier(8)
+    outcomes = []
+
+    def book(store, reservation):
+        start.wait()
+        outcomes.append(store.add(reservation, expected_version=version))
+
+    threads = [threading.Thread(target=book, args=(stores[i % 2], make_reservation())) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len([r for r in outcomes if r is not None]) == 1
+    assert stores[1].count() == 1
+    for store in stores:
+        store.close()
+
+
+def test_json_round_trip(store, tmp_path, make_reservation):
+    records = [make_reservation(), make_reservation(status="cancelled")]
+    seed = tmp_path / "seed.json"
+    seed.write_text(json.dumps(records))
+
+    assert store.import_json(str(seed)) == 2
+    # Re-importing replaces rows by confirmation_id instead of duplicating them
+    assert store.import_json(str(seed)) == 2
+    assert store.count() == 2
+    assert store.count(status="cancelled") == 1
+
+    exported = tmp_path / "exported.json"
+    store.export_json(str(exported))
+    assert json.loads(exported.read_text()) == records
+
+    store.replace_all(records[:1])
+    assert store.all() == records[:1]
+    assert store.import_json(str(tmp_path / "missing.json")) == 0
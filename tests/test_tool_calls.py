@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+import agent.conversation_manager as conversation_manager
+from agent.conversation_manager import ConversationManager
+
+
+class NoReservations:
+    def find(self, phone_or_id):
+        return None
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    # Write targets are resolved through the store; keep them to the IDs the calls name
+    monkeypatch.setattr(conversation_manager, "get_reservation_store", lambda: NoReservations())
+    return ConversationManager(llm=object())
+
+
+def _call(function, **arguments):
+    return {"id": f"call-{function}", "function": function, "arguments": arguments}
+
+
+def _result(function, arguments):
+    confirmation_id = arguments.get("reservation_id") or arguments.get("phone_or_id")
+    if function == "update_reservation":
+        return {"confirmation_id": confirmation_id, "updated_details": {"date": "2030-01-02", "time": "20:00", "party_size": 4}}
+    if function == "cancel_reservation":
+        return {"confirmation_id": confirmation_id, "status": "cancelled"}
+    return {"reservation": {"confirmation_id": confirmation_id}}
+
+
+def test_lookups_run_concurrently(manager, monkeypatch):
+    both_started = threading.Barrier(2, timeout=5)
+
+    def dispatch(function, arguments):
+        both_started.wait()  # only returns if the other lookup is running at the same time
+        return _result(function, arguments)
+
+    monkeypatch.setattr(manager, "_dispatch_tool", dispatch)
+    reply = manager._run_tool_calls([
+        _call("find_reservation", phone_or_id="GF-MUM-300101-AAAA"),
+        _call("find_reservation", phone_or_id="GF-MUM-300101-BBBB"),
+    ])
+
+    tool_messages = [m for m in manager.conversation_history if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["call-find_reservation"] * 2
+    assert reply.count("---") == 1
+
+
+def test_writes_on_the_same_reservation_conflict(manager, monkeypatch):
+    ran = []
+
+    def dispatch(function, arguments):
+        ran.append(function)
+        return _result(function, arguments)
+
+    monkeypatch.setattr(manager, "_dispatch_tool", dispatch)
+    reply = manager._run_tool_calls([
+        _call("update_reservation", reservation_id="GF-MUM-300101-AAAA", party_size=4),
+        _call("cancel_reservation", reservation_id="GF-MUM-300101-AAAA"),
+    ])
+
+    assert ran == ["update_reservation"]
+    assert "conflicts with update reservation" in reply
+
+
+def test_session_state_follows_call_order_not_completion_order(manager, monkeypatch):
+    observed_on = []
+    observe = manager.memory.observe_tool
+
+    def record(function, arguments, result):
+        observed_on.append(threading.current_thread())
+        observe(function, arguments, result)
+
+    def dispatch(function, arguments):
+        if function == "cancel_reservation":
+            time.sleep(0.05)  # finishes after the update
+        return _result(function, arguments)
+
+    monkeypatch.setattr(manager.memory, "observe_tool", record)
+    monkeypatch.setattr(manager, "_dispatch_tool", dispatch)
+    manager._run_tool_calls([
+        _call("update_reservation", reservation_id="GF-MUM-300101-AAAA", party_size=4),
+        _call("cancel_reservation", reservation_id="GF-MUM-300101-BBBB"),
+    ])
+    assert manager.memory.slots["confirmation_id"] == "GF-MUM-300101-BBBB"
+    assert manager.memory.slots["booking"] == "cancelled"
+
+    manager._run_tool_calls([
+        _call("cancel_reservation", reservation_id="GF-MUM-300101-BBBB"),
+        _call("update_reservation", reservation_id="GF-MUM-300101-AAAA", party_size=4),
+    ])
+    assert manager.memory.slots["confirmation_id"] == "GF-MUM-300101-AAAA"
+    assert manager.memory.slots["booking"].startswith("updated to")
+    assert set(observed_on) == {threading.current_thread()}
+
+
+def test_searches_are_merged_into_one_option_list(manager, monkeypatch):
+    results = {
+        "Bandra": {"restaurants": [{"restaurant_id": "R1", "name": "One"}, {"restaurant_id": "R2", "name": "Two"}]},
+        "Juhu": {"restaurants": [{"restaurant_id": "R3", "name": "Three"}, {"restaurant_id": "R1", "name": "One"}]},
+    }
+    monkeypatch.setattr(conversation_manager.search_restaurants, "execute", lambda **kw: results[kw["location"]])
+
+    manager._run_tool_calls([
+        _call("search_restaurants", location="Bandra", party_size=2, date="2030-01-01", time="19:00"),
+        _call("search_restaurants", location="Juhu", party_size=2, date="2030-01-01", time="19:00"),
+    ])
+
+    assert [r["restaurant_id"] for r in manager.context["available_options"]] == ["R1", "R3", "R2"]
+    assert manager.context["location"] == "Bandra, Juhu"
+    assert len([m for m in manager.conversation_history if m["role"] == "tool"]) == 1
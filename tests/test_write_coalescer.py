@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from utils.database import WriteCoalescer
+
+
+class SlowSyncStore:
+    """Counts rows written and how many of them the last sync made durable"""
+
+    def __init__(self, sync_seconds=0.02):
+        self.sync_seconds = sync_seconds
+        self.rows = 0
+        self.durable = 0
+        self.syncs = 0
+        self.fail = None
+        self._lock = threading.Lock()
+
+    def add(self, reservation, expected_version=None):
+        if expected_version == "stale":
+            return None
+        with self._lock:
+            self.rows += 1
+            return dict(reservation, seq=self.rows)
+
+    def update(self, confirmation_id, expected_version=None, **changes):
+        return None
+
+    def replace_all(self, reservations):
+        return None
+
+    def count(self, status=None):
+        return self.rows
+
+    def sync(self):
+        with self._lock:
+            covered = self.rows
+        time.sleep(self.sync_seconds)
+        with self._lock:
+            self.syncs += 1
+            if self.fail is not None:
+                raise self.fail
+            self.durable = max(self.durable, covered)
+
+
+def test_concurrent_writes_share_fsyncs_and_return_only_once_durable():
+    store = SlowSyncStore()
+    coalescer = WriteCoalescer(store, window_ms=50)
+    early = []
+
+    def write(i):
+        record = coalescer.add({"confirmation_id": i})
+        if store.durable < record["seq"]:
+            early.append(record)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert early == []
+    assert store.durable == 32
+    assert store.syncs < 32
+
+
+def test_a_lone_writer_does_not_wait_for_the_window():
+    store = SlowSyncStore(sync_seconds=0)
+    coalescer = WriteCoalescer(store, window_ms=1000)
+
+    started = time.monotonic()
+    coalescer.add({"confirmation_id": "A"})
+    assert time.monotonic() - started < 0.5
+    assert store.syncs == 1
+
+
+def test_writes_that_change_nothing_are_not_synced():
+    store = SlowSyncStore()
+    coalescer = WriteCoalescer(store)
+
+    assert coalescer.add({"confirmation_id": "A"}, expected_version="stale") is None
+    assert coalescer.update("A", status="cancelled") is None
+    assert coalescer.replace_all([]) is None
+    assert store.syncs == 0
+
+
+def test_a_failed_sync_is_raised_to_the_writers_it_covered():
+    store = SlowSyncStore(sync_seconds=0)
+    coalescer = WriteCoalescer(store)
+    store.fail = OSError("disk full")
+
+    with pytest.raises(OSError):
+        coalescer.add({"confirmation_id": "A"})
+
+    store.fail = None
+    assert coalescer.add({"confirmation_id": "B"})["seq"] == 2
+    assert store.durable == 2
+
+
+def test_reads_pass_through():
+    store = SlowSyncStore()
+    coalescer = WriteCoalescer(store)
+    coalescer.add({"confirmation_id": "A"})
+    assert coalescer.count() == 1
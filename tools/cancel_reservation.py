@@ -2,7 +2,7 @@
 Tool: Cancel Reservation
 """
 
-from utils.database import load_reservations, save_reservations
+from utils.database import get_reservation_store
 
 
 def execute(reservation_id=None, phone=None, phone_or_id=None):
@@ -13,7 +13,7 @@ def execute(reservation_id=None, phone=None, phone_or_id=None):
     error. Backwards-compatible with the previous single-arg signature.
     """
     try:
-        reservations = load_reservations()
+        store = get_reservation_store()
 
         # Determine lookup key
         target = None
@@ -28,22 +28,12 @@ def execute(reservation_id=None, phone=None, phone_or_id=None):
             return {"error": "No reservation_id or phone provided"}
 
         # Find by confirmation_id first, then by phone
-        reservation = next(
-            (r for r in reservations if r.get("confirmation_id") == target),
-            None
-        )
-
-        if reservation is None:
-            reservation = next(
-                (r for r in reservations if r.get("phone") == target),
-                None
-            )
+        reservation = store.find(target)
 
         if not reservation:
             return {"reservation": None, "error": "Reservation not found"}
 
-        reservation["status"] = "cancelled"
-        save_reservations(reservations)
+        reservation = store.update(reservation["confirmation_id"], status="cancelled")
 
         return {
             "confirmation_id": reservation.get("confirmation_id"),
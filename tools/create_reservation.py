@@ -4,44 +4,33 @@ Tool: Create Reservation
 
 import uuid
 from datetime import datetime
-from utils.database import load_reservations, save_reservations, load_restaurants
+from utils.availability import get_availability_engine
+from utils.database import get_reservation_store, get_restaurant_catalog
+from utils.log import get_logger
+
+log = get_logger(__name__)
 
 def execute(restaurant_id, customer_name, phone, date, time, party_size, special_requests=""):
     """Create a new reservation"""
-    print(f"[TOOL:create_reservation] Executing with params:")
-    print(f"  - restaurant_id: {restaurant_id}")
-    print(f"  - customer_name: {customer_name}")
-    print(f"  - phone: {phone}")
-    print(f"  - date: {date}")
-    print(f"  - time: {time}")
-    print(f"  - party_size: {party_size}")
-    print(f"  - special_requests: {special_requests}")
+    log.debug("create_reservation restaurant_id=%s name=%r phone=%s date=%s time=%s party_size=%s",
+              restaurant_id, customer_name, phone, date, time, party_size)
 
     try:
-        reservations = load_reservations()
-        restaurants = load_restaurants()
-
-        print(f"[TOOL:create_reservation] Loaded {len(reservations)} existing reservations")
-        print(f"[TOOL:create_reservation] Searching for restaurant with ID: {restaurant_id}")
-
-        restaurant = next(
-            (r for r in restaurants if r["restaurant_id"] == restaurant_id),
-            None
-        )
+        restaurant = get_restaurant_catalog().get(restaurant_id)
 
         if not restaurant:
-            print(f"[TOOL:create_reservation] ❌ Restaurant not found with ID: {restaurant_id}")
+            log.info("create_reservation: restaurant %s not found", restaurant_id)
             return {"error": "Restaurant not found"}
-
-        print(f"[TOOL:create_reservation] ✅ Found restaurant: {restaurant.get('name')}")
         
-        # Generate confirmation ID
+        # Generate confirmation ID (the random part is short, so skip any that are taken)
         city_code = restaurant["city"][:3].upper()
         date_code = date.replace("-", "")[2:]
-        random_code = str(uuid.uuid4())[:4].upper()
-        confirmation_id = f"GF-{city_code}-{date_code}-{random_code}"
-
-        print(f"[TOOL:create_reservation] Generated confirmation ID: {confirmation_id}")
+        store = get_reservation_store()
+        while True:
+            random_code = str(uuid.uuid4())[:4].upper()
+            confirmation_id = f"GF-{city_code}-{date_code}-{random_code}"
+            if store.get(confirmation_id) is None:
+                break
 
         reservation = {
             "confirmation_id": confirmation_id,
@@ -57,12 +46,14 @@ def execute(restaurant_id, customer_name, phone, date, time, party_size, special
             "created_at": datetime.now().isoformat()
         }
 
-        print(f"[TOOL:create_reservation] Saving reservation to database...")
-        reservations.append(reservation)
-        save_reservations(reservations)
-
-        print(f"[TOOL:create_reservation] ✅ Reservation saved successfully!")
-        print(f"  - Total reservations now: {len(reservations)}")
+        # Checks seats_free and writes in one compare-and-swap on the slot
+        if get_availability_engine().reserve_seats(restaurant, reservation) is None:
+            log.info("create_reservation: %s full at %s %s for %s", restaurant_id, date, time, party_size)
+            return {
+                "error": f"Sorry, {restaurant['name']} can no longer seat {party_size} at {time} on {date}. "
+                         "Please pick another time or restaurant."
+            }
+        log.info("Reservation %s saved", confirmation_id)
 
         return {
             "confirmation_id": confirmation_id,
@@ -77,7 +68,5 @@ def execute(restaurant_id, customer_name, phone, date, time, party_size, special
         }
         
     except Exception as e:
-        print(f"[TOOL:create_reservation] ❌ ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("create_reservation failed")
         return {"error": f"Booking failed: {str(e)}"}
@@ -2,19 +2,12 @@
 Tool: Find Reservation
 """
 
-from utils.database import load_reservations
+from utils.database import get_reservation_store
 
 def execute(phone_or_id):
     """Find reservation by phone or ID"""
     try:
-        reservations = load_reservations()
-        
-        match = next(
-            (r for r in reservations
-             if r.get("confirmation_id") == phone_or_id
-             or r.get("phone") == phone_or_id),
-            None
-        )
+        match = get_reservation_store().find(phone_or_id)
         
         if match:
             return True
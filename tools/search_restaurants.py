@@ -2,83 +2,90 @@
 Find available restaurants matching criteria
 """
 
-from datetime import datetime, timedelta
-from utils.database import load_restaurants
+from config.settings import settings
+from utils.database import get_restaurant_catalog
+from utils.availability import get_availability_engine
+from utils.log import get_logger
+
+log = get_logger(__name__)
 
 def execute(location, date, time, party_size):
 
 
     try:
-        restaurants = load_restaurants()
-
-        # Filter by location
-        location_lower = location.lower()
-        matches = [
-            r for r in restaurants
-            if (location_lower in r.get("location", "").lower() or
-                location_lower in r.get("city", "").lower())
-        ]
+        catalog = get_restaurant_catalog()
 
+        # Filter by location (largest restaurants first), tolerating typos and aliases
+        matches, matched_location = catalog.resolve(location)
 
         if not matches:
-            all_cities = list(set(r.get("city", "") for r in restaurants))
+            all_cities = catalog.all_cities()
             return {
                 "restaurants": [],
                 "error": f"No restaurants found in {location}. We have locations in: {', '.join(all_cities)}"
             }
         
+        located = matches
+        engine = get_availability_engine()
+
         # Filter by capacity
         matches = [r for r in matches if r.get("seating_capacity", 0) >= party_size]
 
-
         if not matches:
-            return {
-                "restaurants": [],
-                "error": f"No restaurants in {location} can accommodate {party_size} people."
-            }
+            return _nearby_alternatives(
+                catalog, engine, located, date, time, party_size,
+                f"No restaurants in {location} can accommodate {party_size} people."
+            )
 
-        # Generate available time slots
+        # Keep only restaurants with a slot near the requested time that fits the party
+        available = []
         for restaurant in matches:
-            time_slots = _generate_time_slots(time)
-            restaurant["available_times"] = time_slots
+            time_slots = engine.available_times(restaurant, date, time, party_size)
+            if time_slots:
+                available.append(dict(restaurant, available_times=time_slots))
+        matches = available
 
-        # Sort by capacity
-        matches.sort(key=lambda x: x.get("seating_capacity", 0), reverse=True)
+        if not matches:
+            return _nearby_alternatives(
+                catalog, engine, located, date, time, party_size,
+                f"All our {location} restaurants are fully booked around {time} on {date}."
+            )
 
-        print(f"[TOOL:search_restaurants] Returning {len(matches[:5])} restaurants")
-        for i, r in enumerate(matches[:5]):
-            print(f"  [{i}] {r.get('name')} (capacity: {r.get('seating_capacity')})")
+        log.debug("search_restaurants returning %d restaurants", len(matches[:5]))
 
-        return {"restaurants": matches[:5]}
+        result = {"restaurants": matches[:5]}
+        if matched_location:
+            result["matched_location"] = matched_location.title()
+        return result
         
     except Exception as e:
-        print(f"[TOOL:search_restaurants] ❌ ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("search_restaurants failed")
         return {"error": f"Search failed: {str(e)}"}
 
-def _generate_time_slots(requested_time):
-    """Generate available time slots around requested time"""
-    try:
-        hour, minute = map(int, requested_time.split(":"))
-        
-        slots = []
-        for offset in [-30, -15, 0, 15, 30]:
-            new_min = minute + offset
-            new_hour = hour
-            
-            while new_min < 0:
-                new_hour -= 1
-                new_min += 60
-            
-            while new_min >= 60:
-                new_hour += 1
-                new_min -= 60
-            
-            if 11 <= new_hour < 23:
-                slots.append(f"{new_hour:02d}:{new_min:02d}")
-        
-        return sorted(set(slots))
-        
-    except Exception:
-        return ["19:00", "19:30", "20:00", "20:30", "21:00"]
+def _nearby_alternatives(catalog, engine, located, date, time, party_size, reason):
+    """Nearest other outlets that can seat the party, when the requested area can't"""
+    slots = {}
+
+    def has_free_slot(restaurant):
+        if restaurant.get("seating_capacity", 0) < party_size:
+            return False
+        slots[restaurant["restaurant_id"]] = engine.available_times(restaurant, date, time, party_size)
+        return bool(slots[restaurant["restaurant_id"]])
+
+    nearby = catalog.nearby(located, k=settings.NEARBY_ALTERNATIVES, accept=has_free_slot, max_km=settings.NEARBY_MAX_KM)
+    if not nearby:
+        return {
+            "restaurants": [],
+            "error": f"{reason} Would you like to try a different time or location?"
+        }
+
+    alternatives = [
+        dict(r, available_times=slots[r["restaurant_id"]], distance_km=round(km, 1))
+        for km, r in nearby
+    ]
+    return {
+        "restaurants": alternatives,
+        "nearby_alternatives": True,
+        "note": f"{reason} Here are the nearest alternatives:"
+    }
+
@@ -2,29 +2,38 @@
 Tool: Update Reservation
 """
 
-from utils.database import load_reservations, save_reservations
+from utils.availability import get_availability_engine
+from utils.database import get_reservation_store, get_restaurant_catalog
 
 def execute(reservation_id, new_date=None, new_time=None, new_party_size=None):
     """Update existing reservation"""
     try:
-        reservations = load_reservations()
+        store = get_reservation_store()
         
-        reservation = next(
-            (r for r in reservations if r["confirmation_id"] == reservation_id),
-            None
-        )
-        
-        if not reservation:
+        current = store.get(reservation_id)
+        if current is None:
             return {"error": "Reservation not found"}
         
+        changes = {}
         if new_date:
-            reservation["date"] = new_date
+            changes["date"] = new_date
         if new_time:
-            reservation["time"] = new_time
+            changes["time"] = new_time
         if new_party_size:
-            reservation["party_size"] = new_party_size
+            changes["party_size"] = new_party_size
         
-        save_reservations(reservations)
+        restaurant = get_restaurant_catalog().get(current.get("restaurant_id"))
+        if changes and restaurant and current.get("status") == "confirmed":
+            # Capacity check and write in one compare-and-swap on the target slot
+            reservation = get_availability_engine().move_seats(restaurant, current, **changes)
+            if reservation is None:
+                wanted = dict(current, **changes)
+                return {
+                    "error": f"Sorry, {restaurant['name']} can't seat {wanted['party_size']} at {wanted['time']} "
+                             f"on {wanted['date']}. Your original booking is unchanged."
+                }
+        else:
+            reservation = store.update(reservation_id, **changes)
         
         return {
             "confirmation_id": reservation_id,
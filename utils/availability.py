@@ -0,0 +1,247 @@
+"""
+Availability Engine
+Slot-level seat availability from confirmed reservations
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+
+SLOT_MINUTES = 15
+
+
+def parse_minutes(hhmm):
+    """'19:30' -> 1170. Returns None for anything unparseable."""
+    try:
+        hour, minute = map(int, str(hhmm).split(":"))
+    except (TypeError, ValueError):
+        return None
+    return hour * 60 + minute
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def operating_window(restaurant):
+    """(open, close) in minutes; a close at or before the opening time is after midnight (close > 1440)"""
+    open_str, _, close_str = str(restaurant.get("operating_hours", "11:00-23:00")).partition("-")
+    opens = parse_minutes(open_str)
+    closes = parse_minutes(close_str)
+    if opens is None or closes is None:
+        return 11 * 60, 23 * 60
+    if closes <= opens:
+        closes += 24 * 60
+    return opens, closes
+
+
+def is_closed_on(restaurant, date):
+    """closed_days may list weekday names ('Monday') or ISO dates"""
+    closed = restaurant.get("closed_days") or []
+    if not closed:
+        return False
+    try:
+        weekday = datetime.strptime(date, "%Y-%m-%d").strftime("%A").lower()
+    except (TypeError, ValueError):
+        return False
+    closed = {str(d).lower() for d in closed}
+    return weekday in closed or str(date).lower() in closed
+
+
+def window_minutes(minutes, opens, closes):
+    """`minutes` on the timeline of a day opening at `opens`: when the window runs past
+    midnight, times before opening are that night's early hours (00:30 -> 1470)"""
+    if closes > 24 * 60 and minutes < opens:
+        return minutes + 24 * 60
+    return minutes
+
+
+class Timeline:
+    """Seat occupancy for one restaurant on one date, in 15-minute slots.
+
+    Each confirmed reservation adds its party to a difference array over
+    [start, start + turnover); a prefix sum turns that into per-slot
+    occupancy, and a sliding-window maximum turns occupancy into the seats a
+    *new* booking starting at that slot could use for its whole turnover.
+    Every query after construction is O(1).
+    """
+
+    def __init__(self, capacity, opens, closes, turnover_minutes, reservations):
+        self.capacity = capacity
+        self.opens = opens
+        self.closes = closes
+        self.turnover_slots = max(1, -(-turnover_minutes // SLOT_MINUTES))
+
+        # Room after closing so late bookings can run their full turnover
+        n = (closes - opens) // SLOT_MINUTES + self.turnover_slots
+        diff = [0] * (n + 1)
+        for r in reservations:
+            if r.get("status") != "confirmed":
+                continue
+            start = parse_minutes(r.get("time"))
+            if start is None:
+                continue
+            start = window_minutes(start, opens, closes)
+            try:
+                party = int(r.get("party_size") or 0)
+            except (TypeError, ValueError):
+                continue
+            first = max(0, (start - opens) // SLOT_MINUTES)
+            last = min(n, -(-(start + turnover_minutes - opens) // SLOT_MINUTES))
+            if first < last:
+                diff[first] += party
+                diff[last] -= party
+
+        occupied, running = [], 0
+        for delta in diff[:n]:
+            running += delta
+            occupied.append(running)
+        self.occupied = occupied
+
+        # free[i] = capacity - max(occupied[i : i + turnover_slots])
+        window = deque()
+        peak = [0] * n
+        for i in range(n - 1, -1, -1):
+            while window and occupied[window[-1]] <= occupied[i]:
+                window.pop()
+            window.append(i)
+            if window[0] >= i + self.turnover_slots:
+                window.popleft()
+            peak[i] = occupied[window[0]]
+        self.free = [capacity - p for p in peak]
+
+    def seats_free(self, minutes):
+        """Seats a booking starting at `minutes` can take for its whole stay (0 outside opening hours)"""
+        minutes = window_minutes(minutes, self.opens, self.closes)
+        if minutes < self.opens or minutes >= self.closes:
+            return 0
+        return max(0, self.free[(minutes - self.opens) // SLOT_MINUTES])
+
+
+class SlotBusy(Exception):
+    """A booking lost the compare-and-swap on its slot too many times in a row"""
+
+
+class AvailabilityEngine:
+    """Builds and caches Timelines per (restaurant_id, date), and books seats against them.
+
+    Cached timelines are tagged with the store's slot_version and rebuilt
+    from the (restaurant_id, date) index only after a booking there changes.
+
+    Bookings are optimistic: capacity is checked against a timeline built at
+    some slot_version, and the store only writes the booking if the slot is
+    still at that version (add/update with expected_version). A booking that
+    loses the race re-reads the slot and checks again, so two sessions can
+    never both take the last table and no lock is held while checking.
+    """
+
+    MAX_ATTEMPTS = 8
+
+    def __init__(self, store, turnover_minutes=90):
+        self.store = store
+        self.turnover_minutes = turnover_minutes
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def timeline(self, restaurant, date):
+        return self._versioned_timeline(restaurant, date)[1]
+
+    def _versioned_timeline(self, restaurant, date):
+        """(slot_version, Timeline), where the timeline reflects exactly that version"""
+        restaurant_id = restaurant["restaurant_id"]
+        key = (restaurant_id, date)
+        version = self.store.slot_version(restaurant_id, date)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached
+
+        version, reservations = self.store.slot_snapshot(restaurant_id, date)
+        entry = (version, self._build(restaurant, reservations))
+        with self._lock:
+            self._cache[key] = entry
+        return entry
+
+    def _build(self, restaurant, reservations):
+        opens, closes = operating_window(restaurant)
+        return Timeline(restaurant.get("seating_capacity", 0), opens, closes, self.turnover_minutes, reservations)
+
+    def seats_free(self, restaurant, date, time):
+        """Seats free for a booking at `time` (HH:MM) on `date`"""
+        minutes = parse_minutes(time)
+        if minutes is None or is_closed_on(restaurant, date):
+            return 0
+        return self.timeline(restaurant, date).seats_free(minutes)
+
+    def available_times(self, restaurant, date, time, party_size, spread_minutes=30):
+        """Slots within +/- spread_minutes of `time` that can seat party_size"""
+        requested = parse_minutes(time)
+        if requested is None or is_closed_on(restaurant, date):
+            return []
+        timeline = self.timeline(restaurant, date)
+        requested = window_minutes(requested, timeline.opens, timeline.closes)
+        base = requested - requested % SLOT_MINUTES
+        slots = []
+        for offset in range(-spread_minutes, spread_minutes + 1, SLOT_MINUTES):
+            minutes = base + offset
+            if timeline.seats_free(minutes) >= party_size:
+                slots.append(format_minutes(minutes % (24 * 60)))
+        return slots
+
+    def reserve_seats(self, restaurant, reservation):
+        """Add `reservation` if its party fits at its date and time.
+
+        Returns the stored reservation, or None when the slot cannot seat the
+        party (closed, outside opening hours or full). Raises SlotBusy if
+        concurrent bookings keep changing the slot.
+        """
+        date = reservation.get("date")
+        minutes = parse_minutes(reservation.get("time"))
+        party = int(reservation.get("party_size") or 0)
+        if minutes is None or is_closed_on(restaurant, date):
+            return None
+        for _ in range(self.MAX_ATTEMPTS):
+            version, timeline = self._versioned_timeline(restaurant, date)
+            if timeline.seats_free(minutes) < party:
+                return None
+            record = self.store.add(reservation, expected_version=version)
+            if record is not None:
+                return record
+        raise SlotBusy(f"{restaurant['restaurant_id']} on {date} is changing too quickly; try again")
+
+    def move_seats(self, restaurant, current, **changes):
+        """Apply date/time/party_size `changes` to the confirmed reservation `current` if the result fits.
+
+        The reservation's own seats don't count against it. Returns the
+        updated reservation, or None when the new slot cannot seat the party.
+        """
+        updated = dict(current, **changes)
+        date = updated.get("date")
+        minutes = parse_minutes(updated.get("time"))
+        party = int(updated.get("party_size") or 0)
+        if minutes is None or is_closed_on(restaurant, date):
+            return None
+        for _ in range(self.MAX_ATTEMPTS):
+            version, reservations = self.store.slot_snapshot(restaurant["restaurant_id"], date)
+            others = [r for r in reservations if r.get("confirmation_id") != current.get("confirmation_id")]
+            if self._build(restaurant, others).seats_free(minutes) < party:
+                return None
+            record = self.store.update(current["confirmation_id"], expected_version=version, **changes)
+            if record is not None:
+                return record
+        raise SlotBusy(f"{restaurant['restaurant_id']} on {date} is changing too quickly; try again")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_availability_engine():
+    """Process-wide engine over the configured reservation store"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from utils.database import get_reservation_store, load_constraints
+                turnover = load_constraints().get("table_turnover_minutes", 90)
+                _engine = AvailabilityEngine(get_reservation_store(), turnover)
+    return _engine
@@ -0,0 +1,304 @@
+"""
+Restaurant Catalog
+restaurants.json loaded once and indexed for location search
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from utils.geo import KDTree
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _ngrams(text, n=3):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _padded_trigrams(term):
+    """Trigrams of ' term ' so that shared prefixes/suffixes count for more"""
+    return _ngrams(f" {term} ")
+
+
+class RestaurantCatalog:
+    """In-memory restaurant catalog with precomputed search indexes.
+
+    Built once per file version (checked by mtime/size on access):
+      - token index: every lowercased location/city value and word token ->
+        its precomputed, capacity-ordered result list
+      - trigram index over location/city, for any other substring query
+      - address token index, used when location/city give nothing
+      - trigram index over the whole vocabulary plus aliases, for typos
+        ("Koramangla") and short forms ("Blr")
+      - per-city buckets and a global order, both sorted by capacity (desc)
+      - a k-d tree over latitude/longitude for nearby alternatives
+
+    Common queries are a single dictionary lookup. Anything else intersects
+    trigram posting lists, verifies the original substring semantics on the
+    few candidates left and merges them in capacity order.
+    """
+
+    def __init__(self, path, aliases_path=None, fuzzy_threshold=0.5):
+        self.path = path
+        self.aliases_path = aliases_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._load()
+
+    # Loading
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        if self._file_stamp() != self._stamp:
+            with self._lock:
+                if self._file_stamp() != self._stamp:
+                    self._load()
+
+    def _load(self):
+        stamp = self._file_stamp()
+        try:
+            with open(self.path, "r") as f:
+                restaurants = json.load(f)
+        except FileNotFoundError:
+            restaurants = []
+        except json.JSONDecodeError:
+            log.error("Error reading %s", self.path)
+            restaurants = []
+        self._build(restaurants, self._load_aliases())
+        self._stamp = stamp
+
+    def _load_aliases(self):
+        if not self.aliases_path:
+            return {}
+        try:
+            with open(self.aliases_path, "r") as f:
+                return {str(k).strip().lower(): str(v).strip().lower() for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            log.error("Error reading %s", self.aliases_path)
+            return {}
+
+    def _build(self, restaurants, aliases):
+        by_id = {}
+        tokens = defaultdict(set)
+        address_tokens = defaultdict(set)
+        trigrams = defaultdict(set)
+        fields = {}
+
+        for r in restaurants:
+            rid = r.get("restaurant_id")
+            by_id[rid] = r
+            location = str(r.get("location", "")).lower()
+            city = str(r.get("city", "")).lower()
+            fields[rid] = (location, city)
+            for value in (location, city):
+                if value:
+                    tokens[value].add(rid)
+                for token in _TOKEN_RE.findall(value):
+                    tokens[token].add(rid)
+                for gram in _ngrams(value):
+                    trigrams[gram].add(rid)
+            for token in _TOKEN_RE.findall(str(r.get("address", "")).lower()):
+                address_tokens[token].add(rid)
+
+        ordered = sorted(restaurants, key=lambda r: r.get("seating_capacity", 0), reverse=True)
+        rank = {r.get("restaurant_id"): i for i, r in enumerate(ordered)}
+        by_city = defaultdict(list)
+        for r in ordered:
+            by_city[str(r.get("city", "")).lower()].append(r)
+
+        # Every full location/city value and every token is a ready-made answer
+        results = {}
+        for key in tokens:
+            ids = {rid for rid, (location, city) in fields.items() if key in location or key in city}
+            results[key] = [by_id[rid] for rid in sorted(ids, key=rank.__getitem__)]
+
+        # Fuzzy vocabulary: every searchable term plus aliases, each pointing
+        # at the key whose results it stands for
+        vocab = {term: term for term in results}
+        for alias, target in aliases.items():
+            if target in results:
+                vocab[alias] = target
+        vocab_trigrams = defaultdict(set)
+        vocab_sizes = {}
+        for term in vocab:
+            grams = _padded_trigrams(term)
+            vocab_sizes[term] = len(grams)
+            for gram in grams:
+                vocab_trigrams[gram].add(term)
+
+        spatial = KDTree(
+            (r["latitude"], r["longitude"], r)
+            for r in restaurants
+            if r.get("latitude") is not None and r.get("longitude") is not None
+        )
+
+        # Swap everything in at once so readers never see a half-built index
+        self.restaurants = restaurants
+        self.cities = sorted({r.get("city", "") for r in restaurants})
+        self._by_id = by_id
+        self._rank = rank
+        self._by_city = dict(by_city)
+        self._results = results
+        self._address_tokens = dict(address_tokens)
+        self._trigrams = dict(trigrams)
+        self._fields = fields
+        self._vocab = vocab
+        self._vocab_trigrams = dict(vocab_trigrams)
+        self._vocab_sizes = vocab_sizes
+        self._spatial = spatial
+
+    # Queries
+
+    def all(self):
+        self._refresh()
+        return self.restaurants
+
+    def get(self, restaurant_id):
+        """Restaurant by ID, or None"""
+        self._refresh()
+        return self._by_id.get(restaurant_id)
+
+    def all_cities(self):
+        self._refresh()
+        return self.cities
+
+    def in_city(self, city):
+        """Restaurants in a city, largest first"""
+        self._refresh()
+        return list(self._by_city.get(str(city).lower(), ()))
+
+    def nearest(self, lat, lon, k=3, accept=None, max_km=None):
+        """Up to k (distance_km, restaurant) pairs around a point, closest first"""
+        self._refresh()
+        return self._spatial.nearest(lat, lon, k=k, accept=accept, max_km=max_km)
+
+    def nearby(self, restaurants, k=3, accept=None, max_km=None):
+        """Nearest other outlets around the centroid of `restaurants`"""
+        points = [
+            (r["latitude"], r["longitude"]) for r in restaurants
+            if r.get("latitude") is not None and r.get("longitude") is not None
+        ]
+        if not points:
+            return []
+        lat = sum(p[0] for p in points) / len(points)
+        lon = sum(p[1] for p in points) / len(points)
+        exclude = {r.get("restaurant_id") for r in restaurants}
+
+        def _accept(r):
+            return r.get("restaurant_id") not in exclude and (accept is None or accept(r))
+
+        return self.nearest(lat, lon, k=k, accept=_accept, max_km=max_km)
+
+    def search(self, location):
+        """Restaurants whose location or city contains `location`, largest first"""
+        return self.resolve(location)[0]
+
+    def resolve(self, location):
+        """Match a location query, tolerating aliases and typos.
+
+        Returns (restaurants, matched) where `matched` is the alias or fuzzy
+        term the query was resolved to, or None for a direct match. Tries,
+        in order: precomputed token results, substring match, alias, address
+        tokens, then the best fuzzy candidates.
+        """
+        self._refresh()
+        query = " ".join(str(location or "").lower().split())
+        if not query:
+            return [], None
+
+        cached = self._results.get(query)
+        if cached is not None:
+            return list(cached), None
+
+        ids = self._candidates(query)
+        if ids:
+            return self._ordered(ids), None
+
+        target = self._vocab.get(query)
+        if target is not None:
+            return list(self._results[target]), target
+
+        ids = self._address_candidates(query)
+        if ids:
+            return self._ordered(ids), None
+
+        candidates = self.fuzzy_match(query)
+        if not candidates:
+            return [], None
+        best = candidates[0][1]
+        ids = set()
+        for term, score in candidates:
+            if score < best - 0.05:
+                break
+            ids.update(r.get("restaurant_id") for r in self._results[term])
+        return self._ordered(ids), candidates[0][0]
+
+    def fuzzy_match(self, query, limit=5):
+        """Ranked (term, score) candidates by trigram Dice similarity.
+
+        Only vocabulary terms sharing at least one trigram with the query are
+        scored, so this is a few dictionary lookups plus a Counter.
+        """
+        self._refresh()
+        query = " ".join(str(query or "").lower().split())
+        grams = _padded_trigrams(query)
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            for term in self._vocab_trigrams.get(gram, ()):
+                shared[term] += 1
+
+        best = {}
+        for term, common in shared.items():
+            score = 2.0 * common / (len(grams) + self._vocab_sizes[term])
+            if score < self.fuzzy_threshold:
+                continue
+            target = self._vocab[term]
+            if score > best.get(target, 0.0):
+                best[target] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], self._rank_of(item[0])))
+        return ranked[:limit]
+
+    def _rank_of(self, term):
+        hits = self._results.get(term)
+        return self._rank[hits[0].get("restaurant_id")] if hits else len(self._rank)
+
+    def _candidates(self, query):
+        if len(query) >= 3:
+            grams = _ngrams(query)
+            postings = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+            if not postings[0]:
+                return set()
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            candidates = self._fields.keys()
+        return {
+            rid for rid in candidates
+            if query in self._fields[rid][0] or query in self._fields[rid][1]
+        }
+
+    def _address_candidates(self, query):
+        words = _TOKEN_RE.findall(query)
+        if not words:
+            return set()
+        postings = [self._address_tokens.get(w, set()) for w in words]
+        return set(postings[0]).intersection(*postings[1:])
+
+    def _ordered(self, ids):
+        return [self._by_id[rid] for rid in sorted(ids, key=self._rank.__getitem__)]
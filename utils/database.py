@@ -1,40 +1,184 @@
 """
 Database Utilities
-JSON file-based database operations
+Restaurant data from JSON; reservations through a pluggable storage backend
 """
 
+import atexit
 import json
+import threading
+import time
 from config.settings import settings
+from utils.catalog import RestaurantCatalog
+from utils.journal import ReservationJournal
+from utils.reservation_store import ReservationStore
+from utils.sqlite_store import SQLiteReservationStore
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+_reservation_store = None
+_reservation_store_lock = threading.Lock()
+_restaurant_catalog = None
+
+
+class WriteCoalescer:
+    """Group commit in front of a reservation store.
+
+    add/update write through to the store immediately (so compare-and-swap
+    and other processes see them at once) and then wait for durability;
+    replace_all is already durable when the store returns. The first waiter
+    becomes the batch leader: it waits until every other in-flight write
+    has joined the batch, or `window_ms` has passed, then makes everything
+    written so far durable with one store.sync() (one fsync) and releases
+    every caller it covered. Writes that arrive while a sync runs form the
+    next batch. Reads pass straight through.
+    """
+
+    def __init__(self, store, window_ms=10):
+        self.store = store
+        self.window = window_ms / 1000.0
+        self._cond = threading.Condition()
+        self._active = 0  # writers between starting their write and its acknowledgement
+        self._waiting = 0  # of those, writers whose write is done
+        self._written = 0  # tickets handed out, one per completed write
+        self._durable = 0  # highest ticket a sync has covered
+        self._failed = (0, None)  # (highest ticket, error) of the last failed sync
+        self._leading = False
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def add(self, *args, **kwargs):
+        return self._commit(self.store.add, args, kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._commit(self.store.update, args, kwargs)
+
+    def replace_all(self, *args, **kwargs):
+        return self._commit(self.store.replace_all, args, kwargs)
+
+    def _commit(self, write, args, kwargs):
+        with self._cond:
+            self._active += 1
+        try:
+            result = write(*args, **kwargs)
+            # None: nothing was written (lost compare-and-swap, unknown ID), or replace_all, which every store
+            # makes durable itself before returning (fsynced rewrite, or an explicit sync on SQLite)
+            if result is not None:
+                self._wait_durable()
+            return result
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _wait_durable(self):
+        with self._cond:
+            self._written += 1
+            ticket = self._written
+            self._waiting += 1
+            self._cond.notify_all()
+            try:
+                while self._durable < ticket:
+                    if self._failed[0] >= ticket:
+                        raise self._failed[1]
+                    if not self._leading:
+                        self._leading = True
+                        break
+                    self._cond.wait()
+                else:
+                    return
+
+                # Leader: give writers still in flight until the deadline to join this batch
+                deadline = time.monotonic() + self.window
+                while self._waiting < self._active:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                covered = self._written
+            finally:
+                self._waiting -= 1
+
+        error = None
+        try:
+            self.store.sync()
+        except Exception as e:
+            error = e
+        with self._cond:
+            if error is None:
+                self._durable = max(self._durable, covered)
+            else:
+                self._failed = (covered, error)
+            self._leading = False
+            self._cond.notify_all()
+        if error is not None:
+            raise error
+
+
+def get_reservation_store():
+    """Process-wide reservation store, loaded on first use"""
+    global _reservation_store
+    if _reservation_store is None:
+        with _reservation_store_lock:
+            if _reservation_store is None:
+                store = _create_reservation_store()
+                if settings.WRITE_GROUP_COMMIT:
+                    store = WriteCoalescer(store, window_ms=settings.WRITE_GROUP_COMMIT_WINDOW_MS)
+                atexit.register(store.close)
+                _reservation_store = store
+    return _reservation_store
+
+def _create_reservation_store():
+    """Build the storage backend selected by settings.STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "sqlite":
+        # The JSON snapshot seeds an empty database and stays the import/export format
+        return SQLiteReservationStore(
+            settings.SQLITE_DB,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            seed_json=settings.RESERVATIONS_DB,
+        )
+    if settings.STORAGE_BACKEND != "json":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+    persistence = None
+    if settings.RESERVATIONS_PERSISTENCE == "journal":
+        persistence = ReservationJournal(
+            settings.RESERVATIONS_DB,
+            settings.RESERVATIONS_JOURNAL,
+            fsync_interval_ms=settings.JOURNAL_FSYNC_INTERVAL_MS,
+            compact_every=settings.JOURNAL_COMPACT_EVERY,
+            shared=settings.JOURNAL_SHARED,
+        )
+    return ReservationStore(settings.RESERVATIONS_DB, persistence)
+
+def get_restaurant_catalog():
+    """Process-wide restaurant catalog; reloads itself when restaurants.json changes"""
+    global _restaurant_catalog
+    if _restaurant_catalog is None:
+        with _reservation_store_lock:
+            if _restaurant_catalog is None:
+                _restaurant_catalog = RestaurantCatalog(
+                    settings.RESTAURANTS_DB,
+                    aliases_path=settings.LOCATION_ALIASES_DB,
+                    fuzzy_threshold=settings.FUZZY_MATCH_THRESHOLD,
+                )
+    return _restaurant_catalog
 
 def load_restaurants():
-    """Load restaurants from JSON"""
-    try:
-        with open(settings.RESTAURANTS_DB, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        print(f"Error reading {settings.RESTAURANTS_DB}")
-        return []
+    """Load restaurants (copies served from the restaurant catalog)"""
+    return [dict(r) for r in get_restaurant_catalog().all()]
 
 def load_reservations():
-    """Load reservations from JSON"""
-    try:
-        with open(settings.RESERVATIONS_DB, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        print(f"Error reading {settings.RESERVATIONS_DB}")
-        return []
+    """Load all reservations (copies served from the reservation store)"""
+    return get_reservation_store().all()
 
 def save_reservations(reservations):
-    """Save reservations to JSON"""
+    """Replace all reservations. Prefer the store's add/update for single changes."""
     try:
-        with open(settings.RESERVATIONS_DB, 'w') as f:
-            json.dump(reservations, f, indent=2)
+        get_reservation_store().replace_all(reservations)
     except Exception as e:
-        print(f"Error saving reservations: {e}")
+        log.error("Error saving reservations: %s", e)
         raise
 
 def load_constraints():
@@ -45,5 +189,5 @@ def load_constraints():
     except FileNotFoundError:
         return {}
     except json.JSONDecodeError:
-        print(f"Error reading {settings.CONSTRAINTS_DB}")
+        log.error("Error reading %s", settings.CONSTRAINTS_DB)
         return {}
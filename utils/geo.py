@@ -0,0 +1,95 @@
+"""
+Geo Utilities
+Great-circle distances and a k-d tree for nearest-restaurant queries
+"""
+
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlam = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _to_xyz(lat, lon):
+    """Point on the unit sphere; chord length is monotonic in great-circle distance"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class KDTree:
+    """Static 3-d tree over (lat, lon, item) points.
+
+    Points are embedded on the unit sphere so plain Euclidean pruning gives
+    exact great-circle nearest neighbours, with no special cases at the
+    antimeridian or poles.
+    """
+
+    def __init__(self, points):
+        nodes = [(_to_xyz(lat, lon), item) for lat, lon, item in points]
+        self._root = self._build(nodes, 0)
+        self.size = len(nodes)
+
+    def _build(self, nodes, depth):
+        if not nodes:
+            return None
+        axis = depth % 3
+        nodes.sort(key=lambda n: n[0][axis])
+        mid = len(nodes) // 2
+        return (
+            nodes[mid][0],
+            nodes[mid][1],
+            axis,
+            self._build(nodes[:mid], depth + 1),
+            self._build(nodes[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, lat, lon, k=3, accept=None, max_km=None):
+        """Up to k (distance_km, item) pairs, closest first.
+
+        `accept(item)` filters candidates during the search, so "nearest k
+        that still have a free table" costs no more than needed.
+        """
+        if self._root is None or k <= 0:
+            return []
+        target = _to_xyz(lat, lon)
+        limit = float("inf") if max_km is None else 2 * math.sin(max_km / (2 * EARTH_RADIUS_KM))
+        best = []  # max-heap of (-distance_sq, counter, item)
+        counter = 0
+
+        def bound():
+            if len(best) < k:
+                return limit * limit
+            return min(-best[0][0], limit * limit)
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, item, axis, left, right = node
+            dist_sq = sum((p - t) ** 2 for p, t in zip(point, target))
+            if dist_sq <= bound() and (accept is None or accept(item)):
+                counter += 1
+                heapq.heappush(best, (-dist_sq, counter, item))
+                if len(best) > k:
+                    heapq.heappop(best)
+            delta = target[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            # Visit the near side first (pushed last); the far side only if the split plane is within range
+            if delta * delta <= bound():
+                stack.append(far)
+            stack.append(near)
+
+        return [(_chord_to_km(math.sqrt(-d)), item) for d, _, item in sorted(best, reverse=True)]
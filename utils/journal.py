@@ -0,0 +1,368 @@
+"""
+Reservation Journal
+Append-only write-ahead log on top of the reservations.json snapshot
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from utils.reservation_store import JsonArrayFile
+from utils.log import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so a journal can't be shared between processes
+    fcntl = None
+
+log = get_logger(__name__)
+
+_GENERATION = struct.Struct("<QQ")  # generation, epoch
+
+
+class FileLock:
+    """fcntl advisory lock on `path`, for serializing processes.
+
+    flock() locks belong to the open file, so threads of one process go
+    through a threading.RLock first, and nested holds by the same thread
+    don't touch the file lock again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def hold(self, shared=False):
+        with self._lock:
+            if self._depth == 0:
+                fcntl.flock(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class SharedGeneration:
+    """(generation, epoch) counters in a small mmap'ed file shared by every process using a journal.
+
+    The generation advances with every journal write and the epoch with
+    every rotation or rewrite. Reading them is a memory access, so a process
+    can check for other processes' writes before every read.
+    """
+
+    def __init__(self, path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < _GENERATION.size:
+                os.ftruncate(fd, _GENERATION.size)
+            self._map = mmap.mmap(fd, _GENERATION.size)
+        finally:
+            os.close(fd)
+
+    def read(self):
+        return _GENERATION.unpack_from(self._map)
+
+    def write(self, generation, epoch):
+        _GENERATION.pack_into(self._map, 0, generation, epoch)
+
+
+class ReservationJournal:
+    """Journaled persistence for ReservationStore.
+
+    Every mutation is appended to the journal as one JSON line
+    (``{"op": "put", "record": {...}}``) and flushed to the OS, so a process
+    crash never loses an acknowledged write. fsync is batched: a background
+    thread syncs the journal at most every ``fsync_interval_ms``. On startup
+    the snapshot is loaded and the journal replayed on top of it (puts are
+    upserts by confirmation_id, so replay is idempotent). Once the journal
+    holds ``compact_every`` entries it is rotated and a background thread
+    folds it into a new snapshot, written atomically.
+
+    With ``shared=True`` several processes can use the same files. Writers
+    serialize on an fcntl lock (``<journal>.lock``) and catch up with the
+    other processes' entries before writing; after each write they advance
+    the generation in ``<journal>.gen``. Readers compare that generation
+    with the last one they saw and, only when it changed, replay the
+    journal from where they stopped (or reload everything if the journal
+    was compacted past them). Snapshot loads and compaction exclude each
+    other through ``<journal>.snapshot.lock``.
+    """
+
+    def __init__(self, snapshot_path, journal_path, fsync_interval_ms=50, compact_every=500, shared=False):
+        self.snapshot = JsonArrayFile(snapshot_path)
+        self.journal_path = journal_path
+        self.rotated_path = f"{journal_path}.1"
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.compact_every = compact_every
+
+        self._file = None
+        self._entries = 0
+        self._dirty = False
+        self._closed = False
+        self._io_lock = threading.Lock()
+        self._fsync_thread = None
+        self._compaction = None
+
+        if shared and fcntl is None:
+            log.warning("fcntl is not available; %s can only be used by one process", journal_path)
+            shared = False
+        self.shared = shared
+        if shared:
+            self._writer_lock = FileLock(f"{journal_path}.lock")
+            self._snapshot_lock = FileLock(f"{journal_path}.snapshot.lock")
+            self._generation = SharedGeneration(f"{journal_path}.gen")
+        self._seen = None  # (generation, epoch) this process has applied
+        self._offset = 0  # bytes of the current journal this process has applied
+
+    # Persistence interface used by ReservationStore
+
+    def load(self):
+        if not self.shared:
+            return self._load()
+        with self._writer_lock.hold(), self._snapshot_lock.hold(shared=True):
+            seen = self._generation.read()
+            records = self._load()
+            self._seen = seen
+            self._offset = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+            with self._io_lock:
+                self._close_file()
+            return records
+
+    def _load(self):
+        records = self.snapshot.load()
+        replayed = 0
+        for path in (self.rotated_path, self.journal_path):
+            for entry in self._read_entries(path):
+                record = entry.get("record") or {}
+                row = records.row_of(record.get("confirmation_id"))
+                if row is not None:
+                    records[row] = record
+                else:
+                    records.append(record)
+                replayed += 1
+        self._entries = replayed
+        return records
+
+    def append(self, records):
+        self._write(records[-1], records)
+
+    def update(self, records, row):
+        self._write(records[row], records)
+
+    def rewrite(self, records):
+        """Replace everything: write a fresh snapshot and start an empty journal"""
+        self.wait_for_compaction()
+        with self._io_lock, self._snapshot_guard():
+            self.snapshot.rewrite(records)
+            self._close_file()
+            for path in (self.journal_path, self.rotated_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._entries = 0
+            if self.shared:
+                # Skip an epoch so every other process reloads instead of replaying
+                generation, epoch = self._generation.read()
+                self._seen = (generation + 1, epoch + 2)
+                self._generation.write(*self._seen)
+                self._offset = 0
+
+    def sync(self):
+        """fsync the journal now. The in-process I/O lock is only held to duplicate the
+        descriptor, so writers keep appending while the disk catches up."""
+        with self._io_lock:
+            if not self._dirty or self._file is None:
+                return
+            self._file.flush()
+            fd = os.dup(self._file.fileno())
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def exclusive(self):
+        """Hold the cross-process writer lock (a no-op unless shared); the store wraps each mutation in it"""
+        return self._writer_lock.hold() if self.shared else nullcontext()
+
+    def stale(self):
+        """Whether another process has written since this one last loaded or caught up"""
+        return self.shared and self._generation.read() != self._seen
+
+    def catch_up(self):
+        """Records other processes wrote since the last load/catch_up, or None if a full load() is needed"""
+        with self._writer_lock.hold():
+            current = self._generation.read()
+            generation, epoch = self._seen
+            records = []
+            if current[1] != epoch:
+                # The journal we were reading was rotated; finish it from the rotated file
+                if current[1] != epoch + 1:
+                    return None
+                try:
+                    rotated, _ = _read_tail(self.rotated_path, self._offset)
+                except FileNotFoundError:
+                    return None  # already folded into the snapshot
+                records.extend(rotated)
+                self._offset = 0
+                self._entries = 0
+                with self._io_lock:
+                    self._close_file()  # our handle still points at the rotated file
+            try:
+                tail, self._offset = _read_tail(self.journal_path, self._offset)
+            except FileNotFoundError:
+                tail = []
+            records.extend(tail)
+            self._entries += len(tail)
+            self._seen = current
+            return records
+
+    def close(self):
+        """Flush, fsync and stop background work"""
+        self.wait_for_compaction()
+        with self._io_lock:
+            self._closed = True
+            self._close_file()
+
+    # Journal I/O
+
+    def _read_entries(self, path):
+        """Yield journal entries; a torn final line from a crash is dropped and truncated away"""
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            good_end = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    log.warning("Error reading %s: dropping torn entry at byte %d", path, good_end)
+                    f.truncate(good_end)
+                    return
+                good_end += len(line)
+                if entry.get("op") == "put":
+                    yield entry
+
+    def _open_file(self):
+        if self._file is None:
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        self._dirty = False
+
+    def _write(self, record, records):
+        line = json.dumps({"op": "put", "record": record}) + "\n"
+        with self._io_lock:
+            f = self._open_file()
+            f.write(line)
+            f.flush()
+            self._dirty = True
+            self._entries += 1
+            if self.shared:
+                # The store holds the writer lock and has caught up, so this line ends the journal
+                self._offset += len(line.encode("utf-8"))
+                self._seen = (self._generation.read()[0] + 1, self._seen[1])
+                self._generation.write(*self._seen)
+        self._ensure_fsync_thread()
+        if self._entries >= self.compact_every:
+            self._start_compaction(records)
+
+    def _ensure_fsync_thread(self):
+        if self._fsync_thread is None:
+            self._fsync_thread = threading.Thread(target=self._fsync_loop, name="reservation-journal-fsync", daemon=True)
+            self._fsync_thread.start()
+
+    def _fsync_loop(self):
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            with self._io_lock:
+                if self._dirty and self._file is not None:
+                    os.fsync(self._file.fileno())
+                    self._dirty = False
+
+    # Compaction
+
+    def _start_compaction(self, records):
+        """Rotate the journal and fold it into the snapshot in the background.
+
+        Called under the store lock, so the copied rows are exactly the state
+        the rotated journal describes.
+        """
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        if os.path.exists(self.rotated_path):
+            # A previous compaction failed, so the journal can't be rotated onto it. The rows
+            # are the state of snapshot + both journals: fold them all into a new snapshot now.
+            log.warning("Retrying failed compaction of %s inline", self.journal_path)
+            try:
+                self.rewrite(records)
+            except Exception:
+                log.exception("Error compacting %s; will retry after %d more entries", self.journal_path, self.compact_every)
+                self._entries = 0
+            return
+        with self._io_lock:
+            self._close_file()
+            os.replace(self.journal_path, self.rotated_path)
+            self._entries = 0
+            if self.shared:
+                generation, epoch = self._generation.read()
+                self._seen = (generation, epoch + 1)
+                self._generation.write(*self._seen)
+                self._offset = 0
+        rows = records.copy()  # the store's ReservationTable: a copy of its arrays, not of every row
+        self._compaction = threading.Thread(target=self._compact, args=(rows,), name="reservation-journal-compact", daemon=True)
+        self._compaction.start()
+
+    def _compact(self, rows):
+        try:
+            with self._snapshot_guard():
+                self.snapshot.rewrite(rows)
+                os.remove(self.rotated_path)
+        except Exception:
+            log.exception("Error compacting %s; %s is kept and replayed on load", self.journal_path, self.rotated_path)
+
+    def wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def _snapshot_guard(self):
+        """Keeps other processes from loading while the snapshot and rotated journal are swapped"""
+        return self._snapshot_lock.hold() if self.shared else nullcontext()
+
+
+def _read_tail(path, offset):
+    """(put records, end offset) for the complete lines of a journal from byte `offset`"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            log.warning("Error reading %s: skipping unreadable entry", path)
+            continue
+        if entry.get("op") == "put":
+            records.append(entry.get("record") or {})
+    return records, offset + end
@@ -0,0 +1,92 @@
+"""
+Logging
+Leveled, queued logging with per-module levels and phone-number redaction
+
+    log = get_logger(__name__)
+    log.debug("search returned %d options", len(options))
+
+Messages use %-style arguments, so nothing is formatted unless the level is
+enabled; guard anything costlier than the arguments themselves with
+log.isEnabledFor(logging.DEBUG). Records pass through a QueueHandler to a
+QueueListener thread, which redacts phone numbers and writes them out, so
+the request path never blocks on stdout or the log file.
+
+Levels come from Settings.LOG_LEVEL (DEBUG when Settings.DEBUG is on) and
+Settings.LOG_LEVELS, e.g. "agent.conversation_manager=DEBUG,tools=WARNING".
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+
+from config.settings import settings
+
+ROOT_LOGGER = "goodfoods"
+FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+# 10-digit mobile numbers, optionally with a +91 / 91 / 0 prefix; the last four digits are kept
+_PHONE_RE = re.compile(r"(?<![\w-])(?:\+?91[\s-]?|0)?[6-9]\d{5}(\d{4})(?![\w-])")
+
+_listener = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def redact(text):
+    """`text` with customer phone numbers masked ("******3210")"""
+    return _PHONE_RE.sub(r"******\1", text)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formats a record, then masks phone numbers in the result (runs on the listener thread)"""
+
+    def format(self, record):
+        return redact(super().format(record))
+
+
+def _parse_levels(spec):
+    """"module=LEVEL,other=LEVEL" -> {module: level}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _configure():
+    global _listener, _configured
+    with _configure_lock:
+        if _configured:
+            return
+        formatter = RedactingFormatter(FORMAT) if settings.LOG_REDACT_PHONES else logging.Formatter(FORMAT)
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if settings.LOG_FILE:
+            handlers.append(logging.FileHandler(settings.LOG_FILE, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.addHandler(logging.handlers.QueueHandler(records))
+        root.setLevel(settings.LOG_LEVEL.upper())
+        # Host frameworks (Streamlit) configure the stdlib root logger; keep our records out of it
+        root.propagate = False
+        for name, level in _parse_levels(settings.LOG_LEVELS).items():
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(level)
+        _configured = True
+
+
+def get_logger(name):
+    """Logger for a module (pass __name__), under the application's queued handler"""
+    if not _configured:
+        _configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
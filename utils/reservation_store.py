@@ -0,0 +1,374 @@
+"""
+Reservation Store
+Process-wide, indexed in-memory repository for reservations
+"""
+
+import json
+import os
+import threading
+from array import array
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+
+from utils.log import get_logger
+from utils.reservation_table import ReservationTable, RowIndex
+from utils.tracing import span
+
+log = get_logger(__name__)
+
+
+def _entry_text(record):
+    """Serialize one reservation the way json.dump(indent=2) lays it out inside the array"""
+    return "\n".join("  " + line for line in json.dumps(record, indent=2).split("\n"))
+
+
+class JsonArrayFile:
+    """reservations.json kept as a JSON array and patched in place.
+
+    The byte span of every record is remembered at load time so that an
+    append only rewrites the closing bracket and an update only rewrites the
+    changed record (or, if it grew, the records after it).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._spans = None  # array of [start, end) byte offsets, two per row; None = layout unknown
+        self._body_end = None  # offset just after the last record (or after "[")
+
+    def load(self):
+        """Parse the array record by record; a truncated tail keeps every complete record"""
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            self._spans, self._body_end = None, None
+            return ReservationTable()
+
+        text = raw.decode("utf-8")
+        decoder = json.JSONDecoder()
+        records, spans = ReservationTable(), array("Q")
+        pos = _skip_ws(text, 0)
+        if pos >= len(text) or text[pos] != "[":
+            log.error("Error reading %s: not a JSON array", self.path)
+            self._spans, self._body_end = None, None
+            return ReservationTable()
+        body_end = pos + 1
+        pos += 1
+
+        while True:
+            pos = _skip_ws(text, pos)
+            if pos >= len(text) or text[pos] == "]":
+                break
+            if text[pos] == ",":
+                pos += 1
+                continue
+            try:
+                record, end = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError as e:
+                log.error("Error reading %s: %s (kept %d complete records)", self.path, e, len(records))
+                break
+            records.append(record)
+            spans.extend((pos, end))
+            body_end = end
+            pos = end
+
+        # Offsets are only byte-accurate for ASCII files (json.dump's default)
+        if len(text) == len(raw):
+            self._spans, self._body_end = spans, body_end
+        else:
+            self._spans, self._body_end = None, None
+        return records
+
+    def append(self, records):
+        """Persist records[-1], which was just appended"""
+        if self._spans is None or len(self._spans) != 2 * (len(records) - 1):
+            return self.rewrite(records)
+
+        entry = _entry_text(records[-1])
+        prefix = ",\n" if self._spans else "\n"
+        with open(self.path, "r+b") as f:
+            f.seek(self._body_end)
+            f.write((prefix + entry + "\n]\n").encode("ascii"))
+            f.truncate()
+        start = self._body_end + len(prefix) + 2  # skip the two-space indent
+        self._body_end = self._body_end + len(prefix) + len(entry)
+        self._spans.extend((start, self._body_end))
+
+    def update(self, records, row):
+        """Persist records[row], which was just modified"""
+        if self._spans is None or len(self._spans) != 2 * len(records):
+            return self.rewrite(records)
+
+        start, end = self._spans[2 * row], self._spans[2 * row + 1]
+        text = _entry_text(records[row])[2:]
+        if len(text) <= end - start:
+            # Same size or smaller: overwrite and pad with whitespace
+            with open(self.path, "r+b") as f:
+                f.seek(start)
+                f.write(text.ljust(end - start).encode("ascii"))
+            return
+
+        # Grew: rewrite this record and everything after it
+        tail = [text] + [_entry_text(r) for r in records[row + 1:]]
+        with open(self.path, "r+b") as f:
+            f.seek(start)
+            f.write((",\n".join(tail) + "\n]\n").encode("ascii"))
+            f.truncate()
+        offset = start
+        for i, chunk in enumerate(tail):
+            if i:
+                offset += 4  # ",\n" plus indent
+            self._spans[2 * (row + i)] = offset
+            offset += len(chunk) - (2 if i else 0)
+            self._spans[2 * (row + i) + 1] = offset
+        self._body_end = offset
+
+    def rewrite(self, records):
+        """Write the whole array atomically in the canonical layout"""
+        entries = [_entry_text(r) for r in records]
+        body = "[\n" + ",\n".join(entries) + ("\n]\n" if entries else "]\n")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="ascii") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        spans, offset = array("Q"), 2
+        for entry in entries:
+            spans.extend((offset + 2, offset + len(entry)))
+            offset += len(entry) + 2
+        self._spans = spans
+        self._body_end = spans[-1] if spans else 1
+
+    def sync(self):
+        """fsync the file, making every write so far durable"""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Nothing is buffered; every write goes straight to the file"""
+
+    # In-place patching is single-process: there are no other writers to lock out or catch up with
+
+    def exclusive(self):
+        return nullcontext()
+
+    def stale(self):
+        return False
+
+    def catch_up(self):
+        return []
+
+
+def _skip_ws(text, pos):
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+class ReservationStore:
+    """In-memory reservations indexed by confirmation_id, phone and (restaurant_id, date).
+
+    Rows are loaded once per process into a columnar ReservationTable
+    (about 150 bytes per reservation with its indexes) and every mutation is
+    handed to the persistence layer for an incremental write. Reads return
+    dicts materialized from the table, so mutating one never bypasses
+    persistence. With shared persistence (a ReservationJournal with
+    shared=True), every call first applies other processes' writes, which
+    costs one shared memory read when there are none.
+    """
+
+    def __init__(self, path, persistence=None):
+        self.path = path
+        self.persistence = persistence or JsonArrayFile(path)
+        self._lock = threading.RLock()
+        self._version = 0
+        with span("storage.load", backend="json") as s:
+            self._reindex(self.persistence.load())
+            s.set("rows", len(self._rows))
+
+    def _reindex(self, records):
+        self._rows = records if isinstance(records, ReservationTable) else ReservationTable(records)
+        self._by_phone = RowIndex(self._rows, "phone")
+        self._by_slot = defaultdict(_row_array)
+        self._status_counts = Counter()
+        self._slot_versions = {}
+        value = self._rows.value
+        for row in range(len(self._rows)):
+            self._index_slot(row, (value(row, "restaurant_id"), value(row, "date")), value(row, "status"))
+        self._by_phone.rebuild()
+
+    def _index(self, row, record, previous=None):
+        # Confirmation IDs are indexed by the table itself
+        phone = record.get("phone")
+        if phone and (previous is None or previous.get("phone") != phone):
+            self._by_phone.add(phone, row)
+        self._index_slot(row, (record.get("restaurant_id"), record.get("date")), record.get("status"))
+
+    def _index_slot(self, row, slot, status):
+        self._by_slot[slot].append(row)
+        self._status_counts[status] += 1
+        self._touch(slot)
+
+    def _unindex(self, row, record):
+        # A phone entry stops matching once the row's phone changes, so only the slot needs removing
+        slot = (record.get("restaurant_id"), record.get("date"))
+        self._by_slot[slot].remove(row)
+        self._status_counts[record.get("status")] -= 1
+        self._touch(slot)
+
+    def _touch(self, slot):
+        self._version += 1
+        self._slot_versions[slot] = self._version
+
+    def _sync(self):
+        """Apply what other processes wrote through shared persistence since the last check"""
+        if not self.persistence.stale():
+            return
+        with self._lock:
+            records = self.persistence.catch_up()
+            if records is None:
+                self._reindex(self.persistence.load())
+                return
+            for record in records:
+                row = self._rows.row_of(record.get("confirmation_id"))
+                if row is None:
+                    self._index(self._rows.append(record), record)
+                else:
+                    previous = self._rows[row]
+                    self._unindex(row, previous)
+                    self._rows[row] = record
+                    self._index(row, record, previous)
+
+    # Reads
+
+    def all(self):
+        """All reservations, in insertion order"""
+        self._sync()
+        with self._lock:
+            return list(self._rows)
+
+    def get(self, confirmation_id):
+        """Reservation by confirmation ID, or None"""
+        self._sync()
+        with self._lock:
+            row = self._rows.row_of(confirmation_id)
+            return self._rows[row] if row is not None else None
+
+    def find_by_phone(self, phone):
+        """All reservations for a phone number, oldest first"""
+        self._sync()
+        with self._lock:
+            return [self._rows[row] for row in self._by_phone.rows(phone)]
+
+    def find(self, phone_or_id):
+        """First reservation matching a confirmation ID, falling back to phone"""
+        self._sync()
+        with self._lock:
+            row = self._rows.row_of(phone_or_id)
+            if row is None:
+                rows = self._by_phone.rows(phone_or_id)
+                row = rows[0] if rows else None
+            return self._rows[row] if row is not None else None
+
+    def for_restaurant_date(self, restaurant_id, date):
+        """All reservations at a restaurant on a date"""
+        self._sync()
+        with self._lock:
+            return [self._rows[row] for row in self._by_slot.get((restaurant_id, date), ())]
+
+    def slot_version(self, restaurant_id, date):
+        """Changes whenever a reservation at (restaurant_id, date) is added or modified"""
+        self._sync()
+        with self._lock:
+            return self._slot_versions.get((restaurant_id, date), 0)
+
+    def slot_snapshot(self, restaurant_id, date):
+        """(slot_version, reservations) for a restaurant and date, read together"""
+        self._sync()
+        with self._lock:
+            slot = (restaurant_id, date)
+            return self._slot_versions.get(slot, 0), [self._rows[row] for row in self._by_slot.get(slot, ())]
+
+    def count(self, status=None):
+        """Number of reservations, optionally only those with the given status"""
+        self._sync()
+        with self._lock:
+            if status is None:
+                return len(self._rows)
+            return self._status_counts[status]
+
+    # Writes
+
+    def add(self, reservation, expected_version=None):
+        """Append a new reservation and persist it.
+
+        With `expected_version`, this is a compare-and-swap: the reservation is
+        only added while its (restaurant_id, date) slot is still at that
+        slot_version, otherwise nothing is written and None is returned.
+        """
+        with self._lock, self.persistence.exclusive():
+            self._sync()
+            record = dict(reservation)
+            if self._rows.row_of(record.get("confirmation_id")) is not None:
+                raise ValueError(f"Duplicate confirmation_id {record['confirmation_id']}")
+            if not self._slot_at(record.get("restaurant_id"), record.get("date"), expected_version):
+                return None
+            self._index(self._rows.append(record), record)
+            with span("storage.save", backend="json", op="append"):
+                self.persistence.append(self._rows)
+            return dict(record)
+
+    def update(self, confirmation_id, expected_version=None, **changes):
+        """Apply field changes to a reservation; returns the updated copy or None.
+
+        With `expected_version`, the changes are only applied while the slot
+        the reservation ends up in is still at that slot_version (see add).
+        """
+        with self._lock, self.persistence.exclusive():
+            self._sync()
+            row = self._rows.row_of(confirmation_id)
+            if row is None:
+                return None
+            previous = self._rows[row]
+            restaurant_id = changes.get("restaurant_id", previous.get("restaurant_id"))
+            if not self._slot_at(restaurant_id, changes.get("date", previous.get("date")), expected_version):
+                return None
+            record = dict(previous, **changes)
+            self._unindex(row, previous)
+            self._rows[row] = record
+            self._index(row, record, previous)
+            with span("storage.save", backend="json", op="update"):
+                self.persistence.update(self._rows, row)
+            return dict(record)
+
+    def _slot_at(self, restaurant_id, date, expected_version):
+        return expected_version is None or self._slot_versions.get((restaurant_id, date), 0) == expected_version
+
+    def sync(self):
+        """Make every write so far durable (without holding the store lock, so writers keep going)"""
+        self.persistence.sync()
+
+    def close(self):
+        """Flush anything the persistence layer still buffers"""
+        with self._lock:
+            self.persistence.close()
+
+    def replace_all(self, reservations):
+        """Replace every reservation (legacy save_reservations path)"""
+        with self._lock, self.persistence.exclusive():
+            self._sync()
+            self._reindex(reservations)
+            with span("storage.save", backend="json", op="rewrite"):
+                self.persistence.rewrite(self._rows)
+
+
+def _row_array():
+    return array("I")
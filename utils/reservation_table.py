@@ -0,0 +1,403 @@
+"""
+Reservation Table
+Columnar in-memory storage for reservations, with dicts materialized on demand
+"""
+
+from array import array
+from datetime import date, datetime, timedelta
+
+# Field order of reservations written by the tools (and of the JSON files)
+FIELDS = (
+    "confirmation_id",
+    "restaurant_id",
+    "restaurant_name",
+    "customer_name",
+    "phone",
+    "date",
+    "time",
+    "party_size",
+    "special_requests",
+    "status",
+    "created_at",
+)
+
+# Free-text fields, packed into one UTF-8 blob per row
+TEXT_FIELDS = ("confirmation_id", "customer_name", "phone", "special_requests")
+_SEP = "\x1f"
+_NONE = "\x1e"
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_EMPTY = -1
+
+
+class ReservationTable:
+    """Reservations as parallel typed arrays instead of one dict per row.
+
+    Per row: restaurant (id, name) pair, status and key layout are codes into
+    small interned tables; date is a day ordinal, time minutes since
+    midnight, party_size a short and created_at microseconds since the
+    epoch; the text fields share one UTF-8 blob. That is about 40 bytes plus
+    the text, against roughly 1 KB for a dict of strings.
+
+    A value that would not round-trip exactly (a non-ISO date, "7:30", a
+    party size given as a string, a key outside FIELDS...) is kept as is in
+    a per-row overflow dict, so rows[i] always returns what was stored.
+    Indexing returns a new dict; the table is a sequence of rows, so the
+    persistence layer can iterate, slice and index it like a list.
+    """
+
+    def __init__(self, records=()):
+        self._text = bytearray()
+        self._text_start = array("Q")
+        self._text_len = array("I")
+        self._restaurant = array("I")
+        self._status = array("H")
+        self._layout = array("H")
+        self._date = array("i")
+        self._time = array("h")
+        self._party = array("h")
+        self._created = array("q")
+        self._extras = {}  # row -> {field: value} for values kept as is
+
+        # Interning tables; code 0 of each stands for "not representable, see _extras"
+        self._restaurants, self._restaurant_codes = [(None, None)], {(None, None): 0}
+        self._statuses, self._status_codes = [None], {None: 0}
+        self._layouts, self._layout_codes = [], {}
+        self._dates, self._date_codes = {}, {}  # day ordinal <-> "YYYY-MM-DD"
+        self._times, self._time_codes = {}, {}  # minutes <-> "HH:MM"
+
+        self._ids = RowIndex(self, "confirmation_id")
+        for record in records:
+            self.append(record)
+
+    # Sequence protocol
+
+    def __len__(self):
+        return len(self._layout)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._materialize(row)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._materialize(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("reservation row out of range")
+        return self._materialize(row)
+
+    def __setitem__(self, row, record):
+        if row < 0:
+            row += len(self)
+        previous_id = self.value(row, "confirmation_id")
+        start, length = self._text_start[row], self._text_len[row]
+        values, extra = self._encode(record, self._text[start:start + length])
+        for column, value in zip(_COLUMNS[1:], values):
+            if value is not None:
+                getattr(self, column)[row] = value
+        if extra:
+            self._extras[row] = extra
+        else:
+            self._extras.pop(row, None)
+        if record.get("confirmation_id") != previous_id:
+            self._ids.add(record.get("confirmation_id"), row)
+
+    def append(self, record):
+        """Add a row; returns its row number"""
+        row = len(self)
+        (text_start, text_len, restaurant, status, layout, day, minutes, party, created), extra = self._encode(record)
+        self._text_start.append(text_start)
+        self._text_len.append(text_len)
+        self._restaurant.append(restaurant)
+        self._status.append(status)
+        self._layout.append(layout)
+        self._date.append(day)
+        self._time.append(minutes)
+        self._party.append(party)
+        self._created.append(created)
+        if extra:
+            self._extras[row] = extra
+        self._ids.add(record.get("confirmation_id"), row)
+        return row
+
+    def copy(self):
+        """Independent copy; the columns are copied as arrays, no row is materialized"""
+        other = ReservationTable()
+        for column in _COLUMNS:
+            setattr(other, column, getattr(self, column)[:])
+        other._extras = {row: dict(extra) for row, extra in self._extras.items()}
+        for values, codes in _INTERNED:
+            setattr(other, values, type(getattr(self, values))(getattr(self, values)))
+            setattr(other, codes, dict(getattr(self, codes)))
+        other._ids = self._ids.copy(other)
+        return other
+
+    # Field access without materializing the row
+
+    def row_of(self, confirmation_id):
+        """First row with this confirmation ID, or None"""
+        return self._ids.first(confirmation_id)
+
+    def value(self, row, field, default=None):
+        """One field of a row"""
+        if field not in self._layouts[self._layout[row]]:
+            return default
+        extra = self._extras.get(row)
+        if extra is not None and field in extra:
+            return extra[field]
+        if field in TEXT_FIELDS:
+            return self._texts(row)[TEXT_FIELDS.index(field)]
+        if field == "restaurant_id":
+            return self._restaurants[self._restaurant[row]][0]
+        if field == "restaurant_name":
+            return self._restaurants[self._restaurant[row]][1]
+        if field == "status":
+            return self._statuses[self._status[row]]
+        if field == "date":
+            return self._dates.get(self._date[row])
+        if field == "time":
+            return self._times.get(self._time[row])
+        if field == "party_size":
+            return self._party[row]
+        return (_EPOCH + self._created[row] * _MICROSECOND).isoformat()
+
+    def nbytes(self):
+        """Approximate bytes held by the columns, text blob and ID index (not the small interning tables)"""
+        return sum(getattr(self, column).itemsize * len(getattr(self, column)) for column in _COLUMNS[1:]) \
+            + len(self._text) + self._ids.nbytes()
+
+    # Encoding
+
+    def _encode(self, record, previous_text=None):
+        """Column values for `record` (text_start/text_len are None when `previous_text` can be kept) and its overflow dict"""
+        layout = tuple(record)
+        extra = {} if layout == FIELDS else {key: value for key, value in record.items() if key not in FIELDS}
+
+        texts = []
+        for field in TEXT_FIELDS:
+            value = record.get(field)
+            if value is None:
+                texts.append(_NONE)
+            elif isinstance(value, str) and _SEP not in value and _NONE not in value:
+                texts.append(value)
+            else:
+                extra[field] = value
+                texts.append("")
+        encoded = _SEP.join(texts).encode("utf-8")
+        if encoded == previous_text:
+            # Unchanged text (the usual update) keeps its bytes; changed text leaves the old bytes behind
+            text_start = text_len = None
+        else:
+            text_start, text_len = len(self._text), len(encoded)
+            self._text += encoded
+
+        pair = (record.get("restaurant_id"), record.get("restaurant_name"))
+        restaurant = _intern(pair, self._restaurants, self._restaurant_codes)
+        if not restaurant and pair != (None, None):
+            extra["restaurant_id"], extra["restaurant_name"] = pair
+        status = _intern(record.get("status"), self._statuses, self._status_codes)
+        if not status and record.get("status") is not None:
+            extra["status"] = record["status"]
+
+        party = record.get("party_size")
+        if type(party) is not int or not -0x8000 <= party < 0x8000:
+            extra["party_size"] = party
+            party = 0
+
+        values = (
+            text_start,
+            text_len,
+            restaurant,
+            status,
+            _intern(layout, self._layouts, self._layout_codes),
+            self._encode_date(record, extra),
+            self._encode_time(record, extra),
+            party,
+            self._encode_created(record, extra),
+        )
+        return values, extra
+
+    def _encode_date(self, record, extra):
+        value = record.get("date")
+        ordinal = self._date_codes.get(value) if isinstance(value, str) else None
+        if ordinal is not None:
+            return ordinal
+        try:
+            ordinal = date.fromisoformat(value).toordinal()
+        except (TypeError, ValueError):
+            ordinal = None
+        if ordinal is None or date.fromordinal(ordinal).isoformat() != value:
+            extra["date"] = value
+            return 0
+        self._date_codes[value] = ordinal
+        self._dates[ordinal] = value
+        return ordinal
+
+    def _encode_time(self, record, extra):
+        value = record.get("time")
+        minutes = self._time_codes.get(value) if isinstance(value, str) else None
+        if minutes is not None:
+            return minutes
+        hour, _, minute = str(value).partition(":")
+        if not (isinstance(value, str) and len(value) == 5 and hour.isdigit() and minute.isdigit()
+                and int(hour) < 24 and int(minute) < 60):
+            extra["time"] = value
+            return _EMPTY
+        minutes = int(hour) * 60 + int(minute)
+        self._time_codes[value] = minutes
+        self._times[minutes] = value
+        return minutes
+
+    def _encode_created(self, record, extra):
+        value = record.get("created_at")
+        try:
+            stamp = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            stamp = None
+        if stamp is None or stamp.tzinfo is not None or stamp.isoformat() != value:
+            extra["created_at"] = value
+            return 0
+        return (stamp - _EPOCH) // _MICROSECOND
+
+    # Decoding
+
+    def _texts(self, row):
+        start = self._text_start[row]
+        parts = self._text[start:start + self._text_len[row]].decode("utf-8").split(_SEP)
+        return [None if part == _NONE else part for part in parts]
+
+    def _materialize(self, row):
+        layout = self._layouts[self._layout[row]]
+        confirmation_id, customer_name, phone, special_requests = self._texts(row)
+        restaurant_id, restaurant_name = self._restaurants[self._restaurant[row]]
+        record = {
+            "confirmation_id": confirmation_id,
+            "restaurant_id": restaurant_id,
+            "restaurant_name": restaurant_name,
+            "customer_name": customer_name,
+            "phone": phone,
+            "date": self._dates.get(self._date[row]),
+            "time": self._times.get(self._time[row]),
+            "party_size": self._party[row],
+            "special_requests": special_requests,
+            "status": self._statuses[self._status[row]],
+            "created_at": (_EPOCH + self._created[row] * _MICROSECOND).isoformat(),
+        }
+        extra = self._extras.get(row)
+        if extra:
+            record.update(extra)
+        if layout == FIELDS:
+            return record
+        return {key: record[key] for key in layout}
+
+
+# Per-row columns (the text blob first) and (values, codes) interning tables, for copy() and nbytes()
+_COLUMNS = ("_text", "_text_start", "_text_len", "_restaurant", "_status", "_layout", "_date", "_time", "_party", "_created")
+_INTERNED = (
+    ("_restaurants", "_restaurant_codes"),
+    ("_statuses", "_status_codes"),
+    ("_layouts", "_layout_codes"),
+    ("_dates", "_date_codes"),
+    ("_times", "_time_codes"),
+)
+
+
+def _intern(value, values, codes):
+    """Code for `value`, adding it to the table; 0 for unhashable values"""
+    try:
+        code = codes.get(value)
+    except TypeError:
+        return 0
+    if code is None:
+        code = codes[value] = len(values)
+        if isinstance(values, list):
+            values.append(value)
+    return code
+
+
+class RowIndex:
+    """Open-addressing hash index from a field's (truthy) value to row numbers.
+
+    Slots live in two arrays (row, 32-bit hash tag), about 16 bytes per row.
+    A key may map to several rows. Lookups check candidates against the
+    table, so when a row's value changes its old entry simply stops
+    matching; stale entries are dropped whenever the index grows.
+    """
+
+    def __init__(self, table, field):
+        self.table = table
+        self.field = field
+        self._rows = array("i", [_EMPTY]) * 16
+        self._tags = array("I", [0]) * 16
+        self._used = 0
+
+    def add(self, key, row):
+        if not key:
+            return
+        if (self._used + 1) * 2 > len(self._rows):
+            self.rebuild()  # the table already holds the row, so this inserts it too
+            return
+        self._put(hash(key), row)
+        self._used += 1
+
+    def rows(self, key):
+        """Rows whose value is `key`, in row order"""
+        if not key:
+            return []
+        h = hash(key)
+        tag = (h >> 32) & 0xFFFFFFFF
+        mask = len(self._rows) - 1
+        i = h & mask
+        found = []
+        value = self.table.value
+        while True:
+            row = self._rows[i]
+            if row == _EMPTY:
+                break
+            if self._tags[i] == tag and value(row, self.field) == key:
+                found.append(row)
+            i = (i + 1) & mask
+        if len(found) > 1:
+            found = sorted(set(found))
+        return found
+
+    def first(self, key):
+        found = self.rows(key)
+        return found[0] if found else None
+
+    def copy(self, table):
+        other = RowIndex(table, self.field)
+        other._rows, other._tags, other._used = self._rows[:], self._tags[:], self._used
+        return other
+
+    def nbytes(self):
+        return len(self._rows) * (self._rows.itemsize + self._tags.itemsize)
+
+    def _put(self, h, row):
+        mask = len(self._rows) - 1
+        i = h & mask
+        while self._rows[i] != _EMPTY:
+            i = (i + 1) & mask
+        self._rows[i] = row
+        self._tags[i] = (h >> 32) & 0xFFFFFFFF
+
+    def _resize(self, size):
+        self._rows = array("i", [_EMPTY]) * size
+        self._tags = array("I", [0]) * size
+        self._used = 0
+        value = self.table.value
+        for row in range(len(self.table)):
+            key = value(row, self.field)
+            if key:
+                self._put(hash(key), row)
+                self._used += 1
+
+    def rebuild(self):
+        """Index every row of the table from scratch, dropping stale entries; sized with room to grow"""
+        size = 16
+        while size < 4 * len(self.table):
+            size *= 2
+        self._resize(size)
@@ -0,0 +1,62 @@
+"""
+Session Store
+Persists per-session conversation state so evicted sessions can be restored
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from utils.log import get_logger
+from utils.tracing import span
+
+log = get_logger(__name__)
+
+_SAFE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,100}$")
+
+
+class SessionStore:
+    """One JSON file per session under `directory`.
+
+    Writes go through a temp file and os.replace, so a crash mid-save
+    leaves the previous state intact. Session IDs that aren't safe file
+    names are hashed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        name = session_id if _SAFE_ID_RE.match(session_id) and not session_id.startswith(".") else (
+            hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        )
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, session_id):
+        """Saved state for `session_id`, or None"""
+        try:
+            with span("session.load"), open(self._path(session_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError:
+            log.error("Error reading saved session %s", session_id)
+            return None
+
+    def save(self, session_id, state):
+        path = self._path(session_id)
+        tmp_path = f"{path}.tmp"
+        with span("session.save"):
+            with open(tmp_path, "w") as f:
+                json.dump(state, f, ensure_ascii=False, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
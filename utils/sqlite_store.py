@@ -0,0 +1,338 @@
+"""
+SQLite Reservation Store
+Reservation storage backend on SQLite (WAL mode) with a small connection pool
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from utils.log import get_logger
+from utils.tracing import span
+
+log = get_logger(__name__)
+
+COLUMNS = (
+    "confirmation_id",
+    "restaurant_id",
+    "restaurant_name",
+    "customer_name",
+    "phone",
+    "date",
+    "time",
+    "party_size",
+    "special_requests",
+    "status",
+    "created_at",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    confirmation_id TEXT NOT NULL UNIQUE,
+    restaurant_id TEXT,
+    restaurant_name TEXT,
+    customer_name TEXT,
+    phone TEXT,
+    date TEXT,
+    time TEXT,
+    party_size INTEGER,
+    special_requests TEXT,
+    status TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reservations_phone ON reservations (phone);
+CREATE INDEX IF NOT EXISTS idx_reservations_slot ON reservations (restaurant_id, date, time);
+CREATE INDEX IF NOT EXISTS idx_reservations_status ON reservations (status);
+CREATE TABLE IF NOT EXISTS slot_versions (
+    restaurant_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (restaurant_id, date)
+);
+"""
+
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM reservations"
+_INSERT = (
+    f"INSERT INTO reservations ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+
+
+class ConnectionPool:
+    """Up to ``size`` SQLite connections shared between threads.
+
+    A thread keeps the connection it checked out for nested calls, so one
+    tool call never needs two connections.
+    """
+
+    def __init__(self, path, size=4, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        self._slots.acquire()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._idle.put(conn)
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+@contextmanager
+def _transaction(conn, mode="IMMEDIATE"):
+    """BEGIN ... COMMIT, rolled back on error. IMMEDIATE takes the write lock up front."""
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _bump_slot(conn, restaurant_id, date, expected_version=None):
+    """Advance a slot's version; with `expected_version`, only if it is still at that version"""
+    if expected_version is None:
+        conn.execute(
+            "INSERT INTO slot_versions (restaurant_id, date, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (restaurant_id, date) DO UPDATE SET version = version + 1",
+            (restaurant_id, date),
+        )
+        return True
+    if expected_version == 0:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO slot_versions (restaurant_id, date, version) VALUES (?, ?, 1)",
+            (restaurant_id, date),
+        )
+    else:
+        cursor = conn.execute(
+            "UPDATE slot_versions SET version = version + 1 WHERE restaurant_id = ? AND date = ? AND version = ?",
+            (restaurant_id, date, expected_version),
+        )
+    return cursor.rowcount == 1
+
+
+def _bump_all_slots(conn):
+    """After a bulk write: every slot that has (or had) rows gets a new version"""
+    conn.execute("UPDATE slot_versions SET version = version + 1")
+    conn.execute(
+        "INSERT OR IGNORE INTO slot_versions (restaurant_id, date, version) "
+        "SELECT DISTINCT restaurant_id, date, 1 FROM reservations"
+    )
+
+
+def _row_to_dict(row):
+    return {key: row[key] for key in COLUMNS} if row is not None else None
+
+
+def _record_values(record):
+    return tuple(record.get(key, "" if key == "special_requests" else None) for key in COLUMNS)
+
+
+class SQLiteReservationStore:
+    """Reservation store with the same interface as ReservationStore, backed by SQLite.
+
+    Every statement is parameterized and every write runs in its own
+    transaction, so concurrent sessions (threads or processes) never
+    overwrite each other's bookings. Slot versions live in the database
+    (slot_versions), so they are shared by every process writing to it.
+    """
+
+    def __init__(self, path, pool_size=4, seed_json=None):
+        self.path = path
+        self.pool = ConnectionPool(path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+        if seed_json and self.count() == 0:
+            self.import_json(seed_json)
+
+    # Reads
+
+    def all(self):
+        with self.pool.connection() as conn:
+            return [_row_to_dict(r) for r in conn.execute(f"{_SELECT} ORDER BY seq")]
+
+    def get(self, confirmation_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(f"{_SELECT} WHERE confirmation_id = ?", (confirmation_id,)).fetchone()
+            return _row_to_dict(row)
+
+    def find_by_phone(self, phone):
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"{_SELECT} WHERE phone = ? ORDER BY seq", (phone,))
+            return [_row_to_dict(r) for r in rows]
+
+    def find(self, phone_or_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(f"{_SELECT} WHERE confirmation_id = ?", (phone_or_id,)).fetchone()
+            if row is None:
+                row = conn.execute(f"{_SELECT} WHERE phone = ? ORDER BY seq LIMIT 1", (phone_or_id,)).fetchone()
+            return _row_to_dict(row)
+
+    def for_restaurant_date(self, restaurant_id, date):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"{_SELECT} WHERE restaurant_id = ? AND date = ? ORDER BY time, seq",
+                (restaurant_id, date),
+            )
+            return [_row_to_dict(r) for r in rows]
+
+    def slot_version(self, restaurant_id, date):
+        """Changes whenever a reservation at (restaurant_id, date) is added or modified, by any process"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT version FROM slot_versions WHERE restaurant_id = ? AND date = ?", (restaurant_id, date)
+            ).fetchone()
+            return row[0] if row is not None else 0
+
+    def slot_snapshot(self, restaurant_id, date):
+        """(slot_version, reservations) for a restaurant and date, from one read transaction"""
+        with self.pool.connection() as conn, _transaction(conn, mode="DEFERRED"):
+            row = conn.execute(
+                "SELECT version FROM slot_versions WHERE restaurant_id = ? AND date = ?", (restaurant_id, date)
+            ).fetchone()
+            rows = conn.execute(
+                f"{_SELECT} WHERE restaurant_id = ? AND date = ? ORDER BY time, seq",
+                (restaurant_id, date),
+            )
+            return (row[0] if row is not None else 0), [_row_to_dict(r) for r in rows]
+
+    def count(self, status=None):
+        with self.pool.connection() as conn:
+            if status is None:
+                return conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM reservations WHERE status = ?", (status,)).fetchone()[0]
+
+    # Writes
+
+    def add(self, reservation, expected_version=None):
+        """Insert a reservation; with `expected_version`, only while its slot is still at that version (else None).
+        Raises ValueError for a confirmation_id that is already stored, like ReservationStore.add."""
+        try:
+            with span("storage.save", backend="sqlite", op="append"), self.pool.connection() as conn, _transaction(conn):
+                if not _bump_slot(conn, reservation.get("restaurant_id"), reservation.get("date"), expected_version):
+                    return None
+                conn.execute(_INSERT, _record_values(reservation))
+        except sqlite3.IntegrityError as e:
+            if "reservations.confirmation_id" not in str(e):
+                raise
+            raise ValueError(f"Duplicate confirmation_id {reservation['confirmation_id']}") from None
+        return dict(reservation)
+
+    def update(self, confirmation_id, expected_version=None, **changes):
+        """Apply field changes; with `expected_version`, only while the target slot is still at that version"""
+        fields = [key for key in changes if key in COLUMNS and key != "confirmation_id"]
+        with span("storage.save", backend="sqlite", op="update"), self.pool.connection() as conn, _transaction(conn):
+            current = conn.execute(
+                "SELECT restaurant_id, date FROM reservations WHERE confirmation_id = ?", (confirmation_id,)
+            ).fetchone()
+            if current is None:
+                return None
+            old_slot = (current["restaurant_id"], current["date"])
+            new_slot = (changes.get("restaurant_id", old_slot[0]), changes.get("date", old_slot[1]))
+            if not _bump_slot(conn, *new_slot, expected_version):
+                return None
+            if new_slot != old_slot:
+                _bump_slot(conn, *old_slot)
+            if fields:
+                assignments = ", ".join(f"{key} = ?" for key in fields)
+                conn.execute(
+                    f"UPDATE reservations SET {assignments} WHERE confirmation_id = ?",
+                    tuple(changes[key] for key in fields) + (confirmation_id,),
+                )
+            row = conn.execute(f"{_SELECT} WHERE confirmation_id = ?", (confirmation_id,)).fetchone()
+            return _row_to_dict(row)
+
+    def replace_all(self, reservations):
+        """Replace every reservation; durable on return, like the JSON stores' atomic rewrite"""
+        with span("storage.save", backend="sqlite", op="rewrite"), self.pool.connection() as conn, _transaction(conn):
+            conn.execute("DELETE FROM reservations")
+            conn.executemany(_INSERT, [_record_values(r) for r in reservations])
+            _bump_all_slots(conn)
+        self.sync()
+
+    def sync(self):
+        """fsync the WAL. Commits run with synchronous=NORMAL, which leaves that to checkpoints;
+        after this every transaction committed so far survives a power loss."""
+        try:
+            fd = os.open(f"{self.path}-wal", os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.pool.close()
+
+    # JSON import/export
+
+    def import_json(self, path):
+        """Load a reservations.json array, replacing rows with the same confirmation_id"""
+        try:
+            with open(path, "r") as f:
+                reservations = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            log.error("Error importing %s: %s", path, e)
+            return 0
+        with self.pool.connection() as conn, _transaction(conn):
+            conn.executemany(_INSERT.replace("INSERT", "INSERT OR REPLACE", 1), [_record_values(r) for r in reservations])
+            _bump_all_slots(conn)
+        return len(reservations)
+
+    def export_json(self, path):
+        """Write all rows as a reservations.json array"""
+        reservations = self.all()
+        with open(path, "w") as f:
+            json.dump(reservations, f, indent=2)
+        return len(reservations)
+
+
+if __name__ == "__main__":
+    import sys
+    from config.settings import settings
+
+    if len(sys.argv) != 3 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python -m utils.sqlite_store import|export <reservations.json>")
+        sys.exit(1)
+
+    store = SQLiteReservationStore(settings.SQLITE_DB, pool_size=settings.SQLITE_POOL_SIZE)
+    if sys.argv[1] == "import":
+        print(f"Imported {store.import_json(sys.argv[2])} reservations into {settings.SQLITE_DB}")
+    else:
+        print(f"Exported {store.export_json(sys.argv[2])} reservations from {settings.SQLITE_DB}")
@@ -0,0 +1,336 @@
+"""
+Synthetic Data
+Seeded, production-scale restaurants and reservations in every storage format
+
+Restaurants are a chain spread over real city localities; reservations are
+generated day by day with weekend and peak-hour skew, restaurant popularity,
+lead times and cancellations, and never exceed an outlet's seating capacity.
+Reservations are streamed, so millions of rows never sit in memory.
+
+Usage: python -m utils.synthetic_data --restaurants 500 --reservations 1000000
+                                      [--format json|journal|sqlite] [--out DIR] [--seed 7]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from utils.availability import SLOT_MINUTES, is_closed_on, operating_window, parse_minutes
+from utils.reservation_store import _entry_text
+from utils.sqlite_store import SCHEMA, _INSERT, _record_values
+
+# city -> (code, centre latitude, centre longitude, phone area code, localities)
+CITIES = {
+    "Mumbai": ("MUM", 19.076, 72.877, 22, [
+        "Bandra West", "Bandra East", "Juhu", "Andheri", "Powai", "Worli", "Fort", "Dadar",
+        "Borivali", "Malad", "Colaba", "Lower Parel", "Chembur", "Goregaon", "Thane",
+    ]),
+    "Delhi": ("DEL", 28.614, 77.209, 11, [
+        "Connaught Place", "Hauz Khas", "Saket", "Greater Kailash", "Vasant Vihar", "Nehru Place",
+        "Lajpat Nagar", "Rohini", "Dwarka", "Karol Bagh", "Rajouri Garden", "Defence Colony",
+    ]),
+    "Bangalore": ("BLR", 12.972, 77.595, 80, [
+        "Koramangala", "Indiranagar", "Whitefield", "MG Road", "HSR Layout", "Jayanagar",
+        "BTM Layout", "Electronic City", "Malleshwaram", "Hebbal", "JP Nagar", "Marathahalli",
+    ]),
+    "Pune": ("PUN", 18.520, 73.857, 20, [
+        "Koregaon Park", "Viman Nagar", "Hinjewadi", "Aundh", "Kothrud", "Baner", "Kalyani Nagar",
+        "Wakad", "Hadapsar",
+    ]),
+    "Ahmedabad": ("AMD", 23.023, 72.571, 79, [
+        "SG Highway", "Satellite", "Vastrapur", "Prahlad Nagar", "CG Road", "Bodakdev", "Navrangpura",
+    ]),
+    "Chennai": ("CHE", 13.083, 80.271, 44, [
+        "T Nagar", "Adyar", "Anna Nagar", "Velachery", "Nungambakkam", "Besant Nagar", "OMR",
+    ]),
+    "Hyderabad": ("HYD", 17.385, 78.487, 40, [
+        "Banjara Hills", "Jubilee Hills", "Gachibowli", "HITEC City", "Kondapur", "Begumpet",
+    ]),
+    "Kolkata": ("KOL", 22.573, 88.364, 33, [
+        "Park Street", "Salt Lake", "New Town", "Ballygunge", "Alipore", "Gariahat",
+    ]),
+}
+# Share of outlets per city
+CITY_WEIGHTS = {"Mumbai": 6, "Delhi": 5, "Bangalore": 5, "Pune": 3, "Ahmedabad": 2, "Chennai": 3, "Hyderabad": 3, "Kolkata": 2}
+
+OPERATING_HOURS = [("11:00-23:00", 10), ("12:00-23:00", 4), ("12:00-00:00", 2), ("10:00-00:00", 1)]
+CAPACITIES = [(35, 2), (40, 3), (50, 4), (60, 4), (70, 3), (80, 3), (100, 2), (120, 1), (150, 1)]
+FEATURES = [
+    "Private dining", "Valet parking", "Live music on weekends", "Outdoor seating", "Rooftop seating",
+    "Chef's table", "Wine bar", "Garden seating", "Full bar", "Family-friendly", "Pet-friendly",
+]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Rohit", "Rahul", "Karan", "Vikram", "Nikhil", "Siddharth",
+    "Ananya", "Diya", "Priya", "Sneha", "Kavya", "Meera", "Pooja", "Neha", "Riya", "Isha",
+    "Farhan", "Zoya", "Daniel", "Maria", "Sanjay", "Lakshmi", "Arun", "Deepa", "Imran", "Fatima",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Patel", "Shah", "Mehta", "Iyer", "Nair", "Reddy", "Rao", "Gupta",
+    "Singh", "Kapoor", "Malhotra", "Joshi", "Kulkarni", "Desai", "Menon", "Das", "Bose", "Khan",
+]
+SPECIAL_REQUESTS = [
+    "Window seat please", "Birthday celebration", "Anniversary dinner", "High chair needed",
+    "Wheelchair access", "Quiet table", "Vegetarian only", "Outdoor table if possible",
+]
+PARTY_SIZES = [(1, 3), (2, 30), (3, 12), (4, 20), (5, 8), (6, 8), (8, 4), (10, 2), (12, 1)]
+# Relative booking demand per weekday (Monday first)
+WEEKDAY_DEMAND = [0.7, 0.75, 0.8, 0.9, 1.3, 1.6, 1.4]
+
+
+def generate_restaurants(n, seed=0):
+    """n outlets of the chain, spread over CITIES in proportion to CITY_WEIGHTS"""
+    rng = random.Random(seed)
+    cities = list(CITIES)
+    weights = [CITY_WEIGHTS[c] for c in cities]
+    used = {}
+    restaurants = []
+    for i in range(n):
+        city = rng.choices(cities, weights)[0]
+        code, lat, lon, area, localities = CITIES[city]
+        locality = localities[used.get(city, 0) % len(localities)]
+        outlet = used.get(city, 0) // len(localities) + 1
+        used[city] = used.get(city, 0) + 1
+        hours = _weighted(rng, OPERATING_HOURS)
+        closed_days = []
+        if rng.random() < 0.15:
+            closed_days.append(rng.choice(WEEKDAYS[:4]))
+        restaurants.append({
+            "restaurant_id": f"GF-{code}-{i + 1:03d}",
+            "name": f"GoodFoods {locality}" + (f" {outlet}" if outlet > 1 else ""),
+            "location": locality,
+            "city": city,
+            "address": f"{rng.randint(1, 400)} {locality}, {city} {400001 + i % 100}",
+            "latitude": round(lat + rng.uniform(-0.12, 0.12), 4),
+            "longitude": round(lon + rng.uniform(-0.12, 0.12), 4),
+            "phone": f"+91-{area}-{rng.randint(20000000, 29999999)}",
+            "seating_capacity": _weighted(rng, CAPACITIES),
+            "operating_hours": hours,
+            "closed_days": closed_days,
+            "cuisine": "Italian",
+            "features": rng.sample(FEATURES, 3),
+        })
+    return restaurants
+
+
+def iter_reservations(restaurants, n, seed=0, start=None, days=60, cancel_rate=0.08,
+                      turnover_minutes=90, peak_hours=("19:00-22:00",)):
+    """Yield n reservations over `days` days from `start`, in date order.
+
+    `start` defaults to half the window before today, so the data has both
+    history and upcoming bookings. Confirmed bookings never push a slot past
+    the restaurant's seating capacity for `turnover_minutes`; only one day's
+    occupancy is held at a time.
+    """
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days // 2)
+    popularity = [rng.paretovariate(2.0) for _ in restaurants]
+    peaks = [_window(p) for p in peak_hours]
+    turnover_slots = max(1, turnover_minutes // SLOT_MINUTES)
+    windows = [operating_window(r) for r in restaurants]
+    # Seatings per restaurant, weighted toward lunch and peak dinner hours
+    seatings = []
+    for opens, closes in windows:
+        times = list(range(opens, closes - turnover_minutes + 1, SLOT_MINUTES)) or [opens]
+        weights = [_demand(t, peaks) for t in times]
+        seatings.append((times, list(itertools.accumulate(weights))))
+    serials = {}
+
+    day_list = [start + timedelta(days=d) for d in range(days)]
+    for day, count in zip(day_list, _split(n, [WEEKDAY_DEMAND[d.weekday()] for d in day_list])):
+        iso = day.isoformat()
+        open_today = [i for i, r in enumerate(restaurants) if not is_closed_on(r, iso)]
+        if not open_today:
+            if count:
+                raise ValueError(f"No restaurant is open on {iso}")
+            continue
+        cumulative = list(itertools.accumulate(popularity[i] for i in open_today))
+        occupancy = {}
+        for _ in range(count):
+            for _attempt in range(50):
+                index = rng.choices(open_today, cum_weights=cumulative)[0]
+                restaurant = restaurants[index]
+                times, time_weights = seatings[index]
+                minute = rng.choices(times, cum_weights=time_weights)[0]
+                party = _weighted(rng, PARTY_SIZES)
+                cancelled = rng.random() < cancel_rate
+                if cancelled:
+                    break
+                seats = occupancy.setdefault(index, {})
+                first = (minute - windows[index][0]) // SLOT_MINUTES
+                span = range(first, first + turnover_slots)
+                if all(seats.get(s, 0) + party <= restaurant["seating_capacity"] for s in span):
+                    for s in span:
+                        seats[s] = seats.get(s, 0) + party
+                    break
+            else:
+                raise ValueError(f"{iso} is fully booked; generate fewer reservations or more days")
+
+            # Same shape as create_reservation's IDs: GF-<first 3 letters of city>-<yymmdd>-<4 chars>
+            prefix = f"GF-{restaurant['city'][:3].upper()}-{day.strftime('%y%m%d')}"
+            serials[prefix] = serials.get(prefix, 0) + 1
+            seating = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+            lead = timedelta(days=min(int(rng.expovariate(1 / 4)), 30), seconds=rng.randrange(86400))
+            first_name = rng.choice(FIRST_NAMES)
+            yield {
+                "confirmation_id": f"{prefix}-{_base36(serials[prefix])}",
+                "restaurant_id": restaurant["restaurant_id"],
+                "restaurant_name": restaurant["name"],
+                "customer_name": first_name if rng.random() < 0.6 else f"{first_name} {rng.choice(LAST_NAMES)}",
+                "phone": str(rng.randint(6000000000, 9999999999)),
+                "date": iso,
+                "time": f"{minute // 60 % 24:02d}:{minute % 60:02d}",
+                "party_size": party,
+                "special_requests": rng.choice(SPECIAL_REQUESTS) if rng.random() < 0.1 else None,
+                "status": "cancelled" if cancelled else "confirmed",
+                "created_at": (seating - lead).isoformat(),
+            }
+        # Serials are per city and day, and days never repeat
+        serials.clear()
+
+
+# Writers
+
+def write_restaurants(path, restaurants):
+    with open(path, "w") as f:
+        json.dump(restaurants, f, indent=2)
+    return len(restaurants)
+
+
+def write_reservations_json(path, reservations):
+    """Stream reservations into a reservations.json array laid out as json.dump(indent=2) would"""
+    count = 0
+    with open(path, "w") as f:
+        f.write("[")
+        for record in reservations:
+            f.write(("\n" if count == 0 else ",\n") + _entry_text(record))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+def write_reservations_journal(path, reservations):
+    """Stream reservations into a ReservationJournal log (one put per line)"""
+    count = 0
+    with open(path, "w") as f:
+        for record in reservations:
+            f.write(json.dumps({"op": "put", "record": record}) + "\n")
+            count += 1
+    return count
+
+
+def write_reservations_sqlite(path, reservations, batch_size=10000):
+    """Stream reservations into a SQLiteReservationStore database, in batches of one transaction each"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        count = 0
+        it = iter(reservations)
+        while True:
+            batch = [_record_values(r) for r in itertools.islice(it, batch_size)]
+            if not batch:
+                break
+            with conn:
+                conn.executemany(_INSERT.replace("INSERT", "INSERT OR REPLACE", 1), batch)
+            count += len(batch)
+        return count
+    finally:
+        conn.close()
+
+
+def write_dataset(directory, n_restaurants, n_reservations, fmt="json", seed=0, days=60, journal_tail=1000):
+    """Write restaurants.json plus reservations in `fmt`; returns {name: path}.
+
+    "json" writes reservations.json; "journal" writes all but the last
+    `journal_tail` reservations to the snapshot and the rest to
+    reservations.journal, as a running journal store would have them;
+    "sqlite" writes reservations.db.
+    """
+    os.makedirs(directory, exist_ok=True)
+    restaurants = generate_restaurants(n_restaurants, seed=seed)
+    paths = {"restaurants": os.path.join(directory, "restaurants.json")}
+    write_restaurants(paths["restaurants"], restaurants)
+    reservations = iter_reservations(restaurants, n_reservations, seed=seed, days=days)
+
+    if fmt == "json":
+        paths["reservations"] = os.path.join(directory, "reservations.json")
+        write_reservations_json(paths["reservations"], reservations)
+    elif fmt == "journal":
+        paths["reservations"] = os.path.join(directory, "reservations.json")
+        paths["journal"] = os.path.join(directory, "reservations.journal")
+        snapshot_rows = max(0, n_reservations - journal_tail)
+        write_reservations_json(paths["reservations"], itertools.islice(reservations, snapshot_rows))
+        write_reservations_journal(paths["journal"], reservations)
+    elif fmt == "sqlite":
+        paths["sqlite"] = os.path.join(directory, "reservations.db")
+        write_reservations_sqlite(paths["sqlite"], reservations)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+    return paths
+
+
+# Helpers
+
+def _weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights)[0]
+
+
+def _window(spec):
+    opens, _, closes = spec.partition("-")
+    return parse_minutes(opens), parse_minutes(closes)
+
+
+def _demand(minute, peaks):
+    if any(start <= minute < end for start, end in peaks):
+        return 4.0
+    if 12 * 60 + 30 <= minute < 14 * 60 + 30:
+        return 2.0
+    return 0.6
+
+
+def _split(n, weights):
+    """n split into integer parts proportional to weights (largest remainder)"""
+    total = sum(weights)
+    exact = [n * w / total for w in weights]
+    parts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - parts[i], reverse=True)
+    for i in by_remainder[:n - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def _base36(n, width=4):
+    digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    out = ""
+    for _ in range(width):
+        n, d = divmod(n, 36)
+        out = digits[d] + out
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic GoodFoods data")
+    parser.add_argument("--restaurants", type=int, default=500)
+    parser.add_argument("--reservations", type=int, default=100000)
+    parser.add_argument("--format", choices=("json", "journal", "sqlite"), default="json")
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--journal-tail", type=int, default=1000, help="reservations left in the journal (journal format)")
+    args = parser.parse_args()
+
+    paths = write_dataset(args.out, args.restaurants, args.reservations, fmt=args.format,
+                          seed=args.seed, days=args.days, journal_tail=args.journal_tail)
+    for name, path in paths.items():
+        print(f"{name}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Tracing
+Per-turn spans (routing, prompt build, LLM call, parsing, tools, storage, formatting) exported to a local file
+
+    with span("llm.call", provider="together") as s:
+        ...
+        s.set("tool_calls", 2)
+
+Spans nest through a context variable, so a turn's stages share its trace
+ID. When Settings.TRACE_ENABLED is off, span() returns one shared no-op
+object: no clock reads, no allocation beyond the call's keyword arguments.
+Finished spans go through a queue to a background writer thread, as JSON
+lines ("jsonl") or OTLP/JSON batches ("otlp", readable by the
+OpenTelemetry collector's otlpjsonfile receiver).
+
+Summarize a trace file with: python -m utils.tracing [data/traces.jsonl]
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+from config.settings import settings
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed stage; use as a context manager"""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_ns", "end_ns", "error", "_started", "_token")
+
+    def __init__(self, tracer, name, trace_id, parent_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned streaming generator)
+            pass
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+
+class Tracer:
+    """Creates spans and hands finished ones to a background file writer.
+
+    A trace is sampled (with `sample_rate`) when its root span starts; spans
+    of an unsampled trace are no-ops too.
+    """
+
+    def __init__(self, path, fmt="jsonl", sample_rate=1.0, service_name="goodfoods-assistant"):
+        if fmt not in ("jsonl", "otlp"):
+            raise ValueError(f"Unknown trace format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def span(self, name, attributes):
+        parent = _current.get()
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _UnsampledRoot()
+            return Span(self, name, f"{random.getrandbits(128):032x}", None, attributes)
+        if parent is NOOP_SPAN:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def _finish(self, span):
+        self._queue.put(span)
+
+    def close(self):
+        """Write every queued span and stop the writer"""
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is already waiting into the same write
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            spans = [s for s in batch if s is not None]
+            if spans:
+                try:
+                    self._write(spans)
+                except OSError as e:
+                    log.error("Error writing traces to %s: %s", self.path, e)
+            if stop:
+                return
+
+    def _write(self, spans):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.fmt == "jsonl":
+            lines = [json.dumps(_jsonl_record(s), default=str) for s in spans]
+        else:
+            lines = [json.dumps(_otlp_batch(spans, self.service_name), default=str)]
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class _UnsampledRoot:
+    """Root of a trace that was not sampled: its children see NOOP_SPAN as their parent"""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _current.set(NOOP_SPAN)
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            pass
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_tracer = None
+_tracer_ready = False
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer, or None when Settings.TRACE_ENABLED is off"""
+    global _tracer, _tracer_ready
+    if not _tracer_ready:
+        with _tracer_lock:
+            if not _tracer_ready:
+                if settings.TRACE_ENABLED:
+                    _tracer = Tracer(settings.TRACE_PATH, fmt=settings.TRACE_FORMAT, sample_rate=settings.TRACE_SAMPLE_RATE)
+                    atexit.register(_tracer.close)
+                _tracer_ready = True
+    return _tracer
+
+
+def span(name, **attributes):
+    """Context manager timing one stage under the current span (a no-op when tracing is off)"""
+    tracer = _tracer if _tracer_ready else get_tracer()
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.span(name, attributes)
+
+
+def current_span():
+    """The innermost open span, to carry into another thread or event loop with attach()"""
+    return _current.get()
+
+
+def attach(parent):
+    """Make `parent` the current span in this thread/task (for work handed off from a traced caller)"""
+    if parent is not None:
+        _current.set(parent)
+
+
+# Export formats
+
+def _jsonl_record(s):
+    record = {
+        "trace_id": s.trace_id,
+        "span_id": s.span_id,
+        "parent_id": s.parent_id,
+        "name": s.name,
+        "start": s.start_ns / 1e9,
+        "duration_ms": round((s.end_ns - s.start_ns) / 1e6, 3),
+        "attributes": s.attributes,
+    }
+    if s.error:
+        record["error"] = s.error
+    return record
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_batch(spans, service_name):
+    out = []
+    for s in spans:
+        record = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items() if v is not None],
+            "status": {"code": 2, "message": s.error} if s.error else {},
+        }
+        if s.parent_id:
+            record["parentSpanId"] = s.parent_id
+        out.append(record)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "utils.tracing"}, "spans": out}],
+        }]
+    }
+
+
+# Summary
+
+def _read_spans(path):
+    """(name, duration_ms, is_root) for every span in a jsonl or otlp trace file"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "resourceSpans" not in entry:
+                yield entry["name"], entry["duration_ms"], entry.get("parent_id") is None
+                continue
+            for resource in entry["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for s in scope.get("spans", []):
+                        duration = (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+                        yield s["name"], duration, not s.get("parentSpanId")
+
+
+def summarize(path):
+    """Print count, p50/p95/p99 and share of root (turn) time per span name"""
+    durations = {}
+    root_total = 0.0
+    for name, duration, is_root in _read_spans(path):
+        durations.setdefault(name, []).append(duration)
+        if is_root:
+            root_total += duration
+    print(f"{'span':<24} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'of turns':>9}")
+    for name, samples in sorted(durations.items(), key=lambda kv: -sum(kv[1])):
+        samples.sort()
+        pct = lambda p: samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+        share = f"{sum(samples) / root_total * 100:.1f}%" if root_total else "-"
+        print(f"{name:<24} {len(samples):>7} {pct(50):>9.3f} {pct(95):>9.3f} {pct(99):>9.3f} {share:>9}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    summarize(sys.argv[1] if len(sys.argv) > 1 else settings.TRACE_PATH)